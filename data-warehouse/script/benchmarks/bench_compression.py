@@ -0,0 +1,91 @@
+"""
+Compression benchmark: output size and throughput per codec and level
+
+Compresses a warehouse build with every available codec at a few levels
+and reports the ratio, compression and decompression speed. Run from the
+script directory after a build:
+
+    python benchmarks/bench_compression.py [file] [repeats]
+"""
+import importlib.util
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_compression import compress_stream  # noqa: E402
+
+DEFAULT_FILE = 'combined_food_data.csv'
+DEFAULT_REPEATS = 3
+
+# Levels tried per codec (fast, default, maximum)
+LEVELS = {
+    'gzip': [1, 6, 9],
+    'bz2': [1, 9],
+    'xz': [0, 6, 9],
+    'zstd': [3, 10, 19]
+}
+
+def compress(data, codec, level):
+    """Compress bytes through the same streaming path the converters use"""
+    buffer = io.BytesIO()
+    with compress_stream(buffer, codec, level) as stream:
+        stream.write(data)
+    return buffer.getvalue()
+
+def decompress(data, codec):
+    """Decompress bytes through the codec's streaming reader"""
+    if codec == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=io.BytesIO(data)).read()
+    if codec == 'bz2':
+        import bz2
+        return bz2.BZ2File(io.BytesIO(data)).read()
+    if codec == 'xz':
+        import lzma
+        return lzma.LZMAFile(io.BytesIO(data)).read()
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read()
+
+def best_time(function, repeats):
+    """Fastest of several runs (seconds) and the last result"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def available_codecs():
+    codecs = ['gzip', 'bz2', 'xz']
+    if importlib.util.find_spec('zstandard') is not None:
+        codecs.append('zstd')
+    else:
+        print("(zstd skipped: the zstandard package is not installed)")
+    return codecs
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REPEATS
+
+    with open(input_file, 'rb') as infile:
+        data = infile.read()
+    megabytes = len(data) / 1_000_000
+
+    print(f"Input: {input_file} ({os.path.getsize(input_file):,} bytes), best of {repeats}")
+    print(f"{'codec':<6} {'level':>5} {'bytes':>10} {'ratio':>7} {'comp MB/s':>10} {'decomp MB/s':>12}")
+
+    for codec in available_codecs():
+        for level in LEVELS[codec]:
+            compress_time, compressed = best_time(lambda: compress(data, codec, level), repeats)
+            decompress_time, restored = best_time(lambda: decompress(compressed, codec), repeats)
+            assert restored == data, f"{codec} round trip failed"
+            print(f"{codec:<6} {level:>5} {len(compressed):>10,} {len(data) / len(compressed):>6.1f}x "
+                  f"{megabytes / compress_time:>10.1f} {megabytes / decompress_time:>12.1f}")
+
+if __name__ == "__main__":
+    main()
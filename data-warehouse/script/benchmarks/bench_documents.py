@@ -0,0 +1,62 @@
+"""
+JSON document export benchmark: fragment encoder vs json.dumps of nested dictionaries
+
+Encodes every food of a warehouse build (repeated to reach a row count)
+as a document with per-unit nutrients, once with DocumentEncoder and once
+by building the same nested dictionaries for json.dumps, and reports both
+next to the time it took to parse the CSV. Run from the script directory
+after a build:
+
+    python benchmarks/bench_documents.py [file] [documents]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_documents import DocumentEncoder  # noqa: E402
+from food_recipes import load_warehouse_foods  # noqa: E402
+
+DEFAULT_FILE = 'combined_food_data.csv'
+DEFAULT_DOCUMENTS = 20000
+
+def dumps_document(record):
+    """The same document through json.dumps"""
+    nutrition = record.nutrition()
+    conversions = record.unit_config['conversions']
+    return json.dumps({
+        'id': record.id, 'name': record.name, 'portion_g': record.portion_g,
+        'category': record.category, 'source_pdf': record.source_pdf, 'page': record.page,
+        'notes': record.notes, 'defaultUnit': record.unit_config['defaultUnit'],
+        'units': record.unit_config['units'], 'unitConversions': conversions,
+        'nutritionPer100g': nutrition,
+        'nutritionPerUnit': {
+            unit: {'grams': grams, 'nutrients': {key: round(value * grams / 100, 2)
+                                                 for key, value in nutrition.items()}}
+            for unit, grams in conversions.items()
+        }
+    }, ensure_ascii=False)
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DOCUMENTS
+
+    start = time.perf_counter()
+    foods = list(load_warehouse_foods(input_file).values())
+    parse = time.perf_counter() - start
+    records = (foods * (count // len(foods) + 1))[:count]
+    print(f"Input: {input_file} ({len(foods)} foods), {count} documents")
+    print(f"{'parse CSV (per food)':<28} {parse / len(foods) * 1e6:8.1f} us")
+
+    encoder = DocumentEncoder()
+    for label, encode in (('DocumentEncoder', encoder.encode), ('json.dumps', dumps_document)):
+        start = time.perf_counter()
+        size = sum(len(encode(record)) for record in records)
+        elapsed = time.perf_counter() - start
+        print(f"{label + ' (per document)':<28} {elapsed / count * 1e6:8.1f} us  "
+              f"({size / count:,.0f} chars each)")
+
+if __name__ == "__main__":
+    main()
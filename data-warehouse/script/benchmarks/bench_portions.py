@@ -0,0 +1,135 @@
+"""
+Portion parser benchmark: batch throughput and hand-labelled accuracy
+
+Generates phrases like '2 colheres de sopa de arroz integral cozido' from
+the foods and units of a warehouse build (digits, fractions and number
+words; plural units) and parses them in one batch. Those phrases spell a
+food's full name, so parsing them back only checks the parser agrees
+with itself; accuracy is measured on HAND_LABELLED, short everyday
+phrases labelled by hand for the sample build. Run from the script
+directory after a build:
+
+    python benchmarks/bench_portions.py [file] [phrases]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_portions import PortionParser, fold  # noqa: E402
+from food_recipes import load_warehouse_foods  # noqa: E402
+from food_rules import load_rules  # noqa: E402
+
+DEFAULT_FILE = 'combined_food_data.csv'
+DEFAULT_PHRASES = 50000
+SEED = 7
+
+# Phrase -> (food name, grams) meant, or None when the sample build
+# (input_food_data_*.csv) has no such food; grams from the food's own unit
+HAND_LABELLED = {
+    'um e meio copo de leite': ('Leite, de vaca, integral', 360.0),
+    'meia xícara de arroz': ('Arroz, tipo 1, cru', 100.0),
+    '1 kg de batata': ('Batata, inglesa, crua', 1000.0),
+    '2 ovos': ('Ovo, de galinha, inteiro, cru', 100.0),
+    '2 pães': ('Pão, trigo, francês', 100.0),
+    '1 banana prata': ('Banana, prata, crua', 150.0),
+    '2 colheres de sopa de feijão tropeiro': ('Feijão tropeiro mineiro', 24.0),
+    'uma porção de frango grelhado': ('Frango, peito, sem pele, grelhado', 150.0),
+    '1 tomate': ('Tomate, com semente, cru', 120.0),
+    '3 colheres de chá de açúcar': ('Açúcar, cristal', 12.0),
+    '1 colher de sopa de extrato de tomate': ('Tomate, extrato', 10.0),
+    '100 g de fígado de frango': ('Frango, fígado, cru', 100.0),
+    'duas folhas de alface': ('Alface, americana, crua', 20.0),
+    '1 xícara de feijão': None,
+    'duas xícaras de feijão preto': None,
+}
+
+# (text, value) of the quantities used in phrases
+QUANTITIES = [('1', 1), ('2', 2), ('3', 3), ('1,5', 1.5), ('1/2', 0.5), ('um', 1), ('uma', 1),
+              ('duas', 2), ('dois', 2), ('três', 3), ('meia', 0.5), ('um e meio', 1.5), ('vinte e cinco', 25)]
+
+def plural(unit):
+    """Portuguese plural of a unit's first word ('colher de sopa' -> 'colheres de sopa')"""
+    first, _, rest = unit.partition(' ')
+    if len(first) <= 2 or first.endswith('s'):
+        return unit  # Abbreviations ('g', 'kg', 'ml') and 'gramas'
+    if first.endswith('ão'):
+        first = first[:-2] + 'ões'
+    elif first.endswith(('r', 'z')):
+        first += 'es'
+    else:
+        first += 's'
+    return f"{first} {rest}".strip()
+
+def synthetic_corpus(foods, count, rng):
+    """
+    Returns:
+        List of (phrase, expected name)
+    """
+    records = list(foods.values())
+    corpus = []
+    for _ in range(count):
+        record = rng.choice(records)
+        conversions = record.unit_config['conversions']
+        unit = rng.choice([unit for unit in conversions if not unit[0].isdigit()])
+        text, value = rng.choice(QUANTITIES)
+        unit_text = plural(unit) if value > 1 else unit
+        name = record.name if rng.random() < 0.5 else record.name.replace(',', '').lower()
+        corpus.append((f"{text} {unit_text} de {name}", record.name))
+    return corpus
+
+def hand_labelled_accuracy(parser, foods):
+    """
+    Returns:
+        Tuple of (share of phrases whose food is right, share whose food
+        and grams are right)
+    """
+    names = {food_id: record.name for food_id, record in foods.items()}
+    food_hits = gram_hits = 0
+    for phrase, result in zip(HAND_LABELLED, parser.parse_batch(list(HAND_LABELLED))):
+        expected = HAND_LABELLED[phrase]
+        if expected is None or result is None:
+            food_hits += expected is result
+            gram_hits += expected is result
+            continue
+        if names[result[0]] == expected[0]:
+            food_hits += 1
+            gram_hits += result[1] == expected[1]
+    return food_hits / len(HAND_LABELLED), gram_hits / len(HAND_LABELLED)
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PHRASES
+
+    rng = random.Random(SEED)
+    rules = load_rules()
+    foods = load_warehouse_foods(input_file)
+
+    start = time.perf_counter()
+    parser = PortionParser(rules.unit_configs, rules.default_config, rules.synonyms,
+                           ((record.id, record.name, record.unit_config) for record in foods.values()),
+                           rules.food_aliases)
+    compile_time = time.perf_counter() - start
+    corpus = synthetic_corpus(foods, count, rng)
+    phrases = [phrase for phrase, _ in corpus]
+
+    start = time.perf_counter()
+    results = parser.parse_batch(phrases)
+    elapsed = time.perf_counter() - start
+
+    names = {food_id: fold(record.name) for food_id, record in foods.items()}
+    round_trips = sum(1 for (_, name), result in zip(corpus, results)
+                      if result is not None and names[result[0]] == fold(name))
+    food_accuracy, gram_accuracy = hand_labelled_accuracy(parser, foods)
+
+    print(f"Input: {input_file} ({len(foods)} foods), {count} phrases")
+    print(f"{'compile parser':<24} {compile_time:8.3f} s")
+    print(f"{'parse batch':<24} {elapsed:8.3f} s  ({count / elapsed:,.0f} phrases/s)")
+    print(f"{'full names round trip':<24} {round_trips / count:8.1%}")
+    print(f"{'hand-labelled food':<24} {food_accuracy:8.1%}  ({len(HAND_LABELLED)} phrases)")
+    print(f"{'hand-labelled grams':<24} {gram_accuracy:8.1%}")
+
+if __name__ == "__main__":
+    main()
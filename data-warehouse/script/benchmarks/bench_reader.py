@@ -0,0 +1,92 @@
+"""
+Reader benchmark: calorie-only view vs full parse of a warehouse build
+
+Compares loading every row with csv.DictReader + json.loads (what
+consumers did before) against WarehouseReader with only the needed
+columns. Run from the script directory after a build:
+
+    python benchmarks/bench_reader.py [file] [copies] [repeats]
+
+The build is repeated `copies` times into a temporary file so timings
+are not dominated by start-up costs.
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_reader import WarehouseReader  # noqa: E402
+
+DEFAULT_FILE = 'combined_food_data.csv'
+DEFAULT_COPIES = 100
+DEFAULT_REPEATS = 3
+
+def full_parse(input_file):
+    """Every column, every nutritionPer100g cell decoded"""
+    rows = {}
+    with open(input_file, 'r', encoding='utf-8', newline='') as infile:
+        for row in csv.DictReader(infile):
+            row['nutritionPer100g'] = json.loads(row['nutritionPer100g'])
+            row['units'] = json.loads(row['units'])
+            row['unitConversions'] = json.loads(row['unitConversions'])
+            rows[row['id']] = row
+    return {food_id: row['nutritionPer100g'].get('calories') for food_id, row in rows.items()}
+
+def lazy_view(input_file):
+    """Only id and energy_kcal, typed while reading"""
+    return {row['id']: row['energy_kcal'] for row in WarehouseReader(input_file, ['id', 'energy_kcal'])}
+
+def lazy_nutrient(input_file):
+    """id + nutritionPer100g, decoded only for the rows that are touched"""
+    rows = WarehouseReader(input_file, ['id', 'nutritionPer100g']).rows_by_id()
+    return sum(1 for row in list(rows.values())[::100] if row.nutrient('calories') is not None)
+
+def column_array(input_file):
+    """One numeric column straight into an array"""
+    return WarehouseReader(input_file).column('energy_kcal')
+
+def best_time(function, input_file, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(input_file)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COPIES
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_REPEATS
+
+    with open(input_file, 'r', encoding='utf-8', newline='') as infile:
+        header = infile.readline()
+        body = infile.read()
+
+    handle, temp_path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as outfile:
+            outfile.write(header)
+            for _ in range(copies):
+                outfile.write(body)
+
+        print(f"Input: {input_file} x {copies} ({os.path.getsize(temp_path):,} bytes), best of {repeats}")
+        baseline = best_time(full_parse, temp_path, repeats)
+        print(f"{'full parse (DictReader + json.loads)':<45} {baseline:8.3f} s")
+        for label, function in [
+            ('WarehouseReader id + energy_kcal', lazy_view),
+            ('WarehouseReader nutrition, 1% rows touched', lazy_nutrient),
+            ('WarehouseReader.column(energy_kcal)', column_array),
+        ]:
+            elapsed = best_time(function, temp_path, repeats)
+            print(f"{label:<45} {elapsed:8.3f} s  ({elapsed / baseline:.0%} of full parse)")
+    finally:
+        os.remove(temp_path)
+
+if __name__ == "__main__":
+    main()
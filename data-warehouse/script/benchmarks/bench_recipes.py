@@ -0,0 +1,79 @@
+"""
+Recipe benchmark: full derivation vs incremental re-derivation
+
+Generates a synthetic recipe book over the foods of a warehouse build
+(some recipes use earlier recipes, so the book is a DAG), derives every
+recipe, then changes single ingredients and re-derives only their
+dependents. Run from the script directory after a build:
+
+    python benchmarks/bench_recipes.py [file] [recipes] [changes]
+"""
+import random
+import sys
+import time
+from array import array
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_recipes import Recipe, RecipeBook, RecipeEvaluator, load_warehouse_foods  # noqa: E402
+from food_rules import load_rules  # noqa: E402
+
+DEFAULT_FILE = 'combined_food_data.csv'
+DEFAULT_RECIPES = 5000
+DEFAULT_CHANGES = 20
+SEED = 7
+
+def synthetic_book(food_ids, count, rng):
+    """Recipes of 3-8 foods; every fifth one also uses up to two earlier recipes"""
+    definitions = []
+    for number in range(count):
+        ingredients = [{'id': food_id, 'quantity': rng.randint(5, 300), 'unit': 'g'}
+                       for food_id in rng.sample(food_ids, rng.randint(3, 8))]
+        if number % 5 == 0 and definitions:
+            for earlier in rng.sample(definitions, min(2, len(definitions))):
+                ingredients.append({'id': earlier['id'], 'quantity': rng.randint(50, 200), 'unit': 'g'})
+        definitions.append({
+            'id': f'recipe_{number}',
+            'name': f'Recipe {number}',
+            'category': 'Alimentos',
+            'yield_factor': round(rng.uniform(0.6, 1.2), 2),
+            'retention': {'vitamin_c': 0.5},
+            'ingredients': ingredients
+        })
+    return RecipeBook([Recipe(definition) for definition in definitions])
+
+def main():
+    input_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_RECIPES
+    changes = int(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_CHANGES
+
+    rng = random.Random(SEED)
+    rules = load_rules()
+    foods = load_warehouse_foods(input_file)
+    food_ids = sorted(foods)
+    book = synthetic_book(food_ids, count, rng)
+    evaluator = RecipeEvaluator(book, foods, rules.unit_config,
+                                lambda name: rules.categorize(name, 'Alimentos'))
+
+    start = time.perf_counter()
+    evaluator.evaluate_all()
+    full = time.perf_counter() - start
+    print(f"Input: {input_file} ({len(foods)} foods), {count} recipes")
+    print(f"{'full derivation':<40} {full:8.3f} s  ({evaluator.computed} recipes)")
+
+    recomputed = 0
+    start = time.perf_counter()
+    for food_id in rng.sample(food_ids, changes):
+        changed = foods[food_id].copy()
+        changed.nutrients = array('d', [value * 1.01 for value in changed.nutrients])
+        before = evaluator.computed
+        evaluator.update_food(food_id, changed)
+        evaluator.evaluate_all()
+        recomputed += evaluator.computed - before
+    incremental = time.perf_counter() - start
+    print(f"{f'{changes} single-ingredient changes':<40} {incremental:8.3f} s  "
+          f"({recomputed} recipes re-derived, {incremental / changes / full:.1%} of a full pass each)")
+
+if __name__ == "__main__":
+    main()
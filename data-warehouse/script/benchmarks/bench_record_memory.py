@@ -0,0 +1,97 @@
+"""
+Memory benchmark: per-row footprint of dict rows vs FoodRecord
+
+Builds a synthetic warehouse in both representations and reports the
+traced allocation per row. Run from the script directory:
+
+    python benchmarks/bench_record_memory.py [rows]
+"""
+import gc
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_record import FoodRecord, NUTRIENT_KEYS, TOP_LEVEL_NUTRIENTS  # noqa: E402
+from food_rules import load_rules  # noqa: E402
+
+DEFAULT_ROWS = 1_000_000
+SEED = 42
+
+def synthetic_values(rng):
+    """One synthetic food: nutrient values with roughly 20% missing"""
+    return [None if rng.random() < 0.2 else round(rng.uniform(0, 500), 2) for _ in NUTRIENT_KEYS]
+
+def build_dict_rows(count, configs):
+    """Previous representation: 19-key dict with per-row JSON strings"""
+    rng = random.Random(SEED)
+    rows = []
+    for index in range(count):
+        values = synthetic_values(rng)
+        config = configs[index % len(configs)]
+        nutrition = {key: value for key, value in zip(NUTRIENT_KEYS, values) if value is not None}
+        row = {'id': f'food_{index}', 'name': f'Food {index}, cru', 'portion_g': 100}
+        for field, position in TOP_LEVEL_NUTRIENTS:
+            value = values[position]
+            row[field] = 'NULL' if value is None else str(value)
+        row['defaultUnit'] = config['defaultUnit']
+        row['units'] = json.dumps(config['units'], ensure_ascii=False)
+        row['unitConversions'] = json.dumps(config['conversions'], ensure_ascii=False)
+        row['nutritionPer100g'] = json.dumps(nutrition, ensure_ascii=False)
+        row['category'] = 'Cereais'
+        row['source_pdf'] = '#1food-moz.pdf'
+        row['page'] = '1'
+        row['notes'] = f'Dataset 1, Entry {index}'
+        rows.append(row)
+    return rows
+
+def build_records(count, configs):
+    """New representation: FoodRecord with array('d') nutrients"""
+    rng = random.Random(SEED)
+    records = []
+    for index in range(count):
+        values = synthetic_values(rng)
+        records.append(FoodRecord(
+            f'food_{index}',
+            f'Food {index}, cru',
+            FoodRecord.nutrients_from_values(values),
+            configs[index % len(configs)],
+            'Cereais',
+            '#1food-moz.pdf',
+            '1',
+            f'Dataset 1, Entry {index}',
+            1
+        ))
+    return records
+
+def measure(builder, count, configs):
+    """Traced bytes per row held by the built collection"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = builder(count, configs)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+    gc.collect()
+    return (after - before) / count
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    configs = list(load_rules().unit_configs.values())
+
+    print("=" * 60)
+    print(f"Per-row memory footprint ({count:,} synthetic rows)")
+    print("=" * 60)
+
+    dict_bytes = measure(build_dict_rows, count, configs)
+    print(f"dict rows:    {dict_bytes:8.0f} bytes/row  ({dict_bytes * count / 2**20:,.0f} MiB total)")
+
+    record_bytes = measure(build_records, count, configs)
+    print(f"FoodRecord:   {record_bytes:8.0f} bytes/row  ({record_bytes * count / 2**20:,.0f} MiB total)")
+
+    print(f"Reduction:    {dict_bytes / record_bytes:8.1f}x")
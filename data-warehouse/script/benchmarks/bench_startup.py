@@ -0,0 +1,54 @@
+"""
+Startup benchmark: interpreter, imports and a single-file conversion
+
+Runs each command in a fresh interpreter several times and reports the
+best wall time, so the import cost of the pipelines can be compared with
+the bare interpreter and with the conversion itself. Run from the script
+directory:
+
+    python benchmarks/bench_startup.py [input file] [repeats]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+
+DEFAULT_FILE = 'input_food_data_1.csv'
+DEFAULT_REPEATS = 7
+
+def best_time(command, repeats):
+    """Best wall time of a command, in milliseconds"""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SCRIPT_DIRECTORY, stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+def main():
+    input_file = os.path.abspath(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FILE)
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_REPEATS
+
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'output.csv')
+        commands = [
+            ('interpreter', ['-c', 'pass']),
+            ('import food_pipeline', ['-c', 'import food_pipeline']),
+            ('import food_converter', ['-c', 'import food_converter']),
+            ('import multi_dataset_converter', ['-c', 'import multi_dataset_converter']),
+            ('convert (no side outputs)', ['food_pipeline.py', 'convert', input_file, output_file, '-q',
+                                           '--no-validate']),
+            ('convert (defaults)', ['food_pipeline.py', 'convert', input_file, output_file, '-q',
+                                    '--set', f"validation_report_file={os.path.join(directory, 'v.json')}"])
+        ]
+        print(f"Input: {input_file}, best of {repeats}")
+        for label, arguments in commands:
+            print(f"{label:<32} {best_time([sys.executable] + arguments, repeats):7.1f} ms")
+
+if __name__ == "__main__":
+    main()
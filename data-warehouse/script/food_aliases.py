@@ -0,0 +1,217 @@
+import argparse
+import json
+import re
+
+from food_dedup import fold_accents
+from food_output import atomic_output
+
+# ===================================================================
+# NORMALIZATION
+# ===================================================================
+
+ALIAS_INDEX_FORMAT = 1
+
+# Linking words ignored in alias keys ('com'/'sem' are kept: 'com sal' != 'sem sal')
+FILLER_WORDS = {'de', 'do', 'da', 'dos', 'das', 'e', 'em', 'a', 'o', 'ao', 'na', 'no', 'of', 'the', 'and'}
+
+def normalize_alias(text):
+    """
+    Normalize a name or query for alias matching
+
+    Accents are folded, case is ignored and punctuation separates words:
+    'Feijão, carioca' and 'feijao carioca' both become 'feijao carioca'.
+
+    Args:
+        text: Any string
+    Returns:
+        Normalized string (words separated by single spaces)
+    """
+    return re.sub(r'[^a-z0-9]+', ' ', fold_accents(text)).strip()
+
+class SynonymTable:
+    """
+    Compiled synonym groups (Portuguese / English / local names)
+
+    Every term of a group is rewritten to the group's first term, so
+    'cassava cozida' and 'mandioca cozida' share one canonical form.
+    Terms can span several words ('sweet potato'); the longest match wins.
+    """
+
+    def __init__(self, groups):
+        """
+        Args:
+            groups: List of term lists, canonical (TACO) term first
+        """
+        self.groups = [list(group) for group in groups]
+        self.terms = {}
+        self.max_words = 1
+        for group in self.groups:
+            canonical = tuple(normalize_alias(group[0]).split())
+            for term in group:
+                words = tuple(normalize_alias(term).split())
+                if not words:
+                    continue
+                if self.terms.get(words, canonical) != canonical:
+                    raise ValueError(f"Synonym '{term}' belongs to more than one group")
+                self.terms[words] = canonical
+                self.max_words = max(self.max_words, len(words))
+
+    def canonical_words(self, text):
+        """
+        Normalize text and rewrite synonyms to their canonical terms
+
+        Returns:
+            List of words
+        """
+        words = normalize_alias(text).split()
+        result = []
+        position = 0
+        while position < len(words):
+            for length in range(min(self.max_words, len(words) - position), 0, -1):
+                canonical = self.terms.get(tuple(words[position:position + length]))
+                if canonical is not None:
+                    result.extend(canonical)
+                    position += length
+                    break
+            else:
+                result.append(words[position])
+                position += 1
+        return result
+
+    def alias_key(self, text):
+        """
+        Canonical alias key of a name or query
+
+        Word order and linking words are ignored, so 'raw cassava' and
+        'Mandioca, crua' share a key.
+        """
+        return words_key(self.canonical_words(text))
+
+def words_key(words):
+    """
+    Alias key of canonical words already computed (see SynonymTable.alias_key)
+    """
+    return ' '.join(sorted(set(words) - FILLER_WORDS))
+
+# ===================================================================
+# ALIAS INDEX
+# ===================================================================
+
+class AliasIndex:
+    """
+    Hash index from canonical alias to food ID
+
+    Built at conversion time from the converted foods: each food is
+    reachable by its name, its ID and any explicit aliases, written in
+    any accent, case, word order or synonym variant. A query costs one
+    normalization and one dictionary lookup.
+    """
+
+    def __init__(self, synonyms, food_aliases=None):
+        """
+        Args:
+            synonyms: SynonymTable used to canonicalize names and queries
+            food_aliases: Optional dictionary of extra alias -> food ID
+        """
+        self.synonyms = synonyms
+        self.food_aliases = dict(food_aliases or {})
+        self.aliases = {}
+        self.collisions = 0
+
+    def _add_key(self, key, food_id):
+        if not key:
+            return
+        existing = self.aliases.setdefault(key, food_id)
+        if existing != food_id:
+            self.collisions += 1  # The first food keeps the alias
+
+    def add(self, food_id, name, key=None):
+        """
+        Index one food under its name and ID
+
+        Args:
+            food_id: Final ID of the food
+            name: Name of the food item
+            key: Alias key of the name if already computed (FoodRecord.alias_key)
+        """
+        self._add_key(key if key is not None else self.synonyms.alias_key(name), food_id)
+        self._add_key(self.synonyms.alias_key(food_id.replace('_', ' ')), food_id)
+
+    def add_rows(self, rows):
+        """
+        Index every food of a converted dataset, then the explicit aliases
+
+        Args:
+            rows: Dictionary of id -> FoodRecord (or any objects with id and name)
+        """
+        for record in rows.values():
+            self.add(record.id, record.name, getattr(record, 'alias_key', None))
+        self.add_aliases(rows)
+
+    def add_aliases(self, food_ids):
+        """
+        Index the explicit aliases of foods that made it into the output
+
+        Args:
+            food_ids: Container of final food IDs (anything supporting 'in')
+        """
+        for alias, food_id in self.food_aliases.items():
+            if food_id in food_ids:
+                self._add_key(self.synonyms.alias_key(alias), food_id)
+
+    def resolve(self, query):
+        """
+        Find the food a name or alias refers to
+
+        Returns:
+            Food ID, or None if nothing matches
+        """
+        return self.aliases.get(self.synonyms.alias_key(query))
+
+    def __len__(self):
+        return len(self.aliases)
+
+    def write(self, index_file):
+        """Write the index (and the synonyms needed to query it) as JSON, atomically"""
+        with atomic_output(index_file) as outfile:
+            json.dump({
+                'format': ALIAS_INDEX_FORMAT,
+                'synonyms': self.synonyms.groups,
+                'aliases': self.aliases
+            }, outfile, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, index_file):
+        """
+        Load an index written by write()
+
+        Returns:
+            AliasIndex instance
+        """
+        with open(index_file, 'r', encoding='utf-8') as infile:
+            document = json.load(infile)
+        if document.get('format') != ALIAS_INDEX_FORMAT:
+            raise ValueError(f"Unsupported alias index format: {document.get('format')}")
+        index = cls(SynonymTable(document['synonyms']))
+        index.aliases = document['aliases']
+        return index
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up foods by name or alias")
+    parser.add_argument('index_file', help="Alias index written by a converter")
+    parser.add_argument('queries', nargs='+', help="Names to resolve, e.g. 'cassava cozida'")
+    args = parser.parse_args()
+
+    try:
+        index = AliasIndex.load(args.index_file)
+        for query in args.queries:
+            food_id = index.resolve(query)
+            print(f"{query} -> {food_id if food_id is not None else '(no match)'}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
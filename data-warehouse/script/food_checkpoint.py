@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from food_output import atomic_output
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+CHECKPOINT_DIRECTORY = '.checkpoints'  # Working state of an interrupted run
+CHECKPOINT_INTERVAL = 10000  # Rows between commits
+
+CHECKPOINT_FORMAT = 1
+
+# ===================================================================
+# CHECKPOINT STORE
+# ===================================================================
+
+def input_fingerprint(config, *extra):
+    """
+    Identify an input file and everything its transformed rows depend on
+
+    Args:
+        config: Input file configuration
+        extra: Further values the transform depends on (e.g. the rules hash)
+    Returns:
+        Hex digest string
+    """
+    status = os.stat(config['path'])
+    identity = [str(Path(config['path']).resolve()), status.st_size, status.st_mtime_ns,
+                config['source'], config['category_override'], *extra]
+    return hashlib.sha1(json.dumps(identity, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+class CheckpointStore:
+    """
+    Resumable record of the rows each dataset has already been through
+
+    Layout:
+        state.json         per dataset: fingerprint, last committed row
+                           offset, committed log size, completion flag
+        dataset_<n>.jsonl  one JSON entry per committed row
+
+    The log is appended and fsynced before state.json is replaced, so the
+    state never points past data that reached the disk; anything after the
+    committed size is a torn tail and is cut off on resume.
+    """
+
+    def __init__(self, directory=CHECKPOINT_DIRECTORY, interval=CHECKPOINT_INTERVAL):
+        self.directory = Path(directory)
+        self.interval = interval
+        self.state_file = self.directory / 'state.json'
+        self.state = self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as infile:
+                state = json.load(infile)
+        except (FileNotFoundError, ValueError):
+            return {'format': CHECKPOINT_FORMAT, 'datasets': {}}
+        if state.get('format') != CHECKPOINT_FORMAT:
+            return {'format': CHECKPOINT_FORMAT, 'datasets': {}}
+        return state
+
+    def _save_state(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with atomic_output(self.state_file) as outfile:
+            json.dump(self.state, outfile, indent=2)
+
+    def _log_path(self, dataset):
+        return self.directory / f"dataset_{dataset}.jsonl"
+
+    def _entry(self, dataset, fingerprint):
+        """Checkpoint entry of a dataset, or None if missing or stale"""
+        entry = self.state['datasets'].get(str(dataset))
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry
+
+    def is_complete(self, dataset, fingerprint):
+        """Whether every row of a dataset is in the checkpoint"""
+        entry = self._entry(dataset, fingerprint)
+        return entry is not None and entry['complete']
+
+    def row_offset(self, dataset, fingerprint):
+        """Last committed row number of a dataset (0 = nothing committed)"""
+        entry = self._entry(dataset, fingerprint)
+        return entry['row_offset'] if entry is not None else 0
+
+    def committed(self, dataset, fingerprint):
+        """
+        Yield the committed entries of a dataset, in row order
+        """
+        entry = self._entry(dataset, fingerprint)
+        if entry is None or entry['log_bytes'] == 0:
+            return
+        with open(self._log_path(dataset), 'rb') as infile:
+            data = infile.read(entry['log_bytes'])
+        for line in data.splitlines():
+            yield json.loads(line)
+
+    def track(self, dataset, fingerprint, items, encode):
+        """
+        Log new rows of a dataset, committing every interval rows
+
+        A stale or missing checkpoint is reset first.
+
+        Args:
+            dataset: Dataset number
+            fingerprint: input_fingerprint() of the dataset
+            items: Iterable of (row_num, item) for the rows after the committed offset
+            encode: Function (row_num, item) -> JSON-serializable entry, or
+                None for rows that need no entry (they still advance the offset)
+        Yields:
+            The (row_num, item) pairs, unchanged, once they are logged
+        """
+        entry = self._entry(dataset, fingerprint)
+        if entry is None:
+            entry = {'fingerprint': fingerprint, 'row_offset': 0, 'log_bytes': 0, 'complete': False}
+            self.state['datasets'][str(dataset)] = entry
+            os.makedirs(self.directory, exist_ok=True)
+            open(self._log_path(dataset), 'wb').close()
+            self._save_state()
+
+        with open(self._log_path(dataset), 'r+b') as log:
+            log.truncate(entry['log_bytes'])  # Drop a torn tail
+            log.seek(entry['log_bytes'])
+            row_num = entry['row_offset']
+            pending = 0
+
+            for row_num, item in items:
+                value = encode(row_num, item)
+                if value is not None:
+                    log.write(json.dumps(value, ensure_ascii=False).encode('utf-8') + b'\n')
+                pending += 1
+                if pending >= self.interval:
+                    self._commit(log, entry, row_num)
+                    pending = 0
+                yield row_num, item
+
+            self._commit(log, entry, row_num, complete=True)
+
+    def _commit(self, log, entry, row_num, complete=False):
+        """Make the log durable, then move the committed offset forward"""
+        log.flush()
+        os.fsync(log.fileno())
+        entry['log_bytes'] = log.tell()
+        entry['row_offset'] = row_num
+        entry['complete'] = complete
+        self._save_state()
+
+    def clear(self):
+        """Remove the checkpoint (after a run completed)"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.state = {'format': CHECKPOINT_FORMAT, 'datasets': {}}
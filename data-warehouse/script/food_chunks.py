@@ -0,0 +1,123 @@
+import csv
+import io
+import mmap
+import os
+
+from food_compression import detect_codec
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+CHUNK_BYTES = 16 * 1024 * 1024  # Target size of one chunk handed to a worker
+MIN_PARALLEL_BYTES = 64 * 1024 * 1024  # Smaller files are processed serially
+
+# ===================================================================
+# RECORD-ALIGNED CHUNKS
+# ===================================================================
+
+def _record_end(data, record_start, target):
+    """
+    Offset just past the first record end at or after target
+
+    A newline ends a record only outside quotes. Starting from a known
+    record start (quote parity even), the quote parity at a newline is the
+    parity of the number of '"' bytes before it; escaped quotes ("") count
+    twice and do not change it.
+
+    Args:
+        data: mmap of the file
+        record_start: Offset of a record start (not inside quotes)
+        target: Offset at or after which the record should end
+    Returns:
+        Offset of the next record start, or len(data)
+    """
+    size = len(data)
+    quotes = 0
+    scanned = record_start
+    position = data.find(b'\n', max(target, record_start))
+    while position != -1:
+        quotes += data[scanned:position].count(b'"')
+        scanned = position
+        if quotes % 2 == 0:
+            return position + 1
+        position = data.find(b'\n', position + 1)
+    return size
+
+def _skip_rows(data, record_start, rows):
+    """
+    Offset just past the first rows non-blank records from record_start
+
+    Blank lines are not rows (csv.DictReader skips them), so they are
+    stepped over without being counted.
+
+    Returns:
+        Offset of the next record start, or len(data)
+    """
+    size = len(data)
+    while rows > 0 and record_start < size:
+        end = _record_end(data, record_start, record_start)
+        if data[record_start:end].rstrip(b'\r\n'):
+            rows -= 1
+        record_start = end
+    return record_start
+
+def split_records(input_file, chunk_bytes=CHUNK_BYTES, skip_rows=0, encoding='utf-8'):
+    """
+    Split a CSV file into byte ranges that start and end on record boundaries
+
+    Newlines inside quoted fields never split a range, so each range can be
+    parsed on its own and the ranges yield the file's records in order.
+
+    Args:
+        input_file: Path to an uncompressed CSV file
+        chunk_bytes: Approximate size of each range
+        skip_rows: Rows after the header left out of the ranges (already
+            processed by an interrupted run)
+        encoding: Text encoding of the file (ASCII-compatible)
+    Returns:
+        Tuple of (header fieldnames, list of (start, end) byte offsets)
+    """
+    if os.path.getsize(input_file) == 0:
+        return [], []
+
+    with open(input_file, 'rb') as infile, mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        header_end = _record_end(data, 0, 0)
+        header = next(csv.reader(io.StringIO(data[:header_end].decode(encoding), newline='')), [])
+
+        chunks = []
+        start = _skip_rows(data, header_end, skip_rows)
+        while start < len(data):
+            end = _record_end(data, start, start + chunk_bytes)
+            chunks.append((start, end))
+            start = end
+
+    return header, chunks
+
+def read_chunk_rows(input_file, start, end, fieldnames, encoding='utf-8'):
+    """
+    Parse the records of one byte range as dictionaries
+
+    Args:
+        input_file: Path to the CSV file
+        start, end: Byte range from split_records()
+        fieldnames: Header of the file
+        encoding: Text encoding of the file
+    Returns:
+        csv.DictReader over the range
+    """
+    with open(input_file, 'rb') as infile:
+        infile.seek(start)
+        text = infile.read(end - start).decode(encoding)
+    return csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames)
+
+def can_split(input_file, min_bytes=MIN_PARALLEL_BYTES):
+    """
+    Whether a file is worth (and able to be) processed in parallel chunks
+
+    Compressed files cannot be entered at a byte offset and are read serially.
+    """
+    try:
+        return os.path.getsize(input_file) >= min_bytes and detect_codec(input_file) is None
+    except OSError:
+        return False
@@ -0,0 +1,187 @@
+import bz2
+import codecs
+import gzip
+import io
+import lzma
+from contextlib import contextmanager
+
+from food_output import atomic_output
+
+# ===================================================================
+# CODECS
+# ===================================================================
+
+# File extension per codec (appended to output file names)
+CODEC_EXTENSIONS = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz',
+    'zstd': '.zst'
+}
+
+# Default compression level per codec
+DEFAULT_LEVELS = {
+    'gzip': 9,
+    'bz2': 9,
+    'xz': 6,
+    'zstd': 19
+}
+
+# Magic bytes used to recognise compressed inputs
+MAGIC_BYTES = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd')
+]
+
+def _zstandard():
+    """Import the optional zstandard package"""
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError("zstd compression needs the 'zstandard' package (pip install zstandard)") from None
+    return zstandard
+
+def compressed_file_name(output_file, codec):
+    """
+    Output file name with the codec extension added (if missing)
+
+    Args:
+        output_file: Uncompressed file name, e.g. 'combined_food_data.csv'
+        codec: Codec name or None
+    Returns:
+        e.g. 'combined_food_data.csv.gz'
+    """
+    if codec is None:
+        return output_file
+    if codec not in CODEC_EXTENSIONS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    extension = CODEC_EXTENSIONS[codec]
+    return output_file if str(output_file).endswith(extension) else f"{output_file}{extension}"
+
+def codec_for_path(file_path):
+    """
+    Codec implied by a file name's extension
+
+    Returns:
+        Codec name or None for an uncompressed file name
+    """
+    for codec, extension in CODEC_EXTENSIONS.items():
+        if str(file_path).endswith(extension):
+            return codec
+    return None
+
+def compress_stream(raw, codec, level=None):
+    """
+    Wrap a binary file in a streaming compressor
+
+    Closing the returned stream finishes the compressed data but leaves raw open.
+
+    Args:
+        raw: Binary file object opened for writing
+        codec: Codec name
+        level: Compression level (codec default if None)
+    Returns:
+        Binary file-like object
+    """
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == 'gzip':
+        # mtime=0 keeps identical builds byte-identical
+        return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level, mtime=0)
+    if codec == 'bz2':
+        return bz2.BZ2File(raw, mode='wb', compresslevel=level)
+    if codec == 'xz':
+        return lzma.LZMAFile(raw, mode='wb', preset=level)
+    if codec == 'zstd':
+        return _zstandard().ZstdCompressor(level=level).stream_writer(raw, closefd=False)
+    raise ValueError(f"Unknown compression codec: {codec}")
+
+def detect_codec(input_file):
+    """
+    Recognise the codec of a file from its first bytes
+
+    Returns:
+        Codec name or None for uncompressed data
+    """
+    with open(input_file, 'rb') as raw:
+        head = raw.read(8)
+    for magic, codec in MAGIC_BYTES:
+        if head.startswith(magic):
+            return codec
+    return None
+
+# ===================================================================
+# TEXT STREAMS
+# ===================================================================
+
+# Inputs without a configured encoding (see detect_encoding)
+ENCODING_SAMPLE_BYTES = 1024 * 1024  # Leading bytes checked for valid UTF-8
+FALLBACK_ENCODING = 'latin-1'  # Used when they are not valid UTF-8 (e.g. Excel exports)
+
+def _open_binary(input_file):
+    """Open a file for reading bytes, decompressing it transparently"""
+    codec = detect_codec(input_file)
+    if codec is None:
+        return open(input_file, 'rb')
+    if codec == 'gzip':
+        return gzip.open(input_file, 'rb')
+    if codec == 'bz2':
+        return bz2.open(input_file, 'rb')
+    if codec == 'xz':
+        return lzma.open(input_file, 'rb')
+    return _zstandard().open(input_file, 'rb')
+
+def open_input(input_file, encoding='utf-8', newline=None):
+    """
+    Open a text file for reading, decompressing it transparently
+
+    Args:
+        input_file: Path to a plain or compressed file
+        encoding: Text encoding (see detect_encoding for unknown ones)
+    Returns:
+        Text file object (close it, or use it in a with statement)
+    """
+    return io.TextIOWrapper(_open_binary(input_file), encoding=encoding, newline=newline)
+
+def detect_encoding(input_file, sample_bytes=ENCODING_SAMPLE_BYTES):
+    """
+    Guess the text encoding of a (possibly compressed) input file
+
+    The leading bytes are decoded as UTF-8; if they are not valid UTF-8,
+    the file is read as FALLBACK_ENCODING, which accepts any byte.
+
+    Returns:
+        'utf-8-sig' (UTF-8 with a byte order mark), 'utf-8' or FALLBACK_ENCODING
+    """
+    with _open_binary(input_file) as raw:
+        sample = raw.read(sample_bytes)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # A character cut off at the end of the sample is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+    return 'utf-8'
+
+@contextmanager
+def open_output(output_file, codec=None, level=None, encoding='utf-8', newline=''):
+    """
+    Open a text file for writing, compressing it as a stream
+
+    The file is written atomically (see food_output.atomic_output).
+
+    Args:
+        output_file: Final path (add the extension with compressed_file_name())
+        codec: None for plain text, or 'gzip', 'bz2', 'xz', 'zstd'
+        level: Compression level (codec default if None)
+    """
+    if codec is None:
+        with atomic_output(output_file, encoding=encoding, newline=newline) as outfile:
+            yield outfile
+        return
+
+    with atomic_output(output_file, 'wb') as raw:
+        with io.TextIOWrapper(compress_stream(raw, codec, level), encoding=encoding, newline=newline) as outfile:
+            yield outfile
@@ -0,0 +1,103 @@
+import re
+
+from food_rules import load_rules
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+DEFAULT_CATEGORY = 'Alimentos'  # Category of foods that match no keyword
+MISSING_VALUES = ('NA', 'TR', '')  # Cells read as "not reported" (Tr = trace)
+
+# ===================================================================
+# SHARED RULES
+# ===================================================================
+
+# Unit configurations, category keywords and per-food overrides live in
+# unit_rules.json and are compiled once into shared lookup tables
+RULES = load_rules()
+UNIT_CONVERSIONS_DATABASE = RULES.unit_configs
+
+# ===================================================================
+# ROW HELPERS (shared by both converters)
+# ===================================================================
+
+def safe_float(value):
+    """
+    Safely convert a value to float, handling NA, Tr (trace), and empty values
+
+    Args:
+        value: String value from CSV
+    Returns:
+        Float value or None if invalid
+    """
+    if not value or value.upper() in MISSING_VALUES:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def name_words(food_name):
+    """
+    Canonical words of a food name (accents folded, synonyms rewritten)
+    Computed once per row for both the category lookup and the alias key
+    """
+    return RULES.synonyms.canonical_words(food_name)
+
+def categorize_food(food_name, default_category=DEFAULT_CATEGORY, words=None):
+    """
+    Categorize food based on keywords in the name
+    Keywords are defined per category in the rules file
+
+    Args:
+        food_name: Name of the food item
+        default_category: Category of foods that match no keyword
+        words: name_words() of the name if already computed
+    Returns:
+        Category string for display
+    """
+    return RULES.categorize(food_name, default_category, words)
+
+def get_unit_config(food_name, category):
+    """
+    Get the appropriate unit configuration based on food name and category
+    Per-food overrides from the rules file take precedence over the category
+
+    Args:
+        food_name: Name of the food item
+        category: Category of the food
+    Returns:
+        Dictionary with defaultUnit, units list, and conversions
+    """
+    return RULES.unit_config(food_name, category)
+
+def generate_id_from_name(food_name):
+    """
+    Generate a snake_case ID from a food name ('Arroz, integral, cozido' -> 'arroz_integral_cozido')
+    """
+    name_clean = re.sub(r'[^\w\s]', '', food_name.lower())  # Remove special chars
+    name_clean = re.sub(r'\s+', '_', name_clean)  # Replace spaces with _
+    name_clean = re.sub(r'_+', '_', name_clean)  # Replace multiple _ with single _
+    name_clean = name_clean.strip('_')  # Remove leading/trailing _
+    return name_clean if name_clean else 'food_item'
+
+def generate_unique_id(food_name, used_ids):
+    """
+    Generate a unique snake_case ID from food name
+    Handles duplicates by appending numbers
+
+    Args:
+        food_name: Original food name
+        used_ids: Set of already used IDs (updated)
+    Returns:
+        Unique snake_case ID string
+    """
+    base_id = generate_id_from_name(food_name)
+    final_id = base_id
+    counter = 1
+    while final_id in used_ids:
+        final_id = f"{base_id}_{counter}"
+        counter += 1
+    used_ids.add(final_id)
+    return final_id
@@ -0,0 +1,205 @@
+import re
+import unicodedata
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Minimum share of the shorter name's tokens found in the other name (0..1);
+# the names must also name the same preparation (cru/cozido/assado...)
+NAME_SIMILARITY_THRESHOLD = 0.8
+
+# Maximum mean relative difference between shared macronutrients (0..1)
+NUTRIENT_DISTANCE_THRESHOLD = 0.25
+
+# Nutrients compared for the distance (keys of nutritionPer100g)
+DISTANCE_NUTRIENTS = ['calories', 'protein', 'fat', 'carbs']
+
+# Blocks larger than this are not scanned (very common tokens such as 'cru')
+MAX_BLOCK_SIZE = 200
+
+# Words that carry no identity ('Feijão, de corda' == 'Feijão corda')
+STOPWORDS = {'de', 'do', 'da', 'dos', 'das', 'e', 'com', 'sem', 'em', 'a', 'o', 'ao', 'na', 'no'}
+
+# ===================================================================
+# NAME NORMALIZATION
+# ===================================================================
+
+def fold_accents(text):
+    """
+    Lowercase and strip accents ('Feijão' -> 'feijao')
+
+    Args:
+        text: Any string
+    Returns:
+        Accent-folded lowercase string
+    """
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+def name_tokens(food_name):
+    """
+    Split a food name into its set of accent-folded tokens
+
+    Args:
+        food_name: Name of the food item
+    Returns:
+        Frozenset of tokens without stopwords
+    """
+    words = re.findall(r'\w+', fold_accents(food_name))
+    return frozenset(word for word in words if word not in STOPWORDS)
+
+def token_set_similarity(tokens_a, tokens_b):
+    """
+    Share of the smaller token set found in the larger one
+    'Amendoim cru' vs 'Amendoim, grão, cru' -> 1.0
+
+    A short name contained in a longer one scores 1.0, so the preparation
+    and nutrient checks are what keep 'Repolho cru' and 'Repolho, roxo, cru'
+    apart when they differ.
+
+    Returns:
+        Similarity between 0 and 1
+    """
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / min(len(tokens_a), len(tokens_b))
+
+def preparation_states(tokens, states):
+    """
+    Preparation states named by a token set ({'cru'}, {'cozido'}, or empty)
+
+    Args:
+        tokens: Accent-folded tokens of a name
+        states: Dictionary of preparation word -> state
+    """
+    return frozenset(states[token] for token in tokens if token in states)
+
+def nutrient_distance(nutrients_a, nutrients_b):
+    """
+    Mean relative difference over the macronutrients both foods report
+
+    Returns:
+        Distance between 0 and 1, or None if nothing can be compared
+    """
+    differences = []
+    for name in DISTANCE_NUTRIENTS:
+        value_a = nutrients_a.get(name)
+        value_b = nutrients_b.get(name)
+        if value_a is None or value_b is None:
+            continue
+        scale = max(abs(value_a), abs(value_b), 1.0)
+        differences.append(abs(value_a - value_b) / scale)
+
+    if not differences:
+        return None
+    return sum(differences) / len(differences)
+
+# ===================================================================
+# DUPLICATE INDEX
+# ===================================================================
+
+class DuplicateIndex:
+    """
+    Blocked index of foods from earlier datasets
+
+    Each food is filed under its leading token and its rarest token, so a
+    lookup only scores the few foods sharing a block instead of every food.
+    """
+
+    def __init__(self):
+        # Imported here: food_preparation depends on this module through food_aliases
+        from food_preparation import PREPARATION_STATES
+
+        self.states = PREPARATION_STATES
+        self.blocks = {}  # token -> list of entry positions
+        self.token_counts = {}  # token -> number of foods containing it
+        self.entries = []  # (food_id, tokens, preparation states, nutrients)
+        self.ids = set()
+
+    def add(self, food_id, food_name, nutrients):
+        """
+        Add one food to the index (foods already indexed are ignored)
+
+        Args:
+            food_id: Final ID of the food
+            food_name: Name of the food item
+            nutrients: Dictionary of nutrient name -> value (nutritionPer100g)
+        """
+        tokens = name_tokens(food_name)
+        if not tokens or food_id in self.ids:
+            return
+
+        self.ids.add(food_id)
+        position = len(self.entries)
+        self.entries.append((food_id, tokens, preparation_states(tokens, self.states), nutrients))
+
+        for token in tokens:
+            self.token_counts[token] = self.token_counts.get(token, 0) + 1
+        for token in self._block_keys(food_name, tokens):
+            self.blocks.setdefault(token, []).append(position)
+
+    def add_rows(self, rows):
+        """
+        Add converted records (dictionary of id -> FoodRecord) to the index
+        """
+        for food_id, record in rows.items():
+            if food_id not in self.ids:
+                nutrients = {name: record.nutrient(name) for name in DISTANCE_NUTRIENTS}
+                self.add(food_id, record.name, nutrients)
+
+    def _block_keys(self, food_name, tokens):
+        """
+        Leading token plus the rarest token seen so far
+        """
+        words = [word for word in re.findall(r'\w+', fold_accents(food_name)) if word not in STOPWORDS]
+        keys = {words[0]} if words else set()
+        keys.add(min(tokens, key=lambda token: (self.token_counts.get(token, 0), token)))
+        return keys
+
+    def find(self, food_name, nutrients):
+        """
+        Find the most likely duplicate of a food among the indexed foods
+
+        Args:
+            food_name: Name of the food item
+            nutrients: Dictionary of nutrient name -> value
+        Returns:
+            Tuple of (food_id, name_similarity, nutrient_distance) or None
+        """
+        tokens = name_tokens(food_name)
+        if not tokens:
+            return None
+        states = preparation_states(tokens, self.states)
+
+        # Step 1: Gather candidates from the blocks this name falls into
+        candidates = set()
+        for token in tokens:
+            block = self.blocks.get(token)
+            if block and len(block) <= MAX_BLOCK_SIZE:
+                candidates.update(block)
+
+        # Step 2: Score candidates by name, then confirm with nutrients
+        best = None
+        for position in candidates:
+            food_id, candidate_tokens, candidate_states, candidate_nutrients = self.entries[position]
+            if candidate_states != states:
+                continue  # Raw and cooked forms of a food are different foods
+            similarity = token_set_similarity(tokens, candidate_tokens)
+            if similarity < NAME_SIMILARITY_THRESHOLD:
+                continue
+
+            distance = nutrient_distance(nutrients, candidate_nutrients)
+            if distance is None or distance > NUTRIENT_DISTANCE_THRESHOLD:
+                continue
+
+            # Prefer higher name similarity, then the name with fewer extra
+            # words, then closer nutrients, then earlier foods
+            extra = len(tokens ^ candidate_tokens)
+            score = (-similarity, extra, distance, position)
+            if best is None or score < best[0]:
+                best = (score, food_id, similarity, distance)
+
+        if best is None:
+            return None
+        return best[1], round(best[2], 3), round(best[3], 3)
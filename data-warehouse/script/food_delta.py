@@ -0,0 +1,226 @@
+import argparse
+import csv
+import hashlib
+import json
+
+from food_compression import codec_for_path, open_input, open_output
+
+# ===================================================================
+# ROW HASHING
+# ===================================================================
+
+CHANGESET_FORMAT = 1
+
+def row_hash(row, fieldnames):
+    """
+    Hash one output row (all fields, in column order)
+
+    Args:
+        row: Dictionary of field -> value (values are compared as strings)
+        fieldnames: Column order
+    Returns:
+        Hex digest string
+    """
+    joined = '\x1f'.join(str(row.get(field, '')) for field in fieldnames)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+def content_hash(row_hashes):
+    """
+    Order-independent hash of a whole build
+
+    Args:
+        row_hashes: Iterable of row hashes
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    for value in sorted(row_hashes):
+        digest.update(value.encode('ascii'))
+    return digest.hexdigest()
+
+def load_build(build_file):
+    """
+    Load a previous warehouse build
+
+    Args:
+        build_file: Path to the output CSV of an earlier run (may be compressed)
+    Returns:
+        Tuple of (fieldnames, dictionary of id -> row)
+    """
+    with open_input(build_file, newline='') as infile:
+        reader = csv.DictReader(infile)
+        rows = {row['id']: row for row in reader}
+        return reader.fieldnames, rows
+
+# ===================================================================
+# DIFF
+# ===================================================================
+
+class ChangesetBuilder:
+    """
+    Compare a new build against a previous one, row by row as it is written
+
+    The previous build is hashed once into id -> hash (a hash join), so
+    each new row costs one dictionary lookup instead of a scan.
+    """
+
+    def __init__(self, previous_rows, fieldnames):
+        """
+        Args:
+            previous_rows: Dictionary of id -> row from the previous build
+            fieldnames: Column order of the new build
+        """
+        self.fieldnames = fieldnames
+        self.previous_rows = previous_rows
+        self.previous_hashes = {food_id: row_hash(row, fieldnames) for food_id, row in previous_rows.items()}
+        self.new_hashes = []
+        self.seen = set()
+        self.inserted = []
+        self.updated = []
+
+    def add(self, row):
+        """
+        Compare one row of the new build
+
+        Args:
+            row: Output row (dictionary)
+        """
+        food_id = row['id']
+        new_hash = row_hash(row, self.fieldnames)
+        self.new_hashes.append(new_hash)
+        self.seen.add(food_id)
+
+        old_hash = self.previous_hashes.get(food_id)
+        if old_hash is None:
+            self.inserted.append([str(row.get(field, '')) for field in self.fieldnames])
+        elif old_hash != new_hash:
+            old_row = self.previous_rows[food_id]
+            changes = {
+                field: str(row.get(field, ''))
+                for field in self.fieldnames
+                if str(row.get(field, '')) != old_row.get(field, '')
+            }
+            self.updated.append({'id': food_id, 'fields': changes})
+
+    def changeset(self):
+        """
+        Build the changeset once every new row was added
+
+        Returns:
+            Changeset dictionary (JSON-serializable)
+        """
+        deleted = [food_id for food_id in self.previous_rows if food_id not in self.seen]
+        return {
+            'format': CHANGESET_FORMAT,
+            'fieldnames': self.fieldnames,
+            'base_hash': content_hash(self.previous_hashes.values()),
+            'target_hash': content_hash(self.new_hashes),
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'deleted': deleted
+        }
+
+def write_changeset(changeset, changeset_file):
+    """Write a changeset as compact JSON"""
+    with open(changeset_file, 'w', encoding='utf-8') as outfile:
+        json.dump(changeset, outfile, ensure_ascii=False, separators=(',', ':'))
+
+def diff_builds(previous_file, new_file):
+    """
+    Compute the changeset between two build files
+
+    Returns:
+        Changeset dictionary
+    """
+    _, previous_rows = load_build(previous_file)
+    fieldnames, new_rows = load_build(new_file)
+    builder = ChangesetBuilder(previous_rows, fieldnames)
+    for row in new_rows.values():
+        builder.add(row)
+    return builder.changeset()
+
+# ===================================================================
+# APPLY
+# ===================================================================
+
+def apply_changeset(previous_file, changeset_file, output_file):
+    """
+    Patch a previous build with a changeset
+
+    Kept rows stay in their previous order; inserted rows are appended.
+    The result is checked against the changeset's target hash.
+
+    Args:
+        previous_file: Path to the build the changeset was made against
+        changeset_file: Path to the changeset JSON
+        output_file: Path for the patched build
+    Returns:
+        Number of rows in the patched build
+    """
+    with open(changeset_file, 'r', encoding='utf-8') as infile:
+        changeset = json.load(infile)
+    if changeset.get('format') != CHANGESET_FORMAT:
+        raise ValueError(f"Unsupported changeset format: {changeset.get('format')}")
+
+    fieldnames = changeset['fieldnames']
+    _, rows = load_build(previous_file)
+
+    if content_hash(row_hash(row, fieldnames) for row in rows.values()) != changeset['base_hash']:
+        raise ValueError(f"{previous_file} is not the build this changeset was made against")
+
+    # Step 1: Deletions and per-field updates
+    for food_id in changeset['deleted']:
+        rows.pop(food_id, None)
+    for update in changeset['updated']:
+        rows[update['id']].update(update['fields'])
+
+    # Step 2: Insertions
+    for values in changeset['inserted']:
+        row = dict(zip(fieldnames, values))
+        rows[row['id']] = row
+
+    if content_hash(row_hash(row, fieldnames) for row in rows.values()) != changeset['target_hash']:
+        raise ValueError("Patched build does not match the changeset target")
+
+    with open_output(output_file, codec_for_path(output_file)) as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows.values())
+
+    return len(rows)
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff warehouse builds and apply changesets")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = commands.add_parser('diff', help="Write the changeset between two builds")
+    diff_parser.add_argument('previous_file')
+    diff_parser.add_argument('new_file')
+    diff_parser.add_argument('changeset_file')
+
+    apply_parser = commands.add_parser('apply', help="Patch a previous build with a changeset")
+    apply_parser.add_argument('previous_file')
+    apply_parser.add_argument('changeset_file')
+    apply_parser.add_argument('output_file')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'diff':
+            changeset = diff_builds(args.previous_file, args.new_file)
+            write_changeset(changeset, args.changeset_file)
+            print(f"✓ Changeset saved to: {args.changeset_file}")
+            print(f"  • Inserted: {len(changeset['inserted'])}")
+            print(f"  • Updated: {len(changeset['updated'])}")
+            print(f"  • Deleted: {len(changeset['deleted'])}")
+        else:
+            total = apply_changeset(args.previous_file, args.changeset_file, args.output_file)
+            print(f"✓ Patched build saved to: {args.output_file} ({total} entries)")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import json
+from array import array
+from pathlib import Path
+
+from food_output import atomic_output
+from food_record import MISSING, NUTRIENT_INDEX
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Reference intake tables (Daily Values) and the NRF score definition
+REFERENCE_INTAKES_FILE = Path(__file__).with_name('reference_intakes.json')
+
+DENSITY_FILE = 'nutrient_density.csv'  # One row per food and unit
+DV_DECIMALS = 1  # Rounding of %DV and score columns
+BLOCK_FOODS = 10000  # Foods whose rows are computed together (bounds memory)
+
+# ===================================================================
+# REFERENCE INTAKES
+# ===================================================================
+
+class ReferenceIntakes:
+    """
+    One reference intake table and the NRF score definition
+    """
+
+    def __init__(self, document, table=None):
+        """
+        Args:
+            document: Parsed reference intakes file
+            table: Table name (the file's default_table if None)
+        Raises:
+            ValueError for an unknown table or nutrient
+        """
+        table = table or document['default_table']
+        if table not in document['tables']:
+            raise ValueError(f"Unknown reference intake table: {table} "
+                             f"(available: {', '.join(document['tables'])})")
+        self.table = table
+        self.intakes = document['tables'][table]['intakes']
+        nrf = document['nrf']
+        self.basis_kcal = nrf['basis_kcal']
+        self.encourage = nrf['encourage']
+        self.limit = nrf['limit']
+        for nutrient in list(self.intakes) + self.encourage + self.limit:
+            if nutrient not in NUTRIENT_INDEX:
+                raise ValueError(f"Reference intakes: unknown nutrient '{nutrient}'")
+        missing = [nutrient for nutrient in self.encourage + self.limit if nutrient not in self.intakes]
+        if missing:
+            raise ValueError(f"Table '{table}' has no intake for NRF nutrient(s): {', '.join(missing)}")
+
+    @classmethod
+    def load(cls, intakes_file=REFERENCE_INTAKES_FILE, table=None):
+        with open(intakes_file, 'r', encoding='utf-8') as infile:
+            return cls(json.load(infile), table)
+
+# ===================================================================
+# DENSITY TABLE
+# ===================================================================
+
+# Correctly rounded like round(value, DV_DECIMALS), in a single formatting call
+_DV_FORMAT = f"%.{DV_DECIMALS}f"
+
+def _cell(value):
+    return 'NULL' if value != value else _DV_FORMAT % value
+
+class DensityTable:
+    """
+    NRF scores and %DV per portion, for every food and every unit
+
+    Foods are added while the output is written, as nutrient columns
+    (one array('d') per reference nutrient). finish() then works column by
+    column: %DV per 100g is value / intake x 100 for the whole column,
+    the NRF score per basis_kcal sums the capped %DV of the encouraged
+    nutrients (missing = 0) and subtracts the %DV of the limited ones.
+    Every unit of a food scales its %DV column by grams / 100; write()
+    expands the columns to one entry per (food, unit) and formats them a
+    column at a time, a block of foods at a time.
+    """
+
+    def __init__(self, reference):
+        """
+        Args:
+            reference: ReferenceIntakes
+        """
+        self.reference = reference
+        self.nutrients = list(reference.intakes)
+        self.ids = []
+        self.unit_configs = []
+        self.columns = {nutrient: array('d') for nutrient in self.nutrients}
+        self.energy = array('d')
+
+    def add(self, record):
+        """Add one food (FoodRecord)"""
+        nutrients = record.nutrients
+        self.ids.append(record.id)
+        self.unit_configs.append(record.unit_config)
+        for nutrient, column in self.columns.items():
+            column.append(nutrients[NUTRIENT_INDEX[nutrient]])
+        self.energy.append(nutrients[NUTRIENT_INDEX['calories']])
+
+    def percent_dv(self):
+        """
+        %DV per 100g
+
+        Returns:
+            Dictionary of nutrient -> array('d') (NaN where not reported)
+        """
+        return {
+            nutrient: array('d', [value * 100.0 / self.reference.intakes[nutrient] for value in column])
+            for nutrient, column in self.columns.items()
+        }
+
+    def nrf_scores(self, percent):
+        """
+        NRF score per basis_kcal of every food
+
+        Args:
+            percent: Result of percent_dv()
+        Returns:
+            array('d') (NaN for foods without energy)
+        """
+        basis = self.reference.basis_kcal
+        # Per-100g %DV -> per basis_kcal: x basis / kcal per 100g
+        scale = array('d', [basis / kcal if kcal == kcal and kcal > 0 else MISSING for kcal in self.energy])
+        scores = array('d', [0.0] * len(scale))
+        for nutrient in self.reference.encourage:
+            scores = array('d', [
+                score + (0.0 if value != value else min(100.0, value * factor))
+                for score, value, factor in zip(scores, percent[nutrient], scale)
+            ])
+        for nutrient in self.reference.limit:
+            scores = array('d', [
+                score - (0.0 if value != value else value * factor)
+                for score, value, factor in zip(scores, percent[nutrient], scale)
+            ])
+        return array('d', [score if factor == factor else MISSING for score, factor in zip(scores, scale)])
+
+    def fieldnames(self):
+        return ['id', 'unit', 'grams', 'default_unit', 'nrf_score'] + \
+            [f"dv_{nutrient}_pct" for nutrient in self.nutrients]
+
+    def unit_rows(self, start, stop):
+        """
+        Expand foods start..stop to one entry per (food, unit), in output order
+
+        Returns:
+            Tuple of lists (food position, unit, grams, 1 if default unit else 0)
+        """
+        positions, units, grams, defaults = [], [], [], []
+        expanded = {}  # id(unit config) -> its (units, grams, defaults), shared by many foods
+        for position in range(start, stop):
+            unit_config = self.unit_configs[position]
+            entry = expanded.get(id(unit_config))
+            if entry is None:
+                conversions = unit_config['conversions']
+                entry = (list(conversions), list(conversions.values()),
+                         [int(unit == unit_config['defaultUnit']) for unit in conversions])
+                expanded[id(unit_config)] = entry
+            positions.extend([position] * len(entry[0]))
+            units.extend(entry[0])
+            grams.extend(entry[1])
+            defaults.extend(entry[2])
+        return positions, units, grams, defaults
+
+    def write(self, density_file=DENSITY_FILE):
+        """
+        Compute every column and write one row per food and unit (atomically)
+
+        Returns:
+            Number of rows written
+        """
+        percent = self.percent_dv()
+        scores = self.nrf_scores(percent)
+        columns = [percent[nutrient] for nutrient in self.nutrients]
+        written = 0
+        with atomic_output(density_file) as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(self.fieldnames())
+            for start in range(0, len(self.ids), BLOCK_FOODS):
+                stop = min(start + BLOCK_FOODS, len(self.ids))
+                positions, units, grams, defaults = self.unit_rows(start, stop)
+                entries = list(zip(positions, [value / 100.0 for value in grams]))
+
+                # Each %DV column scaled and formatted (as _cell does) in one
+                # pass over the block's (food, unit) entries
+                cells = [['NULL' if (value := column[position] * factor) != value else _DV_FORMAT % value
+                          for position, factor in entries]
+                         for column in columns]
+                score_cells = list(map(_cell, scores[start:stop]))
+                writer.writerows(zip([self.ids[position] for position in positions], units, grams, defaults,
+                                     [score_cells[position - start] for position in positions], *cells))
+                written += len(positions)
+        return written
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    from food_recipes import load_warehouse_foods
+
+    parser = argparse.ArgumentParser(description="Compute NRF scores and %DV per unit for a warehouse file")
+    parser.add_argument('warehouse_file', help="Output of a converter (full schema)")
+    parser.add_argument('density_file', nargs='?', default=DENSITY_FILE, help="CSV file to write")
+    parser.add_argument('--table', help="Reference intake table (default: the file's default_table)")
+    parser.add_argument('--intakes', default=REFERENCE_INTAKES_FILE, help="Reference intakes file")
+    args = parser.parse_args()
+
+    try:
+        table = DensityTable(ReferenceIntakes.load(args.intakes, args.table))
+        for record in load_warehouse_foods(args.warehouse_file).values():
+            table.add(record)
+        written = table.write(args.density_file)
+        print(f"✓ {written} rows ({len(table.ids)} foods, table '{table.reference.table}') "
+              f"saved to: {args.density_file}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
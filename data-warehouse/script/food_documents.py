@@ -0,0 +1,209 @@
+import argparse
+import json
+from json.encoder import encode_basestring
+
+from food_compression import compressed_file_name, open_output
+from food_record import NUTRIENT_KEYS, PassthroughRecord
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+JSON_FORMATS = {
+    'ndjson': '.ndjson',  # One document per line
+    'json': '.json'  # One JSON array of documents
+}
+
+UNIT_DECIMALS = 2  # Rounding of the per-unit nutrient values
+
+# ===================================================================
+# DOCUMENT ENCODING
+# ===================================================================
+
+def json_export_file_name(output_file, json_format):
+    """
+    Export file name next to a CSV output ('combined_food_data.csv' -> 'combined_food_data.ndjson')
+    """
+    if json_format not in JSON_FORMATS:
+        raise ValueError(f"Unknown JSON export format: {json_format} (use 'ndjson' or 'json')")
+    stem = str(output_file)
+    if stem.endswith('.csv'):
+        stem = stem[:-4]
+    return stem + JSON_FORMATS[json_format]
+
+_number = float.__repr__  # JSON text of a finite float, as json.dumps writes it
+
+def _portion(value):
+    """portion_g as a JSON number (passthrough cells hold it as text)"""
+    if isinstance(value, str):
+        try:
+            return json.dumps(float(value)) if '.' in value else json.dumps(int(value))
+        except ValueError:
+            return encode_basestring(value)
+    return json.dumps(value)
+
+class DocumentEncoder:
+    """
+    Encode FoodRecords as JSON documents with native nested objects
+
+    {"id": ..., "name": ..., "portion_g": 100, "category": ..., "source_pdf": ...,
+     "page": ..., "notes": ..., "defaultUnit": "100g", "units": [...],
+     "unitConversions": {...}, "nutritionPer100g": {...},
+     "nutritionPerUnit": {"xícara": {"grams": 200, "nutrients": {...}}, ...}}
+
+    Documents are assembled from text fragments instead of going through
+    json.dumps of a nested dictionary: the units and conversions of each
+    unit configuration are encoded once and shared, strings use the C
+    string encoder, and numbers are written with repr(). Passthrough rows
+    embed their JSON cells as read.
+    """
+
+    def __init__(self, decimals=UNIT_DECIMALS):
+        self.precision = 10 ** decimals
+        self._configs = {}  # id(unit_config) -> (config, units JSON, conversions JSON, [(unit block prefix, scale, divisor)])
+        self._keys = [encode_basestring(key) + ':' for key in NUTRIENT_KEYS]
+
+    def _config(self, unit_config):
+        cached = self._configs.get(id(unit_config))
+        if cached is None or cached[0] is not unit_config:
+            conversions = unit_config['conversions']
+            cached = (
+                unit_config,
+                json.dumps(unit_config['units'], ensure_ascii=False),
+                json.dumps(conversions, ensure_ascii=False),
+                [(encode_basestring(unit) + ':{"grams":' + json.dumps(grams) + ',"nutrients":{',
+                  grams / 100.0 * self.precision, float(self.precision))
+                 for unit, grams in conversions.items()]
+            )
+            self._configs[id(unit_config)] = cached
+        return cached
+
+    def encode(self, record):
+        """
+        Encode one food
+
+        Args:
+            record: FoodRecord (or PassthroughRecord)
+        Returns:
+            JSON text of the document (one line)
+        """
+        _, units_json, conversions_json, unit_blocks = self._config(record.unit_config)
+        keys = []
+        values = []
+        for key, value in zip(self._keys, record.nutrients):
+            if value == value:
+                keys.append(key)
+                values.append(value)
+
+        if isinstance(record, PassthroughRecord):
+            # Cells from an already-converted table are valid JSON as they are
+            cells = record.cells
+            units_json = cells['units'] or units_json
+            conversions_json = cells['unitConversions'] or conversions_json
+            nutrition_json = cells['nutritionPer100g'] or '{}'
+        else:
+            nutrition_json = '{' + ','.join(map(str.__add__, keys, map(_number, values))) + '}'
+
+        # Per unit: value x grams / 100, rounded half up to UNIT_DECIMALS in
+        # one multiplication; formatting runs in map() over whole blocks
+        per_unit = ','.join(
+            prefix + ','.join(map(str.__add__, keys, map(
+                _number, [(value * scale + 0.5) // 1 / divisor for value in values]
+            ))) + '}}'
+            for prefix, scale, divisor in unit_blocks
+        )
+        return ''.join((
+            '{"id":', encode_basestring(record.id),
+            ',"name":', encode_basestring(record.name),
+            ',"portion_g":', _portion(record.portion_g),
+            ',"category":', encode_basestring(record.category or ''),
+            ',"source_pdf":', encode_basestring(record.source_pdf or ''),
+            ',"page":', encode_basestring(str(record.page or '')),
+            ',"notes":', encode_basestring(record.notes or ''),
+            ',"defaultUnit":', encode_basestring(record.unit_config['defaultUnit']),
+            ',"units":', units_json,
+            ',"unitConversions":', conversions_json,
+            ',"nutritionPer100g":', nutrition_json,
+            ',"nutritionPerUnit":{', per_unit, '}}'
+        ))
+
+# ===================================================================
+# STREAMING WRITER
+# ===================================================================
+
+class DocumentWriter:
+    """
+    Stream food documents to an NDJSON file or a JSON array file
+
+    Written atomically and compressed as a stream if a codec is given
+    (see food_compression.open_output).
+
+    Usage:
+        with DocumentWriter('foods.ndjson') as documents:
+            for record in records:
+                documents.write(record)
+    """
+
+    def __init__(self, export_file, json_format='ndjson', codec=None, level=None):
+        """
+        Args:
+            export_file: File name (the codec extension is added)
+            json_format: 'ndjson' or 'json'
+            codec: Output compression codec or None
+            level: Compression level (codec default if None)
+        """
+        if json_format not in JSON_FORMATS:
+            raise ValueError(f"Unknown JSON export format: {json_format} (use 'ndjson' or 'json')")
+        self.export_file = compressed_file_name(export_file, codec)
+        self.json_format = json_format
+        self.codec = codec
+        self.level = level
+        self.encoder = DocumentEncoder()
+        self.count = 0
+        self._context = None
+        self._outfile = None
+
+    def __enter__(self):
+        self._context = open_output(self.export_file, self.codec, self.level)
+        self._outfile = self._context.__enter__()
+        if self.json_format == 'json':
+            self._outfile.write('[')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.json_format == 'json':
+            self._outfile.write('\n]\n' if self.count else ']\n')
+        return self._context.__exit__(exc_type, exc_value, traceback)
+
+    def write(self, record):
+        """Append the document of one food"""
+        document = self.encoder.encode(record)
+        if self.json_format == 'json':
+            self._outfile.write(('\n' if not self.count else ',\n') + document)
+        else:
+            self._outfile.write(document + '\n')
+        self.count += 1
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    from food_recipes import load_warehouse_foods
+
+    parser = argparse.ArgumentParser(description="Export a converted warehouse file as JSON documents")
+    parser.add_argument('warehouse_file', help="Output of a converter (full schema)")
+    parser.add_argument('export_file', nargs='?', help="Output file (default: next to the input)")
+    parser.add_argument('--format', choices=sorted(JSON_FORMATS), default='ndjson', help="Document layout")
+    args = parser.parse_args()
+
+    try:
+        export_file = args.export_file or json_export_file_name(args.warehouse_file, args.format)
+        with DocumentWriter(export_file, args.format) as documents:
+            for record in load_warehouse_foods(args.warehouse_file).values():
+                documents.write(record)
+        print(f"✓ {documents.count} documents saved to: {documents.export_file}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
@@ -0,0 +1,109 @@
+import csv
+import json
+
+from food_output import atomic_output
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+MAX_ERROR_RATE = 0.05  # Abort a dataset when more than 5% of its rows fail
+MIN_ROWS_FOR_RATE = 100  # ...but only judge the rate after this many rows
+MAX_ROW_ERRORS = None  # Optional absolute limit per dataset (None = no limit)
+
+# ===================================================================
+# ROW ERRORS
+# ===================================================================
+
+DEAD_LETTER_FIELDNAMES = ['dataset', 'file', 'row_num', 'error', 'row']
+
+class RowError:
+    """
+    A source row that could not be transformed
+
+    Takes the place of the transformed row, so it travels through the same
+    pipeline (worker processes, checkpoints) and is handled in row order.
+    """
+
+    __slots__ = ('message', 'row')
+
+    def __init__(self, message, row):
+        """
+        Args:
+            message: Description of the failure
+            row: The raw source row (dictionary)
+        """
+        self.message = message
+        self.row = row
+
+    @classmethod
+    def from_exception(cls, error, row):
+        return cls(f"{type(error).__name__}: {error}", row)
+
+class ErrorBudgetExceeded(Exception):
+    """Raised when a dataset has more failing rows than the thresholds allow"""
+
+class RowErrorLog:
+    """
+    Collect failing rows for the dead-letter file and enforce error thresholds
+    """
+
+    def __init__(self, max_error_rate=MAX_ERROR_RATE, min_rows=MIN_ROWS_FOR_RATE,
+                 max_errors=MAX_ROW_ERRORS):
+        """
+        Args:
+            max_error_rate: Largest tolerated share of failing rows per dataset
+            min_rows: Rows a dataset must have before the rate is judged
+            max_errors: Optional absolute limit of failing rows per dataset
+        """
+        self.max_error_rate = max_error_rate
+        self.min_rows = min_rows
+        self.max_errors = max_errors
+        self.entries = []
+        self.counts = {}
+
+    def add(self, dataset, input_file, row_num, error):
+        """
+        Record a failing row and check the thresholds
+
+        Args:
+            dataset: Dataset number (or label)
+            input_file: Path of the input file
+            row_num: Row number in the input file
+            error: RowError
+        Raises:
+            ErrorBudgetExceeded if the dataset is over its limits
+        """
+        self.entries.append((dataset, input_file, row_num, error.message, error.row))
+        self.counts[dataset] = self.counts.get(dataset, 0) + 1
+        self.check(dataset, row_num)
+
+    def check(self, dataset, rows_seen):
+        """
+        Raise ErrorBudgetExceeded if a dataset is over its limits
+
+        Args:
+            dataset: Dataset number (or label)
+            rows_seen: Rows of the dataset read so far
+        """
+        errors = self.counts.get(dataset, 0)
+        if self.max_errors is not None and errors > self.max_errors:
+            raise ErrorBudgetExceeded(f"{errors} failing rows (limit {self.max_errors})")
+        if rows_seen >= self.min_rows and errors / rows_seen > self.max_error_rate:
+            raise ErrorBudgetExceeded(
+                f"{errors} of {rows_seen} rows failed ({errors / rows_seen:.1%}, "
+                f"limit {self.max_error_rate:.1%})"
+            )
+
+    def write(self, dead_letter_file):
+        """
+        Write every failing row to the dead-letter CSV (atomically)
+
+        The raw row is kept as JSON so it can be fixed and fed back in.
+        """
+        with atomic_output(dead_letter_file) as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(DEAD_LETTER_FIELDNAMES)
+            for dataset, input_file, row_num, message, row in self.entries:
+                writer.writerow([dataset, input_file, row_num, message,
+                                 json.dumps(row, ensure_ascii=False)])
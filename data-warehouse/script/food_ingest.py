@@ -0,0 +1,170 @@
+import asyncio
+import csv
+import threading
+
+from food_compression import open_input
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+MAX_CONCURRENT_READS = 8  # Input files read at the same time
+QUEUE_BATCHES = 4  # Parsed batches buffered per file before its reader waits
+BATCH_ROWS = 1000  # Rows per batch handed to the transform stage
+
+# ===================================================================
+# CSV READING
+# ===================================================================
+
+def read_csv_rows(input_file, encoding='utf-8'):
+    """
+    Yield the rows of a (possibly compressed) CSV file as dictionaries
+
+    Args:
+        input_file: Path to input CSV file
+        encoding: Text encoding of the file
+    """
+    with open_input(input_file, encoding, newline='') as infile:
+        yield from csv.DictReader(infile)
+
+def _read_batch(reader, batch_rows):
+    """Read up to batch_rows rows (runs in a worker thread)"""
+    batch = []
+    for row in reader:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            break
+    return batch
+
+# ===================================================================
+# CONCURRENT INGESTION FRONT END
+# ===================================================================
+
+_END_OF_FILE = object()
+
+class ConcurrentIngestor:
+    """
+    Read many input files concurrently on a background asyncio loop
+
+    Each file gets its own bounded queue of parsed batches, so a fast file
+    cannot run ahead of the transform stage (backpressure). The transform
+    stage consumes the files one by one in configuration order through
+    rows(), which keeps conflict resolution deterministic.
+
+    A file the transform stage gives up on must be released, or its reader
+    keeps a read slot while it waits on the full queue and the files after
+    it are never read.
+
+    Usage:
+        with ConcurrentIngestor(input_configs) as ingestor:
+            for index, config in enumerate(input_configs):
+                try:
+                    for row in ingestor.rows(index):
+                        ...
+                finally:
+                    ingestor.release(index)
+    """
+
+    def __init__(self, input_configs, max_concurrency=MAX_CONCURRENT_READS,
+                 queue_batches=QUEUE_BATCHES, batch_rows=BATCH_ROWS):
+        self.paths = [config['path'] for config in input_configs]
+        self.encodings = [config.get('encoding') or 'utf-8' for config in input_configs]
+        self.max_concurrency = max_concurrency
+        self.queue_batches = queue_batches
+        self.batch_rows = batch_rows
+        self.loop = None
+        self.thread = None
+        self.queues = []
+        self.tasks = []
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        return False
+
+    async def _start(self):
+        """Create one queue and one reader task per file (in file order)"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        for path, encoding in zip(self.paths, self.encodings):
+            queue = asyncio.Queue(maxsize=self.queue_batches)
+            self.queues.append(queue)
+            self.tasks.append(asyncio.ensure_future(self._read_file(path, encoding, queue, semaphore)))
+
+    async def _stop(self):
+        """Cancel readers of files that were not consumed to the end"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def _release(self, index):
+        """Cancel the reader of one file and drop its buffered batches"""
+        task = self.tasks[index]
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        queue = self.queues[index]
+        while not queue.empty():
+            queue.get_nowait()
+
+    async def _read_file(self, path, encoding, queue, semaphore):
+        """
+        Parse one file in batches and push them to its queue
+
+        Readers acquire the semaphore in file order (asyncio.Semaphore is
+        FIFO), so the file the transform stage waits for always holds a slot.
+        """
+        async with semaphore:
+            try:
+                infile = await asyncio.to_thread(open_input, path, encoding, newline='')
+            except Exception as error:
+                await queue.put(error)
+                return
+
+            try:
+                reader = csv.DictReader(infile)
+                while True:
+                    batch = await asyncio.to_thread(_read_batch, reader, self.batch_rows)
+                    if not batch:
+                        break
+                    await queue.put(batch)
+                await queue.put(_END_OF_FILE)
+            except Exception as error:
+                await queue.put(error)
+            finally:
+                infile.close()
+
+    def rows(self, index):
+        """
+        Yield the parsed rows of one file, waiting for its reader as needed
+
+        Args:
+            index: Position of the file in input_configs (0-based)
+        """
+        queue = self.queues[index]
+        while True:
+            item = asyncio.run_coroutine_threadsafe(queue.get(), self.loop).result()
+            if item is _END_OF_FILE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+    def release(self, index):
+        """
+        Stop reading one file and free its read slot
+
+        Called once the transform stage is done with a file, whether it read
+        it to the end (no-op) or gave up on it (bad header, error budget...).
+
+        Args:
+            index: Position of the file in input_configs (0-based)
+        """
+        asyncio.run_coroutine_threadsafe(self._release(index), self.loop).result()
@@ -0,0 +1,212 @@
+import csv
+from array import array
+
+from food_compression import open_input
+from food_output import atomic_output
+from food_record import NUTRIENT_KEYS, NUTRIENT_INDEX
+
+# ===================================================================
+# LINEAGE STORE
+# ===================================================================
+
+LINEAGE_FIELDNAMES = ['food_id', 'nutrient', 'dataset', 'source_pdf', 'page', 'row_num', 'value']
+
+class LineageStore:
+    """
+    Append-only, columnar record of where every nutrient value came from
+
+    One entry per (food, nutrient, contributing source row). Entries are
+    stored in parallel arrays; repeated strings (food IDs, source PDFs,
+    pages) are kept once in string tables. An index by food_id points at
+    the entries of each food, so an audit is a dictionary lookup.
+    """
+
+    def __init__(self):
+        # Columns (one element per entry)
+        self.food_codes = array('L')
+        self.nutrient_codes = array('B')
+        self.datasets = array('H')
+        self.source_codes = array('H')
+        self.page_codes = array('H')
+        self.row_nums = array('L')
+        self.values = array('d')
+
+        # String tables
+        self.food_ids = []
+        self.food_codes_by_id = {}
+        self.strings = []
+        self.string_codes = {}
+
+        # food_id code -> array of entry positions
+        self.index = {}
+
+        # Since the last commit(): food_id code -> superseded positions,
+        # and the codes that received entries
+        self.replaced = {}
+        self.touched = set()
+
+    def _food_code(self, food_id):
+        code = self.food_codes_by_id.get(food_id)
+        if code is None:
+            code = len(self.food_ids)
+            self.food_ids.append(food_id)
+            self.food_codes_by_id[food_id] = code
+        return code
+
+    def _string_code(self, value):
+        code = self.string_codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.strings.append(value)
+            self.string_codes[value] = code
+        return code
+
+    def record(self, food_id, nutrients, dataset, source_pdf, page, row_num):
+        """
+        Append the reported nutrients of one source row
+
+        Args:
+            food_id: Final ID of the food the values ended up in
+            nutrients: array('d') in NUTRIENT_KEYS order (NaN = not reported)
+            dataset: Dataset number
+            source_pdf: Source document reference
+            page: Page number in source document
+            row_num: Row number in the input file
+        """
+        food_code = self._food_code(food_id)
+        source_code = self._string_code(source_pdf)
+        page_code = self._string_code(str(page))
+        positions = self.index.setdefault(food_code, array('L'))
+        self.touched.add(food_code)
+
+        for nutrient_code, value in enumerate(nutrients):
+            if value != value:
+                continue
+            positions.append(len(self.values))
+            self.food_codes.append(food_code)
+            self.nutrient_codes.append(nutrient_code)
+            self.datasets.append(dataset)
+            self.source_codes.append(source_code)
+            self.page_codes.append(page_code)
+            self.row_nums.append(row_num)
+            self.values.append(value)
+
+    def supersede(self, food_id):
+        """
+        Forget earlier contributions to a food (it was overwritten)
+        The entries stay in the columns but are no longer indexed
+        """
+        code = self.food_codes_by_id.get(food_id)
+        if code is not None:
+            self.replaced.setdefault(code, self.index[code])
+            self.index[code] = array('L')
+
+    def commit(self):
+        """Make everything recorded so far final (called at the end of each dataset)"""
+        self.replaced = {}
+        self.touched = set()
+
+    def rollback(self, food_id, dataset):
+        """
+        Undo what a dataset recorded for a food since the last commit()
+        (its row was rejected, so the food keeps its earlier contributions)
+
+        Args:
+            food_id: Final ID of the food
+            dataset: Dataset number of the rejected row
+        """
+        code = self.food_codes_by_id.get(food_id)
+        if code is None:
+            return
+        positions = self.replaced.pop(code, self.index.get(code, ()))
+        self.index[code] = array('L', [position for position in positions
+                                       if self.datasets[position] != dataset])
+
+    def discard(self, dataset):
+        """Undo everything a dataset recorded since the last commit() (the dataset failed)"""
+        for code in list(self.touched | set(self.replaced)):
+            self.rollback(self.food_ids[code], dataset)
+        self.commit()
+
+    def lookup(self, food_id, nutrient=None):
+        """
+        Get the contributions to a food, optionally for a single nutrient
+
+        Args:
+            food_id: Food ID
+            nutrient: nutritionPer100g key, or None for every nutrient
+        Returns:
+            List of (nutrient, dataset, source_pdf, page, row_num, value)
+        """
+        code = self.food_codes_by_id.get(food_id)
+        if code is None:
+            return []
+
+        wanted = None if nutrient is None else NUTRIENT_INDEX[nutrient]
+        results = []
+        for position in self.index.get(code, ()):
+            nutrient_code = self.nutrient_codes[position]
+            if wanted is not None and nutrient_code != wanted:
+                continue
+            results.append((
+                NUTRIENT_KEYS[nutrient_code],
+                self.datasets[position],
+                self.strings[self.source_codes[position]],
+                self.strings[self.page_codes[position]],
+                self.row_nums[position],
+                self.values[position]
+            ))
+        return results
+
+    def __len__(self):
+        return sum(len(positions) for positions in self.index.values())
+
+    def rows(self, food_ids=None):
+        """
+        Yield indexed entries as CSV rows (LINEAGE_FIELDNAMES), grouped by food
+
+        Args:
+            food_ids: Optional iterable restricting the output (e.g. foods in the warehouse)
+        """
+        if food_ids is None:
+            food_ids = self.food_ids
+        for food_id in food_ids:
+            for entry in self.lookup(food_id):
+                yield (food_id,) + entry
+
+    def write(self, output_file, food_ids=None):
+        """
+        Write indexed entries to CSV, grouped by food (atomically)
+
+        Args:
+            output_file: Path to the lineage CSV file
+            food_ids: Optional iterable restricting the output (e.g. foods in the warehouse)
+        """
+        with atomic_output(output_file) as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(LINEAGE_FIELDNAMES)
+            writer.writerows(self.rows(food_ids))
+
+    @classmethod
+    def load(cls, input_file):
+        """
+        Rebuild a store (and its index) from a lineage CSV file
+
+        Args:
+            input_file: Path to the lineage CSV file
+        Returns:
+            LineageStore instance
+        """
+        store = cls()
+        with open_input(input_file) as infile:
+            for row in csv.DictReader(infile):
+                food_code = store._food_code(row['food_id'])
+                store.index.setdefault(food_code, array('L')).append(len(store.values))
+                store.food_codes.append(food_code)
+                store.nutrient_codes.append(NUTRIENT_INDEX[row['nutrient']])
+                store.datasets.append(int(row['dataset']))
+                store.source_codes.append(store._string_code(row['source_pdf']))
+                store.page_codes.append(store._string_code(row['page']))
+                store.row_nums.append(int(row['row_num']))
+                store.values.append(float(row['value']))
+        return store
@@ -0,0 +1,252 @@
+import argparse
+import csv
+import json
+
+from food_compression import open_input
+from food_output import atomic_output
+from food_record import OUTPUT_FIELDNAMES
+
+# ===================================================================
+# NORMALIZED LAYOUT
+# ===================================================================
+
+# Columns that the normalized schema replaces with a config reference
+UNIT_FIELDS = ['defaultUnit', 'units', 'unitConversions']
+
+# Output column order: unit columns become unit_config (+ per-food overrides)
+_UNIT_POSITION = OUTPUT_FIELDNAMES.index('defaultUnit')
+NORMALIZED_FIELDNAMES = (
+    OUTPUT_FIELDNAMES[:_UNIT_POSITION]
+    + ['unit_config', 'unit_overrides']
+    + [field for field in OUTPUT_FIELDNAMES[_UNIT_POSITION:] if field not in UNIT_FIELDS]
+)
+
+UNIT_CONFIGS_FORMAT = 1
+
+def apply_unit_overrides(base, overrides):
+    """
+    Rebuild a full unit configuration from its base and per-food overrides
+
+    Extra conversions are appended to the base units, the same way
+    unit_rules.json food overrides are compiled.
+
+    Args:
+        base: Unit configuration the food references
+        overrides: Dictionary with optional defaultUnit and conversions (or
+            units and conversions in full)
+    Returns:
+        Dictionary with defaultUnit, units list, and conversions
+    """
+    if 'units' in overrides:
+        # Stored in full (the food drops units of its base configuration)
+        units = list(overrides['units'])
+        conversions = dict(overrides['conversions'])
+    else:
+        conversions = dict(base['conversions'])
+        conversions.update(overrides.get('conversions', {}))
+        units = list(base['units'])
+        units.extend(unit for unit in overrides.get('conversions', {}) if unit not in units)
+    return {
+        'defaultUnit': overrides.get('defaultUnit', base['defaultUnit']),
+        'units': units,
+        'conversions': conversions
+    }
+
+# ===================================================================
+# WRITING
+# ===================================================================
+
+class UnitConfigTable:
+    """
+    Map the unit configuration objects of a rules set to config ids
+
+    Foods share the configuration objects of the compiled rules, so a
+    reference is found by object identity. Configurations built from food
+    overrides are stored as their base config plus the differences.
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules: CompiledRules instance the records were converted with
+        """
+        self.rules = rules
+        self.configs = rules.unit_configs
+        self.references = {id(config): (name, '') for name, config in self.configs.items()}
+        for config, base_name in rules.override_bases:
+            self.references[id(config)] = (base_name, self._encode_overrides(config, self.configs[base_name]))
+        self.keep_alive = []  # Configs referenced by id() must outlive the table
+
+    @staticmethod
+    def _encode_overrides(config, base):
+        """
+        Differences between a configuration and its base, as JSON ('' if none)
+        """
+        overrides = {}
+        if config['defaultUnit'] != base['defaultUnit']:
+            overrides['defaultUnit'] = config['defaultUnit']
+
+        changed = {unit: grams for unit, grams in config['conversions'].items()
+                   if base['conversions'].get(unit) != grams}
+        if changed:
+            overrides['conversions'] = changed
+
+        # Store the full lists when the base cannot be extended into this config
+        removed = any(unit not in config['conversions'] for unit in base['conversions'])
+        if removed or apply_unit_overrides(base, overrides)['units'] != config['units']:
+            overrides['units'] = config['units']
+            overrides['conversions'] = config['conversions']
+
+        return json.dumps(overrides, ensure_ascii=False) if overrides else ''
+
+    def reference(self, unit_config):
+        """
+        Get the (config id, overrides JSON) pair for a unit configuration
+
+        Args:
+            unit_config: Dictionary with defaultUnit, units list, and conversions
+        """
+        reference = self.references.get(id(unit_config))
+        if reference is None:
+            # Configuration built outside the rules: store it against the default
+            base_name = self.rules.default_config
+            reference = (base_name, self._encode_overrides(unit_config, self.configs[base_name]))
+            self.references[id(unit_config)] = reference
+            self.keep_alive.append(unit_config)
+        return reference
+
+    def normalized_row(self, record):
+        """
+        Serialize a FoodRecord to a row keyed by NORMALIZED_FIELDNAMES
+        """
+        row = record.to_row()
+        for field in UNIT_FIELDS:
+            del row[field]
+        row['unit_config'], row['unit_overrides'] = self.reference(record.unit_config)
+        return row
+
+    def write(self, unit_configs_file):
+        """
+        Write the unit configurations keyed by config id (atomically)
+        """
+        with atomic_output(unit_configs_file) as outfile:
+            json.dump({'format': UNIT_CONFIGS_FORMAT, 'unit_configs': self.configs},
+                      outfile, ensure_ascii=False, indent=2)
+
+# ===================================================================
+# LOADING
+# ===================================================================
+
+class NormalizedReader:
+    """
+    Read a normalized build, rehydrating unit configurations on demand
+
+    Rows are streamed from the file; each (config id, overrides) pair is
+    decoded once and the resulting configuration is shared by every row
+    that references it.
+
+    Usage:
+        reader = NormalizedReader('combined_food_data.csv', 'unit_configs.json')
+        for row in reader:
+            conversions = reader.unit_config(row)['conversions']
+    """
+
+    def __init__(self, rows_file, unit_configs_file):
+        self.rows_file = rows_file
+        self.unit_configs_file = unit_configs_file
+        self._configs = None
+        self._resolved = {}
+        self._json = {}
+
+    @property
+    def configs(self):
+        """Unit configurations keyed by config id (loaded on first use)"""
+        if self._configs is None:
+            with open_input(self.unit_configs_file) as infile:
+                document = json.load(infile)
+            if document.get('format') != UNIT_CONFIGS_FORMAT:
+                raise ValueError(f"Unsupported unit configs format: {document.get('format')}")
+            self._configs = document['unit_configs']
+        return self._configs
+
+    def resolve(self, config_name, overrides=''):
+        """
+        Full unit configuration for a config id and overrides JSON
+
+        Returns:
+            Dictionary with defaultUnit, units list, and conversions
+        """
+        key = (config_name, overrides)
+        config = self._resolved.get(key)
+        if config is None:
+            try:
+                base = self.configs[config_name]
+            except KeyError:
+                raise ValueError(f"Unknown unit config '{config_name}' in {self.rows_file}") from None
+            config = apply_unit_overrides(base, json.loads(overrides)) if overrides else base
+            self._resolved[key] = config
+        return config
+
+    def unit_config(self, row):
+        """Full unit configuration of a normalized row"""
+        return self.resolve(row['unit_config'], row['unit_overrides'])
+
+    def __iter__(self):
+        """Yield the normalized rows as dictionaries (unit columns unresolved)"""
+        with open_input(self.rows_file, newline='') as infile:
+            yield from csv.DictReader(infile)
+
+    def denormalized_rows(self):
+        """
+        Yield rows in the regular output layout (OUTPUT_FIELDNAMES)
+
+        The JSON strings of each configuration are encoded only once.
+        """
+        for row in self:
+            key = (row.pop('unit_config'), row.pop('unit_overrides'))
+            encoded = self._json.get(key)
+            if encoded is None:
+                config = self.resolve(*key)
+                encoded = (
+                    config['defaultUnit'],
+                    json.dumps(config['units'], ensure_ascii=False),
+                    json.dumps(config['conversions'], ensure_ascii=False)
+                )
+                self._json[key] = encoded
+            row['defaultUnit'], row['units'], row['unitConversions'] = encoded
+            yield row
+
+    def export(self, output_file):
+        """
+        Write the build in the regular (denormalized) layout, atomically
+
+        Returns:
+            Number of rows written
+        """
+        count = 0
+        with atomic_output(output_file) as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=OUTPUT_FIELDNAMES)
+            writer.writeheader()
+            for row in self.denormalized_rows():
+                writer.writerow(row)
+                count += 1
+        return count
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a normalized build back to the regular layout")
+    parser.add_argument('rows_file', help="Normalized build (may be compressed)")
+    parser.add_argument('unit_configs_file', help="Unit configurations written with the build")
+    parser.add_argument('output_file', help="Regular CSV output")
+    args = parser.parse_args()
+
+    try:
+        total = NormalizedReader(args.rows_file, args.unit_configs_file).export(args.output_file)
+        print(f"✓ Exported {total} entries to: {args.output_file}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
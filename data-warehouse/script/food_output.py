@@ -0,0 +1,159 @@
+import csv
+import os
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+MAX_OPEN_WRITERS = 16  # Per-dataset output files kept open at the same time
+
+# Process umask, so atomically written files get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# ===================================================================
+# ATOMIC WRITES
+# ===================================================================
+
+@contextmanager
+def atomic_output(output_file, mode='w', encoding='utf-8', newline=''):
+    """
+    Open a temporary file next to output_file and rename it into place on success
+
+    Readers see either the previous file or the complete new one, never a
+    truncated file; if writing fails the temporary file is removed.
+
+    Args:
+        output_file: Final path of the file
+        mode: 'w' for text or 'wb' for binary
+    """
+    handle, temp_path = _temporary_file(output_file)
+    try:
+        if 'b' in mode:
+            outfile = os.fdopen(handle, mode)
+        else:
+            outfile = os.fdopen(handle, mode, encoding=encoding, newline=newline)
+        with outfile:
+            yield outfile
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        _install(temp_path, output_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _temporary_file(output_file):
+    """Create an empty temporary file next to output_file (returns its descriptor and path)"""
+    return tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(os.path.abspath(output_file)))
+
+def _install(temp_path, output_file):
+    """Give a finished temporary file the usual permissions and rename it into place"""
+    os.chmod(temp_path, 0o666 & ~_UMASK)  # mkstemp creates owner-only files
+    os.replace(temp_path, output_file)
+
+def _close(outfile):
+    """Flush a file to disk and close it"""
+    outfile.flush()
+    os.fsync(outfile.fileno())
+    outfile.close()
+
+# ===================================================================
+# PER-DATASET WRITER POOL
+# ===================================================================
+
+class DatasetWriterPool:
+    """
+    Route rows to one CSV file per dataset, keeping a bounded pool of open files
+
+    Rows go to temporary files next to the outputs. The least recently used
+    file is closed when the pool is full and is reopened in append mode
+    (without a second header) if more rows arrive. The files are renamed
+    into place together once every row is written; if writing fails they
+    are removed and the previous outputs are left untouched.
+    """
+
+    def __init__(self, output_paths, fieldnames, max_open=MAX_OPEN_WRITERS):
+        """
+        Args:
+            output_paths: Dictionary of dataset key -> output file path
+            fieldnames: Output column order
+            max_open: Maximum number of files open at the same time
+        """
+        self.output_paths = output_paths
+        self.fieldnames = fieldnames
+        self.max_open = max_open
+        self.open_writers = OrderedDict()  # key -> (file, writer)
+        self.temp_paths = {}  # key -> temporary file holding the rows written so far
+        self.counts = {key: 0 for key in output_paths}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+        return False
+
+    def _writer(self, key):
+        """Get the writer of a dataset, opening (or reopening) its file"""
+        entry = self.open_writers.get(key)
+        if entry is not None:
+            self.open_writers.move_to_end(key)
+            return entry[1]
+
+        if len(self.open_writers) >= self.max_open:
+            _, (oldest_file, _) = self.open_writers.popitem(last=False)
+            _close(oldest_file)
+
+        if key in self.temp_paths:
+            outfile = open(self.temp_paths[key], 'a', encoding='utf-8', newline='')
+            writer = csv.DictWriter(outfile, fieldnames=self.fieldnames)
+        else:
+            handle, self.temp_paths[key] = _temporary_file(self.output_paths[key])
+            outfile = os.fdopen(handle, 'w', encoding='utf-8', newline='')
+            writer = csv.DictWriter(outfile, fieldnames=self.fieldnames)
+            writer.writeheader()
+
+        self.open_writers[key] = (outfile, writer)
+        return writer
+
+    def write(self, key, row):
+        """
+        Write one row to the file of its dataset
+
+        Args:
+            key: Dataset key (must be in output_paths)
+            row: Output row (dictionary)
+        """
+        self._writer(key).writerow(row)
+        self.counts[key] += 1
+
+    def close(self):
+        """Finish every file (empty files for datasets without rows) and rename them into place"""
+        for key in self.output_paths:
+            if key not in self.temp_paths:
+                self._writer(key)
+        for outfile, _ in self.open_writers.values():
+            _close(outfile)
+        self.open_writers.clear()
+
+        for key, temp_path in self.temp_paths.items():
+            _install(temp_path, self.output_paths[key])
+        self.temp_paths.clear()
+
+    def discard(self):
+        """Close and remove the temporary files (previous outputs stay as they were)"""
+        for outfile, _ in self.open_writers.values():
+            outfile.close()
+        self.open_writers.clear()
+
+        for temp_path in self.temp_paths.values():
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.temp_paths.clear()
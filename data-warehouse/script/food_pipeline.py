@@ -0,0 +1,306 @@
+import argparse
+import json
+import os
+import sys
+import threading
+from ast import literal_eval
+from contextlib import contextmanager, redirect_stdout
+
+from food_compression import CODEC_EXTENSIONS
+from food_errors import ErrorBudgetExceeded
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Converter behind each pipeline (imported on first use, so a single-file
+# conversion never loads the multi-dataset machinery)
+CONVERTER_MODULES = {
+    'convert': 'food_converter',  # One TACO-layout file -> one output file
+    'build': 'multi_dataset_converter'  # Many datasets -> merged warehouse build
+}
+
+# ===================================================================
+# CONVERTER CONFIGURATION
+# ===================================================================
+
+# The converters stay flat scripts run from this directory rather than an
+# installable package: they read their settings from the constants of their
+# CONFIGURATION SECTION, whose names each lists in SETTINGS. A run replaces
+# some of those module globals for its duration, so runs in one process are
+# serialized
+_run_lock = threading.RLock()
+
+def converter_module(pipeline):
+    """
+    Import the converter module of a pipeline ('convert' or 'build')
+
+    Raises:
+        ValueError for an unknown pipeline
+    """
+    if pipeline not in CONVERTER_MODULES:
+        raise ValueError(f"Unknown pipeline: {pipeline} (use {' or '.join(map(repr, CONVERTER_MODULES))})")
+    return __import__(CONVERTER_MODULES[pipeline])
+
+def option_names(module):
+    """
+    Constants of a converter module's configuration section (its SETTINGS)
+
+    Returns:
+        Dictionary of option name (lowercase) -> constant name
+    """
+    return {name.lower(): name for name in module.SETTINGS}
+
+def converter_options(module):
+    """
+    Current configuration of a converter module
+
+    Returns:
+        Dictionary of option name (lowercase) -> value
+    """
+    return {option: getattr(module, name) for option, name in option_names(module).items()}
+
+@contextmanager
+def configured(module, options, derived=None):
+    """
+    Run with some configuration constants of a converter module replaced
+
+    Previous values are restored afterwards, also when the run fails.
+
+    Args:
+        module: Converter module
+        options: Dictionary of option name -> value ('conflict_resolution' sets
+            CONFLICT_RESOLUTION); None values keep the module's setting
+        derived: Optional dictionary of module-level tables to replace as well
+    Raises:
+        ValueError for an option the configuration section does not define
+    """
+    names = option_names(module)
+    unknown = [option for option in options if option.lower() not in names]
+    if unknown:
+        raise ValueError(f"Unknown option(s) for {module.__name__}: {', '.join(unknown)}")
+    updates = {names[option.lower()]: value for option, value in options.items() if value is not None}
+    updates.update(derived or {})
+
+    with _run_lock:
+        previous = {name: getattr(module, name) for name in updates}
+        try:
+            for name, value in updates.items():
+                setattr(module, name, value)
+            yield module
+        finally:
+            for name, value in previous.items():
+                setattr(module, name, value)
+
+@contextmanager
+def _messages(quiet):
+    """Progress messages go to stdout unless quiet"""
+    if not quiet:
+        yield
+        return
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        yield
+
+# ===================================================================
+# IN-PROCESS PIPELINES
+# ===================================================================
+
+def convert_file(input_file, output_file=None, quiet=False, **options):
+    """
+    Convert one TACO-layout file (see food_converter.py)
+
+    Usage:
+        records = convert_file('input_food_data.csv', 'foods.csv.gz',
+                               output_compression='gzip', default_source='#2.pdf')
+
+    Args:
+        input_file: Path to the input CSV file (plain or compressed)
+        output_file: Path to the output file (OUTPUT_FILE if None)
+        quiet: True = discard progress messages
+        **options: food_converter.py configuration by lowercase name
+    Returns:
+        List of the FoodRecords written
+    Raises:
+        FileNotFoundError for a missing input file, ValueError for an unknown option,
+        ErrorBudgetExceeded when too many rows fail
+    """
+    module = converter_module('convert')
+    with configured(module, options), _messages(quiet):
+        return module.convert_food_data(input_file, output_file or module.OUTPUT_FILE)
+
+def build_warehouse(input_files=None, quiet=False, **options):
+    """
+    Combine datasets into one warehouse build (see multi_dataset_converter.py)
+
+    Usage:
+        summary = build_warehouse(['input_food_data_1.csv', 'input_food_data_2.csv'],
+                                  conflict_resolution='merge', output_file='foods.csv')
+
+    Args:
+        input_files: Paths or INPUT_FILES-style configurations (dictionaries);
+            None = INPUT_FILES, or the files of INPUT_DIRECTORY in directory mode
+        quiet: True = discard progress messages
+        **options: multi_dataset_converter.py configuration by lowercase name
+    Returns:
+        Dictionary with 'written' (foods in the build), 'datasets' (statistics
+        per dataset) and 'failed' (True if a dataset or stage failed)
+    Raises:
+        ValueError for an unknown option
+    """
+    module = converter_module('build')
+    configs = None
+    if input_files is not None:
+        configs = [
+            {**module.input_file_config(config['path']), **config} if isinstance(config, dict)
+            else module.input_file_config(config)
+            for config in input_files
+        ]
+
+    # Column mappings are loaded from their directory when the module is imported
+    derived = None
+    if options.get('column_mapping_directory') is not None:
+        from food_schemas import load_mappings
+
+        derived = {'MAPPINGS': load_mappings(options['column_mapping_directory'])}
+
+    with configured(module, options, derived), _messages(quiet):
+        return module.process_multiple_datasets(configs)
+
+# ===================================================================
+# COMMAND LINE
+# ===================================================================
+
+def parse_setting(text):
+    """'NAME=VALUE' -> (option name, value); the value is read as a Python literal if it is one"""
+    name, separator, value = text.partition('=')
+    if not separator or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got '{text}'")
+    try:
+        value = literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass  # A plain string
+    return name.strip().lower(), value
+
+def add_output_arguments(parser):
+    """Arguments shared by both pipelines"""
+    parser.add_argument('--compression', choices=sorted(CODEC_EXTENSIONS), help="Compress the output as a stream")
+    parser.add_argument('--level', type=int, help="Compression level (codec default if omitted)")
+    parser.add_argument('--output-schema', choices=['full', 'normalized'], help="Output schema")
+    parser.add_argument('--json', choices=['ndjson', 'json'], help="Also export JSON documents")
+    parser.add_argument('--category', help="Category of foods that match no keyword")
+    parser.add_argument('--no-validate', dest='validate', action='store_false', default=None,
+                        help="Skip the validation stage")
+    parser.add_argument('--quarantine', action='store_true', default=None, help="Leave flagged rows out")
+    parser.add_argument('--alias-index', action='store_true', default=None,
+                        help="Also write the name/alias lookup index")
+    parser.add_argument('--set', dest='settings', metavar='NAME=VALUE', type=parse_setting, action='append',
+                        default=[], help="Any other configuration constant, e.g. --set max_error_rate=0.1")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No progress messages")
+
+def output_options(args):
+    """Options of the shared arguments (None = the converter's own setting)"""
+    options = {
+        'output_compression': args.compression,
+        'output_compression_level': args.level,
+        'output_schema': args.output_schema,
+        'json_export': args.json,
+        'default_category': args.category,
+        'validate_data': args.validate,
+        'quarantine_invalid_rows': args.quarantine,
+        'build_alias_index': args.alias_index
+    }
+    options.update(args.settings)
+    return options
+
+def load_input_configs(inputs_file):
+    """Input file configurations (INPUT_FILES format) from a JSON file"""
+    with open(inputs_file, 'r', encoding='utf-8') as infile:
+        configs = json.load(infile)
+    if not isinstance(configs, list) or not all(isinstance(config, dict) and 'path' in config
+                                                for config in configs):
+        raise ValueError(f"{inputs_file}: expected a list of input configurations with a 'path'")
+    return configs
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Food data warehouse pipelines")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert_parser = commands.add_parser('convert', help="Convert one TACO-layout file")
+    convert_parser.add_argument('input_file')
+    convert_parser.add_argument('output_file', nargs='?', help="Default: OUTPUT_FILE of food_converter.py")
+    convert_parser.add_argument('--source', help="Source document reference of every row")
+    convert_parser.add_argument('--page', help="Page number in the source document")
+    convert_parser.add_argument('--encoding', help="Text encoding of the input (default: detected)")
+    add_output_arguments(convert_parser)
+
+    build_parser = commands.add_parser('build', help="Combine datasets into a warehouse build")
+    build_parser.add_argument('input_files', nargs='*',
+                              help="Input files (default: INPUT_FILES of multi_dataset_converter.py)")
+    build_parser.add_argument('--inputs', dest='inputs_file',
+                              help="JSON list of input configurations (INPUT_FILES format)")
+    build_parser.add_argument('--directory', help="Process every CSV file of a directory")
+    build_parser.add_argument('--output', help="Combined output file")
+    build_parser.add_argument('--separate', action='store_true',
+                              help="One output file per dataset instead of a combined file")
+    build_parser.add_argument('--output-directory', help="Directory of the separate files (directory mode)")
+    build_parser.add_argument('--conflict', choices=['suffix', 'skip', 'overwrite', 'merge'],
+                              help="Resolution of ID conflicts between datasets")
+    build_parser.add_argument('--workers', type=int, help="Worker processes for large files")
+    build_parser.add_argument('--out-of-core', action='store_true', default=None,
+                              help="Bounded memory (sorted spill runs on disk)")
+    build_parser.add_argument('--diff', action='store_true', default=None,
+                              help="Write a changeset against the previous build")
+    build_parser.add_argument('--shards', action='store_true', default=None, help="Also write the sharded export")
+    build_parser.add_argument('--lineage', action='store_true', default=None,
+                              help="Also write the per-nutrient lineage file")
+    add_output_arguments(build_parser)
+
+    commands.add_parser('options', help="List the configuration of a pipeline (names for --set)") \
+        .add_argument('pipeline', choices=sorted(CONVERTER_MODULES))
+
+    args = parser.parse_args()
+    if args.command == 'build' and args.directory and (args.input_files or args.inputs_file):
+        parser.error("give either input files or --directory")
+
+    try:
+        if args.command == 'convert':
+            options = output_options(args)
+            options.update(default_source=args.source, default_page=args.page, input_encoding=args.encoding)
+            records = convert_file(args.input_file, args.output_file, args.quiet, **options)
+            sys.exit(0 if records else 1)
+        elif args.command == 'build':
+            input_files = list(args.input_files)
+            if args.inputs_file:
+                input_files.extend(load_input_configs(args.inputs_file))
+            options = output_options(args)
+            options.update(
+                output_file=args.output,
+                merge_output=False if args.separate else None,
+                use_directory_mode=True if args.directory else None,
+                input_directory=args.directory,
+                output_directory=args.output_directory,
+                conflict_resolution=args.conflict,
+                parallel_workers=args.workers,
+                out_of_core=args.out_of_core,
+                diff_mode=args.diff,
+                sharded_export=args.shards,
+                track_lineage=args.lineage
+            )
+            summary = build_warehouse(input_files or None, args.quiet, **options)
+            sys.exit(1 if summary['failed'] or not summary['written'] else 0)
+        else:
+            for option, value in converter_options(converter_module(args.pipeline)).items():
+                print(f"{option} = {value!r}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+        sys.exit(1)
+    except ErrorBudgetExceeded as e:
+        print(f"✗ Error: Too many failing rows: {str(e)}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
+        sys.exit(1)
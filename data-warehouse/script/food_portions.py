@@ -0,0 +1,401 @@
+import argparse
+import re
+
+from food_aliases import FILLER_WORDS
+from food_dedup import fold_accents
+from food_preparation import PREPARATION_STATES
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Portuguese number words (accent-folded); 'meio'/'meia' add a half
+NUMBER_WORDS = {
+    'um': 1, 'uma': 1, 'dois': 2, 'duas': 2, 'tres': 3, 'quatro': 4, 'cinco': 5,
+    'seis': 6, 'sete': 7, 'oito': 8, 'nove': 9, 'dez': 10, 'onze': 11, 'doze': 12,
+    'treze': 13, 'quatorze': 14, 'catorze': 14, 'quinze': 15, 'vinte': 20,
+    'trinta': 30, 'quarenta': 40, 'cinquenta': 50, 'cem': 100, 'cento': 100,
+    'duzentos': 200, 'duzentas': 200, 'trezentos': 300, 'trezentas': 300,
+    'quinhentos': 500, 'quinhentas': 500, 'mil': 1000,
+    'meio': 0.5, 'meia': 0.5
+}
+
+# Units tried, in order, for a phrase without one ('2 ovos')
+COUNT_UNITS = ['unidade', 'unidade media', 'porcao']
+
+# Words of a phrase that name no food ('um pouco de arroz')
+VAGUE_WORDS = ['pouco', 'pouca', 'bocado']
+
+# Qualifiers of the everyday form of a food: among the names having every
+# word of a phrase, those whose other words are all plain win
+# ('leite' -> 'Leite, de vaca, integral', 'pão' -> 'Pão, trigo, francês';
+# 'com'/'sem' leave 'com pele' counted once)
+PLAIN_WORDS = ['cru', 'crua', 'integral', 'inteiro', 'inteira', 'natural', 'fresco', 'fresca', 'comum',
+               'tipo 1', 'vaca', 'galinha', 'inglesa', 'trigo', 'frances', 'com', 'sem']
+
+# Qualifiers naming another food made from the base ('Feijão, broto' is a
+# sprout, 'Leite, condensado' a sweet, 'Frango, fígado' offal): only
+# matched when the phrase says them
+DERIVED_WORDS = ['broto', 'farinha', 'farelo', 'amido', 'fecula', 'polvilho', 'oleo', 'po', 'condensado',
+                 'creme', 'doce', 'suco', 'polpa', 'pure', 'extrato', 'molho', 'caldo', 'salada',
+                 'coracao', 'figado', 'moela', 'lingua', 'miudo']
+
+# ===================================================================
+# TOKENIZATION
+# ===================================================================
+
+_TOKEN = re.compile(r'\d+(?:[.,]\d+)?(?:/\d+)?|[a-z]+')
+_ACCENTS = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüçñ', 'aaaaaeeeeiiiiooooouuuucn')
+
+def fold(text):
+    """Lowercase and strip accents, fast path for Portuguese text"""
+    folded = text.lower().translate(_ACCENTS)
+    return folded if folded.isascii() else fold_accents(folded)
+
+def singular(word):
+    """
+    Portuguese singular of a word ('colheres' -> 'colher', 'paes' -> 'pao')
+
+    Applied to names and phrases alike, so a wrong singular on a rare
+    word still matches itself.
+    """
+    if len(word) <= 3 or not word.endswith('s') or word.endswith('ss'):
+        return word
+    if word.endswith(('oes', 'aes')):
+        return word[:-3] + 'ao'
+    if word.endswith(('res', 'zes', 'ses')):
+        return word[:-2]
+    if word.endswith(('ais', 'eis', 'ois')):
+        return word[:-2] + 'l'
+    if word.endswith('ns'):
+        return word[:-2] + 'm'
+    if word.endswith(('is', 'us')):
+        return word
+    return word[:-1]
+
+def tokenize(text):
+    """
+    Split text into accent-folded words and numbers
+
+    Returns:
+        List of tokens ('1,5' and '1/2' stay one token)
+    """
+    return _TOKEN.findall(fold(text))
+
+def parse_number(token):
+    """Value of a numeric token ('2', '1,5', '1/2'), or None"""
+    if not token[0].isdigit():
+        return None
+    if '/' in token:
+        numerator, denominator = token.split('/')
+        return int(numerator) / int(denominator) if int(denominator) else None
+    return float(token.replace(',', '.'))
+
+# ===================================================================
+# TRIES
+# ===================================================================
+
+_END = '$'  # Node key of the value stored at a node (never a token)
+
+def _insert(trie, words, value):
+    """Store value under a word sequence (the first value stored wins)"""
+    node = trie
+    for word in words:
+        node = node.setdefault(word, {})
+    node.setdefault(_END, value)
+
+def _longest(trie, tokens, start):
+    """
+    Walk the trie from tokens[start] as far as it goes
+
+    Returns:
+        Tuple of (value of the longest complete match or None, position
+        after that match)
+    """
+    node = trie
+    position = start
+    match, match_end = None, start
+    while position < len(tokens):
+        node = node.get(tokens[position])
+        if node is None:
+            break
+        position += 1
+        if _END in node:
+            match, match_end = node[_END], position
+    return match, match_end
+
+# ===================================================================
+# PORTION PARSER
+# ===================================================================
+
+class PortionParser:
+    """
+    Turn free-text portions into (food_id, grams)
+
+    '2 colheres de sopa de arroz integral cozido' -> ('arroz_integral_cozido', 30.0)
+
+    Unit names (every unit of every unit configuration) are compiled into
+    a word trie, food names into word sets, over singular, accent-folded,
+    synonym-canonical words. A phrase is tokenized once and read left to
+    right: quantity (digits, fractions or number words), then the longest
+    unit, then the food. Foods are found by the exact word set first (a
+    name, ID or explicit alias, any word order), else among the names
+    having every word of the phrase and whose base (the part before the
+    first comma, without preparation and plain words) the phrase names,
+    or names two words of: 'arroz' matches 'Arroz, integral, cru' but not
+    'Arroz carreteiro' or 'Farinha, de arroz', and 'feijão tropeiro'
+    matches 'Feijão tropeiro mineiro'. Names with a derived-food word the
+    phrase lacks are skipped; of the rest, the one with the fewest words
+    beyond the phrase's other than plain ones wins, then the fewest
+    words, then the first given. Grams come from the food's own
+    conversion for the unit, else from the default configuration's.
+    """
+
+    def __init__(self, unit_configs, default_config, synonyms, foods, food_aliases=None):
+        """
+        Args:
+            unit_configs: Dictionary of config name -> unit configuration (UNIT_CONVERSIONS_DATABASE)
+            default_config: Name of the configuration used for units a food lacks
+            synonyms: SynonymTable of the rules
+            foods: Iterable of (food_id, name, unit configuration)
+            food_aliases: Optional dictionary of extra alias -> food ID
+        """
+        self.synonyms = synonyms
+        self.unit_trie = {}
+        self.food_keys = {}  # Sorted word set -> food ID
+        self.names = {}  # food ID -> (rank, name words, base words)
+        self.postings = {}  # Word -> set of the food IDs whose names contain it
+        self.conversions = {}  # food ID -> {unit words: grams}
+
+        self.vague_words = self._word_set(VAGUE_WORDS)
+        self.plain_words = self._word_set(PLAIN_WORDS)
+        self.derived_words = self._word_set(DERIVED_WORDS)
+        self.state_words = self._word_set(PREPARATION_STATES)
+
+        # Units: every configuration's names, keyed by their compiled words
+        for config in unit_configs.values():
+            for unit in config['conversions']:
+                words = self._unit_words(unit)
+                if words:
+                    _insert(self.unit_trie, words, words)
+        self.fallback = self._compile_conversions(unit_configs[default_config])
+        for config in unit_configs.values():
+            for words, grams in self._compile_conversions(config).items():
+                self.fallback.setdefault(words, grams)
+
+        self.count_units = [self._unit_words(unit) for unit in COUNT_UNITS]
+
+        compiled = {}
+        for rank, (food_id, name, unit_config) in enumerate(foods):
+            self.conversions[food_id] = self._conversions(unit_config, compiled)
+            self._add_food(name, food_id, rank)
+            self._add_key(food_id.replace('_', ' '), food_id)
+        for alias, food_id in (food_aliases or {}).items():
+            if food_id in self.conversions:
+                self._add_key(alias, food_id, replace=True)  # Explicit aliases win over names
+
+    def _unit_words(self, unit):
+        """Compiled words of a unit name (None for '100g'-style names)"""
+        tokens = tokenize(unit)
+        if not tokens or tokens[0][0].isdigit():
+            return None
+        return tuple(singular(token) for token in tokens)
+
+    def _compile_conversions(self, unit_config):
+        conversions = {}
+        for unit, grams in unit_config['conversions'].items():
+            words = self._unit_words(unit)
+            if words:
+                conversions.setdefault(words, grams)
+        return conversions
+
+    def _conversions(self, unit_config, compiled):
+        """Compiled conversions of a configuration (shared between its foods)"""
+        cached = compiled.get(id(unit_config))
+        if cached is None or cached[0] is not unit_config:
+            cached = compiled[id(unit_config)] = (unit_config, self._compile_conversions(unit_config))
+        return cached[1]
+
+    def _food_words(self, tokens):
+        """Canonical food words: synonyms rewritten, singular, without linking words"""
+        terms = self.synonyms.terms
+        max_words = self.synonyms.max_words
+        words = []
+        position = 0
+        while position < len(tokens):
+            for length in range(min(max_words, len(tokens) - position), 0, -1):
+                canonical = terms.get(tuple(tokens[position:position + length]))
+                if canonical is not None:
+                    words.extend(canonical)
+                    position += length
+                    break
+            else:
+                words.append(tokens[position])
+                position += 1
+        return [singular(word) for word in words if word not in FILLER_WORDS]
+
+    def _word_set(self, words):
+        """Compiled food words of a configured word list"""
+        return {compiled for word in words for compiled in self._food_words(tokenize(word))}
+
+    def _add_key(self, name, food_id, replace=False):
+        """Register the exact word set of a name, ID or alias; returns its words"""
+        words = frozenset(self._food_words(tokenize(name)))
+        if words:
+            key = ' '.join(sorted(words))
+            if replace:
+                self.food_keys[key] = food_id
+            else:
+                self.food_keys.setdefault(key, food_id)
+        return words
+
+    def _add_food(self, name, food_id, rank):
+        words = self._add_key(name, food_id)
+        if not words or food_id in self.names:
+            return
+        base = frozenset(self._food_words(tokenize(name.partition(',')[0])))
+        self.names[food_id] = (rank, words, base - self.state_words - self.plain_words)
+        for word in words:
+            self.postings.setdefault(word, set()).add(food_id)
+
+    def _quantity(self, tokens):
+        """
+        Read a leading quantity ('2', '1,5', 'duas', 'vinte e cinco', 'um e meio')
+
+        Returns:
+            Tuple of (quantity or None, position after it)
+        """
+        total = None
+        position = 0
+        while position < len(tokens):
+            token = tokens[position]
+            value = parse_number(token)
+            if value is None:
+                value = NUMBER_WORDS.get(token)
+            if value is None:
+                break
+            total = float(value) if total is None else total + value
+            position += 1
+            # 'vinte e cinco', 'um e meio'
+            if (position + 1 < len(tokens) and tokens[position] == 'e'
+                    and (tokens[position + 1] in NUMBER_WORDS or tokens[position + 1][0].isdigit())):
+                position += 1
+                continue
+            break
+        return total, position
+
+    def _food(self, words):
+        """Food ID of canonical food words, or None"""
+        words = set(words) - self.vague_words
+        if not words:
+            return None
+        food_id = self.food_keys.get(' '.join(sorted(words)))
+        if food_id is not None:
+            return food_id
+        # Names having every word of the phrase ('feijão preto' never falls back to another feijão)
+        lists = sorted((self.postings.get(word, ()) for word in words), key=len)
+        best = None
+        for food_id in lists[0]:
+            if not all(food_id in postings for postings in lists[1:]):
+                continue
+            rank, name_words, base = self.names[food_id]
+            # The phrase names the base ('Arroz carreteiro' is a dish, not 'arroz'), or
+            # enough of it ('feijão tropeiro')
+            if not base <= words and len(base & words) < 2:
+                continue
+            extra = name_words - words
+            if not self.derived_words.isdisjoint(extra):
+                continue
+            score = (len(extra - self.plain_words), len(extra), rank)
+            if best is None or score < best[0]:
+                best = (score, food_id)
+        return None if best is None else best[1]
+
+    def parse(self, phrase):
+        """
+        Parse one portion
+
+        Args:
+            phrase: Free text, e.g. '1 xícara de feijão'
+        Returns:
+            Tuple of (food_id, grams), or None if no food is recognized
+            (grams is None when neither the food nor the default
+            configuration knows the unit)
+        """
+        tokens = tokenize(phrase)
+        quantity, position = self._quantity(tokens)
+        unit = None
+        if position < len(tokens):
+            singular_tokens = [singular(token) for token in tokens[position:position + 4]]
+            unit, unit_end = _longest(self.unit_trie, singular_tokens, 0)
+            if unit is not None:
+                position += unit_end
+        food_id = self._food(self._food_words(tokens[position:]))
+        if food_id is None:
+            return None
+
+        conversions = self.conversions[food_id]
+        if unit is None:
+            # '2 ovos': the food's first count unit
+            grams = next((conversions[words] for words in self.count_units if words in conversions), None)
+        else:
+            grams = conversions.get(unit)
+            if grams is None:
+                grams = self.fallback.get(unit)
+        if grams is None:
+            return food_id, None
+        return food_id, round((1 if quantity is None else quantity) * grams, 2)
+
+    def parse_batch(self, phrases):
+        """
+        Parse many portions
+
+        Returns:
+            List of parse() results, in order
+        """
+        parse = self.parse
+        return [parse(phrase) for phrase in phrases]
+
+def load_parser(warehouse_file, rules):
+    """
+    Build a parser over a converted warehouse file
+
+    Args:
+        warehouse_file: Output of a converter (full schema)
+        rules: CompiledRules (unit configurations, synonyms and aliases)
+    Returns:
+        PortionParser
+    """
+    from food_recipes import load_warehouse_foods
+
+    foods = load_warehouse_foods(warehouse_file)
+    return PortionParser(
+        rules.unit_configs, rules.default_config, rules.synonyms,
+        ((record.id, record.name, record.unit_config) for record in foods.values()),
+        rules.food_aliases
+    )
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    from food_rules import load_rules
+
+    parser = argparse.ArgumentParser(description="Parse free-text portions into food IDs and grams")
+    parser.add_argument('warehouse_file', help="Output of a converter (full schema)")
+    parser.add_argument('phrases', nargs='+', help="Portions, e.g. '2 colheres de sopa de arroz'")
+    args = parser.parse_args()
+
+    try:
+        portion_parser = load_parser(args.warehouse_file, load_rules())
+        for phrase, result in zip(args.phrases, portion_parser.parse_batch(args.phrases)):
+            if result is None:
+                print(f"{phrase} -> (no food recognized)")
+            else:
+                food_id, grams = result
+                print(f"{phrase} -> {food_id}, {'? g (unknown unit)' if grams is None else f'{grams} g'}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
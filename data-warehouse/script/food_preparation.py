@@ -0,0 +1,305 @@
+import argparse
+import json
+import re
+from array import array
+
+from food_aliases import FILLER_WORDS, normalize_alias
+from food_output import atomic_output
+from food_record import MISSING, NUTRIENT_INDEX, NUTRIENT_KEYS
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Preparation words (accent-folded) -> preparation state
+PREPARATION_STATES = {
+    'cru': 'cru', 'crua': 'cru', 'crus': 'cru', 'cruas': 'cru', 'raw': 'cru',
+    'cozido': 'cozido', 'cozida': 'cozido', 'cozidos': 'cozido', 'cozidas': 'cozido',
+    'cooked': 'cozido', 'boiled': 'cozido',
+    'assado': 'assado', 'assada': 'assado', 'assados': 'assado', 'assadas': 'assado',
+    'roasted': 'assado', 'baked': 'assado',
+    'grelhado': 'grelhado', 'grelhada': 'grelhado', 'grelhados': 'grelhado', 'grelhadas': 'grelhado',
+    'grilled': 'grelhado',
+    'frito': 'frito', 'frita': 'frito', 'fritos': 'frito', 'fritas': 'frito', 'fried': 'frito',
+    'refogado': 'refogado', 'refogada': 'refogado', 'refogados': 'refogado', 'refogadas': 'refogado',
+    'torrado': 'torrado', 'torrada': 'torrado', 'torrados': 'torrado', 'torradas': 'torrado',
+    'toasted': 'torrado'
+}
+RAW_STATE = 'cru'
+
+MIN_PAIRS = 3  # Raw/cooked pairs a category needs for its own factors
+
+# Proximate components that share the dry matter, and the energy they carry
+SOLID_COMPONENTS = ['protein', 'fat', 'carbs', 'fiber', 'ash']
+ENERGY_NUTRIENTS = ['calories', 'energy_kj']
+
+PREPARATION_FORMAT = 1
+
+# ===================================================================
+# NAME PARSING
+# ===================================================================
+
+# Portuguese endings of the raw word, reused for the cooked word
+_RAW_ENDINGS = {'cru': 'o', 'crua': 'a', 'crus': 'os', 'cruas': 'as'}
+_RAW_WORD = re.compile(r'\b(cru|crua|crus|cruas)\b', re.IGNORECASE)
+
+def parse_preparation(name):
+    """
+    Split a food name into its base and its preparation state
+
+    The last preparation word decides the state; the base is the other
+    words, accent-folded and without linking words, in sorted order, so
+    'Arroz, integral, cozido' and 'Arroz integral cru' share the base
+    'arroz integral'.
+
+    Args:
+        name: Food name
+    Returns:
+        Tuple of (base key, state or None)
+    """
+    words = normalize_alias(name).split()
+    for position in range(len(words) - 1, -1, -1):
+        state = PREPARATION_STATES.get(words[position])
+        if state is not None:
+            del words[position]
+            break
+    else:
+        state = None
+    return ' '.join(sorted(set(words) - FILLER_WORDS)), state
+
+def prepared_name(name, state):
+    """
+    Name of the prepared variant of a raw food
+
+    'Mandioca, crua' -> 'Mandioca, cozida (estimado)'
+
+    Args:
+        name: Name of the raw food
+        state: Preparation state (e.g. 'cozido')
+    Returns:
+        New name string
+    """
+    stem = state[:-1]
+
+    def replace(match):
+        word = stem + _RAW_ENDINGS[match.group(1).lower()]
+        return word.capitalize() if match.group(1)[0].isupper() else word
+
+    renamed, count = _RAW_WORD.subn(replace, name, count=1)
+    if not count:
+        renamed = f"{name}, {state}"
+    return f"{renamed} (estimado)"
+
+# ===================================================================
+# PAIRING
+# ===================================================================
+
+class PreparationIndex:
+    """
+    Foods grouped by normalized base name and preparation state
+    """
+
+    def __init__(self):
+        self.groups = {}  # base key -> {state: [FoodRecord]}
+
+    def add(self, record):
+        """Index one food if its name carries a preparation state"""
+        base, state = parse_preparation(record.name)
+        if state is not None and base:
+            self.groups.setdefault(base, {}).setdefault(state, []).append(record)
+
+    def add_rows(self, rows):
+        """
+        Args:
+            rows: Dictionary of id -> FoodRecord
+        """
+        for record in rows.values():
+            self.add(record)
+
+    def pairs(self):
+        """
+        Yield (raw, prepared, state) for every raw food and prepared variant of the same base
+        """
+        for states in self.groups.values():
+            for raw in states.get(RAW_STATE, ()):
+                for state, prepared_foods in states.items():
+                    if state == RAW_STATE:
+                        continue
+                    for prepared in prepared_foods:
+                        yield raw, prepared, state
+
+    def unpaired_raw(self, state):
+        """
+        Yield raw foods whose base has no variant in the given state
+        """
+        for states in self.groups.values():
+            if state not in states:
+                yield from states.get(RAW_STATE, ())
+
+def yield_factor(raw, prepared):
+    """
+    Weight of the prepared food per gram of raw food
+
+    Assumes the dry matter is conserved: yield = (100 - moisture raw) /
+    (100 - moisture prepared).
+
+    Returns:
+        Float, or None without usable moisture values
+    """
+    moisture = NUTRIENT_INDEX['moisture']
+    raw_moisture = raw.nutrients[moisture]
+    prepared_moisture = prepared.nutrients[moisture]
+    if raw_moisture != raw_moisture or prepared_moisture != prepared_moisture:
+        return None
+    if not 0 <= raw_moisture < 100 or not 0 <= prepared_moisture < 100:
+        return None
+    return (100 - raw_moisture) / (100 - prepared_moisture)
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+# ===================================================================
+# FACTORS
+# ===================================================================
+
+class PreparationFactors:
+    """
+    Yield and nutrient retention factors per (category, preparation state)
+
+    For every raw/prepared pair the true retention of a nutrient is
+    prepared value x yield / raw value (the share of the raw amount that
+    is left after preparation). Factors are the medians over the pairs of
+    a category; categories with fewer than MIN_PAIRS pairs use the factors
+    of all categories together.
+    """
+
+    def __init__(self, min_pairs=MIN_PAIRS):
+        self.min_pairs = min_pairs
+        self.factors = {}  # (category, state) -> {'pairs', 'yield', 'retention'}; category None = all
+
+    def fit(self, index):
+        """
+        Compute the factors from the pairs of a PreparationIndex
+
+        Returns:
+            self
+        """
+        # Pairs as columns: yields and raw/prepared nutrient arrays per group
+        columns = {}
+        for raw, prepared, state in index.pairs():
+            factor = yield_factor(raw, prepared)
+            if factor is None:
+                continue
+            for key in ((raw.category, state), (None, state)):
+                group = columns.setdefault(key, ([], [], array('d')))
+                group[0].append(raw.nutrients)
+                group[1].append(prepared.nutrients)
+                group[2].append(factor)
+
+        for key, (raw_rows, prepared_rows, yields) in columns.items():
+            if len(yields) < self.min_pairs:
+                continue
+            retention = array('d', [MISSING] * len(NUTRIENT_KEYS))
+            for index_ in range(len(NUTRIENT_KEYS)):
+                ratios = [prepared[index_] * factor / raw[index_]
+                          for raw, prepared, factor in zip(raw_rows, prepared_rows, yields)
+                          if raw[index_] > 0 and prepared[index_] == prepared[index_]]
+                if len(ratios) >= self.min_pairs:
+                    retention[index_] = round(_median(ratios), 3)
+            self.factors[key] = {'pairs': len(yields), 'yield': round(_median(yields), 3),
+                                 'retention': retention}
+        return self
+
+    def lookup(self, category, state):
+        """
+        Factors for a category and state (falling back to all categories)
+
+        Returns:
+            Tuple of (factors dictionary, category used or None), or (None, None)
+        """
+        factors = self.factors.get((category, state))
+        if factors is not None:
+            return factors, category
+        return self.factors.get((None, state)), None
+
+    def estimate(self, raw, state):
+        """
+        Estimate the per-100g nutrients of a raw food after preparation
+
+        Nutrients without a retention factor are assumed to be retained
+        (only concentrated or diluted by the yield); moisture follows from
+        the conserved dry matter. Where the retained solids would outweigh
+        that dry matter, they and the energy are scaled down to fit it.
+
+        Args:
+            raw: FoodRecord of the raw food
+            state: Preparation state
+        Returns:
+            Tuple of (array('d'), factors used, category used or None), or None
+        """
+        factors, category = self.lookup(raw.category, state)
+        if factors is None:
+            return None
+        factor = factors['yield']
+        nutrients = array('d', [
+            round(value * (1.0 if retention != retention else retention) / factor, 2)
+            for value, retention in zip(raw.nutrients, factors['retention'])
+        ])
+        moisture = NUTRIENT_INDEX['moisture']
+        if raw.nutrients[moisture] == raw.nutrients[moisture]:
+            nutrients[moisture] = round(100 - (100 - raw.nutrients[moisture]) / factor, 2)
+            solids = sum(nutrients[NUTRIENT_INDEX[key]] for key in SOLID_COMPONENTS
+                         if nutrients[NUTRIENT_INDEX[key]] == nutrients[NUTRIENT_INDEX[key]])
+            if solids > 100 - nutrients[moisture]:
+                scale = (100 - nutrients[moisture]) / solids
+                for key in SOLID_COMPONENTS + ENERGY_NUTRIENTS:
+                    nutrients[NUTRIENT_INDEX[key]] = round(nutrients[NUTRIENT_INDEX[key]] * scale, 2)
+        return nutrients, factors, category
+
+    def write(self, factors_file):
+        """Write the factor table as JSON (atomically)"""
+        table = []
+        for (category, state), factors in sorted(self.factors.items(),
+                                                 key=lambda item: (item[0][0] or '', item[0][1])):
+            table.append({
+                'category': category,
+                'state': state,
+                'pairs': factors['pairs'],
+                'yield': factors['yield'],
+                'retention': {key: value for key, value in zip(NUTRIENT_KEYS, factors['retention'])
+                              if value == value}
+            })
+        with atomic_output(factors_file) as outfile:
+            json.dump({'format': PREPARATION_FORMAT, 'factors': table}, outfile,
+                      ensure_ascii=False, indent=2)
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    from food_recipes import load_warehouse_foods
+
+    parser = argparse.ArgumentParser(description="Pair raw and prepared foods and fit preparation factors")
+    parser.add_argument('warehouse_file', help="Output of a converter (full schema)")
+    parser.add_argument('factors_file', help="JSON file receiving the factor table")
+    parser.add_argument('--min-pairs', type=int, default=MIN_PAIRS, help="Pairs needed per category")
+    args = parser.parse_args()
+
+    try:
+        index = PreparationIndex()
+        index.add_rows(load_warehouse_foods(args.warehouse_file))
+        factors = PreparationFactors(args.min_pairs).fit(index)
+        factors.write(args.factors_file)
+        print(f"✓ {sum(1 for _ in index.pairs())} raw/prepared pairs in {len(index.groups)} base names")
+        for (category, state), entry in sorted(factors.factors.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+            print(f"  • {category or '(all)'} / {state}: {entry['pairs']} pairs, yield {entry['yield']}")
+        print(f"✓ Factors saved to: {args.factors_file}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
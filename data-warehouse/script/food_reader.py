@@ -0,0 +1,175 @@
+import csv
+import json
+from array import array
+
+from food_compression import open_input
+from food_record import TOP_LEVEL_NUTRIENTS
+
+# ===================================================================
+# COLUMN TYPES
+# ===================================================================
+
+# Columns typed as numbers while reading ('NULL' and '' become None)
+NUMERIC_FIELDS = {'portion_g'} | {field for field, _ in TOP_LEVEL_NUTRIENTS}
+
+# Columns holding JSON, decoded on first access per row
+JSON_FIELDS = {'units', 'unitConversions', 'nutritionPer100g', 'unit_overrides'}
+
+def parse_number(value):
+    """Parse a numeric cell ('NULL', 'NA' and '' are missing)"""
+    if not value or value in ('NULL', 'NA'):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+# ===================================================================
+# ROWS
+# ===================================================================
+
+class WarehouseRow:
+    """
+    One row of a warehouse build, holding only the requested columns
+
+    Numeric columns are floats (or None). JSON columns are kept as the raw
+    cell text until first accessed, then decoded once and cached in place.
+    """
+
+    __slots__ = ('values', 'positions')
+
+    def __init__(self, values, positions):
+        """
+        Args:
+            values: Cell values in the reader's column order
+            positions: Shared dictionary of column -> index into values
+        """
+        self.values = values
+        self.positions = positions
+
+    def __getitem__(self, field):
+        try:
+            position = self.positions[field]
+        except KeyError:
+            raise KeyError(f"Column '{field}' was not loaded") from None
+        value = self.values[position]
+        if field in JSON_FIELDS and isinstance(value, str):
+            value = json.loads(value) if value else None
+            self.values[position] = value
+        return value
+
+    def get(self, field, default=None):
+        """Value of a loaded column, or default if it was not loaded"""
+        return self[field] if field in self.positions else default
+
+    @property
+    def nutrition(self):
+        """nutritionPer100g as a dictionary (decoded on first access)"""
+        return self['nutritionPer100g'] or {}
+
+    def nutrient(self, key):
+        """Value of one nutritionPer100g entry, or None if not reported"""
+        return self.nutrition.get(key)
+
+    def to_dict(self):
+        """All loaded columns as a dictionary (decodes JSON columns)"""
+        return {field: self[field] for field in self.positions}
+
+    def __repr__(self):
+        fields = ', '.join(f"{field}={self.values[position]!r}" for field, position in self.positions.items())
+        return f"WarehouseRow({fields})"
+
+# ===================================================================
+# READER
+# ===================================================================
+
+class WarehouseReader:
+    """
+    Read converter output, parsing only the columns a consumer asks for
+
+    Works on the regular and normalized layouts and on compressed builds.
+
+    Usage:
+        for row in WarehouseReader('combined_food_data.csv', ['id', 'energy_kcal']):
+            print(row['id'], row['energy_kcal'])
+    """
+
+    def __init__(self, input_file, columns=None):
+        """
+        Args:
+            input_file: Path to a build written by either converter
+            columns: Column names to load (None = every column)
+        """
+        self.input_file = input_file
+        self.columns = None if columns is None else list(columns)
+        self.fieldnames = None
+
+    def _layout(self, header):
+        """
+        Work out which cells to keep and how to type them
+
+        Returns:
+            Tuple of (list of (cell index, is numeric), column -> row position)
+        """
+        self.fieldnames = header
+        wanted = header if self.columns is None else self.columns
+        cell_index = {field: index for index, field in enumerate(header)}
+
+        missing = [field for field in wanted if field not in cell_index]
+        if missing:
+            raise ValueError(f"{self.input_file} has no column(s): {', '.join(missing)}")
+
+        cells = [(cell_index[field], field in NUMERIC_FIELDS) for field in wanted]
+        positions = {field: position for position, field in enumerate(wanted)}
+        return cells, positions
+
+    def __iter__(self):
+        """Yield a WarehouseRow per food"""
+        with open_input(self.input_file, newline='') as infile:
+            reader = csv.reader(infile)
+            header = next(reader, None)
+            if header is None:
+                return
+            cells, positions = self._layout(header)
+
+            for record in reader:
+                values = [parse_number(record[index]) if numeric else record[index]
+                          for index, numeric in cells]
+                yield WarehouseRow(values, positions)
+
+    def rows_by_id(self):
+        """
+        Load the build keyed by food ID
+
+        Returns:
+            Dictionary of id -> WarehouseRow ('id' is always loaded)
+        """
+        if self.columns is not None and 'id' not in self.columns:
+            return WarehouseReader(self.input_file, ['id'] + self.columns).rows_by_id()
+        return {row['id']: row for row in self}
+
+    def column(self, field):
+        """
+        Load one numeric column into an array (NaN for missing values)
+
+        Args:
+            field: Numeric column name, e.g. 'energy_kcal'
+        Returns:
+            array('d') in file order
+        """
+        if field not in NUMERIC_FIELDS:
+            raise ValueError(f"'{field}' is not a numeric column")
+        with open_input(self.input_file, newline='') as infile:
+            reader = csv.reader(infile)
+            header = next(reader, None)
+            if header is None:
+                return array('d')
+            if field not in header:
+                raise ValueError(f"{self.input_file} has no column(s): {field}")
+            index = header.index(field)
+            nan = float('nan')
+            values = array('d')
+            for record in reader:
+                value = parse_number(record[index])
+                values.append(nan if value is None else value)
+            return values
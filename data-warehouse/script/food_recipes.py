@@ -0,0 +1,471 @@
+import argparse
+import csv
+import hashlib
+import json
+from array import array
+from collections import deque
+from pathlib import Path
+
+from food_compression import open_input
+from food_output import atomic_output
+from food_record import FoodRecord, MISSING, NUTRIENT_INDEX, NUTRIENT_KEYS
+from food_rules import load_rules
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+RECIPES_FILE = Path(__file__).with_name('recipes.json')  # Composite food definitions
+RECIPE_CACHE_FILE = '.recipe_cache.json'  # Results of the previous build
+
+RECIPE_CACHE_FORMAT = 1
+
+# Quantities in grams are accepted for every ingredient
+GRAM_UNIT = 'g'
+
+# ===================================================================
+# RECIPE DEFINITIONS
+# ===================================================================
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _retention_factors(retention, label):
+    """
+    Build a per-nutrient factor array from a {nutrient: factor} dictionary
+
+    Returns:
+        array('d') in NUTRIENT_KEYS order (1.0 = nothing lost)
+    """
+    factors = array('d', [1.0] * len(NUTRIENT_KEYS))
+    for nutrient, factor in retention.items():
+        if nutrient not in NUTRIENT_INDEX:
+            raise ValueError(f"{label}: unknown nutrient '{nutrient}'")
+        if factor < 0:
+            raise ValueError(f"{label}: retention of '{nutrient}' must not be negative")
+        factors[NUTRIENT_INDEX[nutrient]] = factor
+    return factors
+
+class Recipe:
+    """
+    A composite food made of warehouse foods and/or other recipes
+
+    Definition (one entry of recipes.json):
+        {"id": "xima", "name": "Xima", "category": "Cereais",
+         "yield_factor": 0.88,
+         "retention": {"thiamine": 0.8},
+         "ingredients": [
+             {"id": "milho_fubá_cru", "quantity": 250, "unit": "g"},
+             {"id": "água_mineral", "quantity": 1, "unit": "litro"}
+         ]}
+
+    quantity/unit use the ingredient's unitConversions ('g' always works).
+    yield_factor is cooked weight / raw ingredient weight; retention holds
+    cooking-loss factors per nutrient, for the whole recipe or per
+    ingredient (an ingredient's own factors take precedence).
+    """
+
+    __slots__ = ('id', 'name', 'category', 'notes', 'yield_factor', 'ingredients', 'digest')
+
+    def __init__(self, definition):
+        """
+        Args:
+            definition: Dictionary as described above
+        Raises:
+            ValueError for malformed definitions
+        """
+        recipe_id = definition.get('id')
+        if not recipe_id or not definition.get('name'):
+            raise ValueError(f"Recipe needs an id and a name: {definition}")
+        if not definition.get('ingredients'):
+            raise ValueError(f"Recipe '{recipe_id}' has no ingredients")
+
+        self.id = recipe_id
+        self.name = definition['name']
+        self.category = definition.get('category')
+        self.notes = definition.get('notes', '')
+        self.yield_factor = float(definition.get('yield_factor', 1.0))
+        if self.yield_factor <= 0:
+            raise ValueError(f"Recipe '{recipe_id}': yield_factor must be positive")
+
+        retention = definition.get('retention', {})
+        self.ingredients = []
+        for ingredient in definition['ingredients']:
+            quantity = float(ingredient.get('quantity', 0))
+            if not ingredient.get('id') or quantity <= 0:
+                raise ValueError(f"Recipe '{recipe_id}': ingredients need an id and a positive quantity")
+            factors = _retention_factors({**retention, **ingredient.get('retention', {})},
+                                         f"Recipe '{recipe_id}'")
+            self.ingredients.append((ingredient['id'], quantity, ingredient.get('unit', GRAM_UNIT), factors))
+
+        self.digest = _digest(definition)
+
+class RecipeBook:
+    """
+    Recipes and the dependency graph between them
+
+    An edge runs from each ingredient to the recipes that use it. Recipes
+    are kept in topological order (ingredients first), so every recipe can
+    be evaluated once its ingredients are known.
+    """
+
+    def __init__(self, recipes):
+        """
+        Args:
+            recipes: List of Recipe
+        Raises:
+            ValueError for duplicate IDs or cyclic recipes
+        """
+        self.recipes = {}
+        for recipe in recipes:
+            if recipe.id in self.recipes:
+                raise ValueError(f"Duplicate recipe id '{recipe.id}'")
+            self.recipes[recipe.id] = recipe
+
+        self.dependents = {}  # ingredient id -> ids of recipes using it directly
+        for recipe in recipes:
+            for ingredient_id, _, _, _ in recipe.ingredients:
+                self.dependents.setdefault(ingredient_id, []).append(recipe.id)
+
+        self.order = self._topological_order()
+
+    @classmethod
+    def load(cls, recipes_file=RECIPES_FILE):
+        """
+        Load recipes.json ({"recipes": [definition, ...]})
+
+        Returns:
+            RecipeBook instance
+        """
+        with open(recipes_file, 'r', encoding='utf-8') as infile:
+            document = json.load(infile)
+        return cls([Recipe(definition) for definition in document.get('recipes', [])])
+
+    def _topological_order(self):
+        """Kahn's algorithm over recipe -> recipe edges"""
+        pending = {recipe_id: sum(1 for ingredient_id, _, _, _ in recipe.ingredients
+                                  if ingredient_id in self.recipes)
+                   for recipe_id, recipe in self.recipes.items()}
+        ready = deque(recipe_id for recipe_id, count in pending.items() if count == 0)
+        order = []
+        while ready:
+            recipe_id = ready.popleft()
+            order.append(recipe_id)
+            for dependent in self.dependents.get(recipe_id, ()):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.recipes):
+            cyclic = sorted(recipe_id for recipe_id, count in pending.items() if count > 0)
+            raise ValueError(f"Recipes form a cycle: {', '.join(cyclic)}")
+        return order
+
+    def base_ingredients(self):
+        """IDs of the warehouse foods the recipes use (not recipes themselves)"""
+        return {ingredient_id for ingredient_id in self.dependents if ingredient_id not in self.recipes}
+
+    def affected(self, changed_ids):
+        """
+        Recipes to re-derive after some foods or recipes changed
+
+        Args:
+            changed_ids: Iterable of food or recipe IDs
+        Returns:
+            Set of recipe IDs: the changed recipes and all their dependents
+        """
+        affected = set()
+        stack = list(changed_ids)
+        while stack:
+            food_id = stack.pop()
+            if food_id in self.recipes and food_id not in affected:
+                affected.add(food_id)
+            for dependent in self.dependents.get(food_id, ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    stack.append(dependent)
+        return affected
+
+# ===================================================================
+# EVALUATION
+# ===================================================================
+
+class RecipeEvaluator:
+    """
+    Derive per-100g nutrients of recipes from the warehouse foods
+
+    Results are memoized per recipe. After an ingredient changes only its
+    dependents are dropped from the memo (invalidate / update_food), and
+    reuse() seeds the memo from the previous build for every recipe whose
+    inputs are unchanged, so a build only re-derives what changed.
+
+    A nutrient is reported when at least one ingredient reports it; the
+    others count as zero. Weight lost to the yield factor is taken from
+    the moisture (water evaporates).
+    """
+
+    def __init__(self, book, foods, unit_config_for, category_for):
+        """
+        Args:
+            book: RecipeBook
+            foods: Mapping of food ID -> FoodRecord (the ingredients)
+            unit_config_for: Function (name, category) -> unit configuration of a recipe
+            category_for: Function name -> category, for recipes without one
+        """
+        self.book = book
+        self.foods = foods
+        self.unit_config_for = unit_config_for
+        self.category_for = category_for
+        self.memo = {}  # recipe id -> array('d') per 100g
+        self.errors = {}  # recipe id -> message
+        self.computed = 0
+        self.reused = 0
+        self._recipe_configs = {}
+
+    def category(self, recipe):
+        return recipe.category or self.category_for(recipe.name)
+
+    def unit_config(self, food_id):
+        """Unit configuration of a food or recipe"""
+        recipe = self.book.recipes.get(food_id)
+        if recipe is None:
+            return self.foods[food_id].unit_config
+        config = self._recipe_configs.get(food_id)
+        if config is None:
+            config = self.unit_config_for(recipe.name, self.category(recipe))
+            self._recipe_configs[food_id] = config
+        return config
+
+    def _grams(self, recipe, food_id, quantity, unit):
+        conversions = self.unit_config(food_id)['conversions']
+        grams_per_unit = conversions.get(unit)
+        if grams_per_unit is None:
+            if unit != GRAM_UNIT:
+                raise ValueError(f"Recipe '{recipe.id}': unit '{unit}' not known for '{food_id}'")
+            grams_per_unit = 1
+        return quantity * grams_per_unit
+
+    def _ingredient_nutrients(self, recipe, food_id):
+        if food_id in self.book.recipes:
+            return self.nutrients(food_id)
+        food = self.foods.get(food_id)
+        if food is None:
+            raise ValueError(f"Recipe '{recipe.id}': ingredient '{food_id}' is not in the warehouse")
+        return food.nutrients
+
+    def _compute(self, recipe):
+        count = len(NUTRIENT_KEYS)
+        sums = [0.0] * count
+        reported = [False] * count
+        raw_grams = 0.0
+
+        for food_id, quantity, unit, factors in recipe.ingredients:
+            nutrients = self._ingredient_nutrients(recipe, food_id)
+            grams = self._grams(recipe, food_id, quantity, unit)
+            raw_grams += grams
+            scale = grams / 100
+            for index, (value, factor) in enumerate(zip(nutrients, factors)):
+                if value == value:
+                    sums[index] += value * scale * factor
+                    reported[index] = True
+
+        cooked_grams = raw_grams * recipe.yield_factor
+        moisture = NUTRIENT_INDEX['moisture']
+        if reported[moisture]:
+            sums[moisture] = max(0.0, sums[moisture] - (raw_grams - cooked_grams))
+
+        self.computed += 1
+        return array('d', [round(total * 100 / cooked_grams, 2) if known else MISSING
+                           for total, known in zip(sums, reported)])
+
+    def nutrients(self, recipe_id):
+        """
+        Per-100g nutrients of a recipe (memoized)
+
+        Raises:
+            ValueError if the recipe cannot be derived (missing ingredient or unit)
+        """
+        result = self.memo.get(recipe_id)
+        if result is None:
+            if recipe_id in self.errors:
+                raise ValueError(self.errors[recipe_id])
+            try:
+                result = self._compute(self.book.recipes[recipe_id])
+            except ValueError as error:
+                self.errors[recipe_id] = str(error)
+                raise
+            self.memo[recipe_id] = result
+        return result
+
+    def evaluate_all(self):
+        """
+        Derive every recipe not in the memo, ingredients first
+
+        Returns:
+            Dictionary of recipe id -> error message for recipes that failed
+        """
+        for recipe_id in self.book.order:
+            if recipe_id not in self.memo and recipe_id not in self.errors:
+                try:
+                    self.nutrients(recipe_id)
+                except ValueError:
+                    pass
+        return self.errors
+
+    def invalidate(self, changed_ids):
+        """
+        Drop the results that depend on changed foods or recipes
+
+        Returns:
+            Set of recipe IDs that will be re-derived
+        """
+        affected = self.book.affected(changed_ids)
+        for recipe_id in affected:
+            self.memo.pop(recipe_id, None)
+            self.errors.pop(recipe_id, None)
+            self._recipe_configs.pop(recipe_id, None)
+        return affected
+
+    def update_food(self, food_id, record):
+        """
+        Replace (or add) an ingredient and invalidate its dependents
+
+        Args:
+            food_id: Food ID
+            record: FoodRecord, or None to remove the food
+        Returns:
+            Set of recipe IDs that will be re-derived
+        """
+        if record is None:
+            self.foods.pop(food_id, None)
+        else:
+            self.foods[food_id] = record
+        return self.invalidate([food_id])
+
+    # ---------------------------------------------------------------
+    # Results of the previous build
+    # ---------------------------------------------------------------
+
+    def _fingerprint(self, food_id):
+        """Digest of everything a recipe takes from one ingredient"""
+        recipe = self.book.recipes.get(food_id)
+        if recipe is not None:
+            return _digest([recipe.digest, self.unit_config(food_id)['conversions']])
+        food = self.foods.get(food_id)
+        if food is None:
+            return None
+        return _digest([[None if value != value else value for value in food.nutrients],
+                        food.unit_config['conversions']])
+
+    def reuse(self, cache_file=RECIPE_CACHE_FILE):
+        """
+        Seed the memo with the previous build's results where nothing changed
+
+        A missing or malformed cache reuses nothing.
+
+        Returns:
+            Number of recipes reused
+        """
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as infile:
+                state = json.load(infile)
+            if state.get('format') != RECIPE_CACHE_FORMAT:
+                return 0
+
+            fingerprints = state['fingerprints']
+            changed = [food_id for food_id in list(self.book.base_ingredients()) + list(self.book.recipes)
+                       if fingerprints.get(food_id) != self._fingerprint(food_id)]
+            changed += [recipe_id for recipe_id in self.book.recipes if recipe_id not in state['results']]
+            stale = self.book.affected(changed)
+
+            seeded = {}
+            for recipe_id in self.book.recipes:
+                if recipe_id not in stale and recipe_id not in self.memo:
+                    nutrients = FoodRecord.nutrients_from_values(state['results'][recipe_id])
+                    if len(nutrients) != len(NUTRIENT_KEYS):
+                        raise ValueError(f"Cached result of '{recipe_id}' has the wrong length")
+                    seeded[recipe_id] = nutrients
+        except Exception:
+            return 0  # Missing, unreadable or edited by hand: every recipe is computed again
+
+        self.memo.update(seeded)
+        self.reused += len(seeded)
+        return self.reused
+
+    def save(self, cache_file=RECIPE_CACHE_FILE):
+        """Store fingerprints and results for the next build's reuse()"""
+        ids = list(self.book.base_ingredients()) + list(self.book.recipes)
+        state = {
+            'format': RECIPE_CACHE_FORMAT,
+            'fingerprints': {food_id: self._fingerprint(food_id) for food_id in ids},
+            'results': {recipe_id: [None if value != value else value for value in nutrients]
+                        for recipe_id, nutrients in self.memo.items()}
+        }
+        with atomic_output(cache_file) as outfile:
+            json.dump(state, outfile, ensure_ascii=False, separators=(',', ':'))
+
+    def records(self, source_pdf, page='', dataset=None):
+        """
+        Build the output records of every derived recipe (in dependency order)
+
+        Returns:
+            List of FoodRecord
+        """
+        records = []
+        for recipe_id in self.book.order:
+            nutrients = self.memo.get(recipe_id)
+            if nutrients is None:
+                continue
+            recipe = self.book.recipes[recipe_id]
+            notes = f"Recipe of {len(recipe.ingredients)} ingredients"
+            if recipe.notes:
+                notes = f"{notes} | {recipe.notes}"
+            records.append(FoodRecord(recipe_id, recipe.name, array('d', nutrients),
+                                      self.unit_config(recipe_id), self.category(recipe),
+                                      source_pdf, page, notes, dataset))
+        return records
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+def load_warehouse_foods(warehouse_file):
+    """Read a converted (full schema) warehouse file into FoodRecords"""
+    foods = {}
+    with open_input(warehouse_file, newline='') as infile:
+        for row in csv.DictReader(infile):
+            nutrition = json.loads(row['nutritionPer100g'])
+            unit_config = {'defaultUnit': row['defaultUnit'], 'units': json.loads(row['units']),
+                           'conversions': json.loads(row['unitConversions'])}
+            foods[row['id']] = FoodRecord(
+                row['id'], row['name'],
+                FoodRecord.nutrients_from_values(nutrition.get(key) for key in NUTRIENT_KEYS),
+                unit_config, row['category'], row['source_pdf'], row['page'], row['notes']
+            )
+    return foods
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive recipe nutrients from a converted warehouse file")
+    parser.add_argument('warehouse_file', help="Output of a converter (full schema)")
+    parser.add_argument('recipe_ids', nargs='*', help="Recipes to show (default: all)")
+    parser.add_argument('--recipes', default=RECIPES_FILE, help="Recipe definitions")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules()
+        book = RecipeBook.load(args.recipes)
+        foods = load_warehouse_foods(args.warehouse_file)
+        evaluator = RecipeEvaluator(book, foods, rules.unit_config,
+                                    lambda name: rules.categorize(name, 'Alimentos'))
+        errors = evaluator.evaluate_all()
+        for recipe_id in args.recipe_ids or book.order:
+            if recipe_id in errors:
+                print(f"✗ {recipe_id}: {errors[recipe_id]}")
+                continue
+            nutrients = evaluator.nutrients(recipe_id)
+            values = ', '.join(f"{key}={value:g}" for key, value in zip(NUTRIENT_KEYS, nutrients)
+                               if value == value and key in ('calories', 'protein', 'fat', 'carbs', 'fiber'))
+            print(f"{recipe_id}: {values}")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except (KeyError, ValueError) as e:
+        print(f"✗ Error: {str(e)}")
@@ -0,0 +1,289 @@
+import json
+import math
+from array import array
+
+# ===================================================================
+# NUTRIENT LAYOUT
+# ===================================================================
+
+# nutritionPer100g keys, in output order, and the source column each comes from
+NUTRIENT_COLUMNS = [
+    # Main macronutrients
+    ('calories', 'energy_kcal'),
+    ('energy_kj', 'energy_kj'),
+    ('protein', 'protein_g'),
+    ('fat', 'lipids_g'),  # Note: lipids = fats
+    ('carbs', 'carbohydrate_g'),
+    ('fiber', 'fiber_g'),
+    ('cholesterol', 'cholesterol_mg'),
+    ('moisture', 'moisture_pct'),
+    ('ash', 'ash_g'),
+
+    # Minerals
+    ('calcium', 'calcium_mg'),
+    ('magnesium', 'magnesium_mg'),
+    ('manganese', 'manganese_mg'),
+    ('phosphorus', 'phosphorus_mg'),
+    ('iron', 'iron_mg'),
+    ('sodium', 'sodium_mg'),
+    ('potassium', 'potassium_mg'),
+    ('copper', 'copper_mg'),
+    ('zinc', 'zinc_mg'),
+
+    # Vitamins
+    ('retinol', 'retinol_mcg'),
+    ('re', 're_mcg'),
+    ('rae', 'rae_mcg'),
+    ('thiamine', 'thiamine_mg'),
+    ('riboflavin', 'riboflavin_mg'),
+    ('pyridoxine', 'pyridoxine_mg'),
+    ('niacin', 'niacin_mg'),
+    ('vitamin_c', 'vitamin_c_mg')
+]
+
+NUTRIENT_KEYS = [key for key, _ in NUTRIENT_COLUMNS]
+SOURCE_NUTRIENT_COLUMNS = [column for _, column in NUTRIENT_COLUMNS]
+NUTRIENT_INDEX = {key: index for index, key in enumerate(NUTRIENT_KEYS)}
+
+# Top-level output columns that repeat a nutrient from nutritionPer100g
+TOP_LEVEL_NUTRIENTS = [
+    ('energy_kcal', NUTRIENT_INDEX['calories']),
+    ('protein_g', NUTRIENT_INDEX['protein']),
+    ('fat_g', NUTRIENT_INDEX['fat']),
+    ('carbs_g', NUTRIENT_INDEX['carbs']),
+    ('fiber_g', NUTRIENT_INDEX['fiber']),
+    ('calcium_mg', NUTRIENT_INDEX['calcium']),
+    ('iron_mg', NUTRIENT_INDEX['iron']),
+    ('sodium_mg', NUTRIENT_INDEX['sodium'])
+]
+
+# Output column order
+OUTPUT_FIELDNAMES = [
+    'id', 'name', 'portion_g', 'energy_kcal', 'protein_g',
+    'fat_g', 'carbs_g', 'fiber_g', 'calcium_mg', 'iron_mg',
+    'sodium_mg', 'defaultUnit', 'units', 'unitConversions',
+    'nutritionPer100g', 'category', 'source_pdf', 'page', 'notes'
+]
+
+MISSING = math.nan  # Stored for nutrients the source does not report
+
+# ===================================================================
+# FOOD RECORD
+# ===================================================================
+
+# Serialized units/unitConversions per unit configuration (there are only a few)
+_unit_json_cache = {}
+
+def _unit_json(unit_config):
+    """Get the JSON strings of a unit configuration, encoding it only once"""
+    cached = _unit_json_cache.get(id(unit_config))
+    if cached is None or cached[0] is not unit_config:
+        cached = (
+            unit_config,
+            json.dumps(unit_config['units'], ensure_ascii=False),
+            json.dumps(unit_config['conversions'], ensure_ascii=False)
+        )
+        _unit_json_cache[id(unit_config)] = cached
+    return cached[1], cached[2]
+
+class FoodRecord:
+    """
+    Compact in-memory form of one converted food
+
+    Nutrients live in a single array('d') (NaN = not reported) and the unit
+    configuration is shared with every other food of the same config.
+    CSV/JSON strings are only produced by to_row() when writing output.
+    """
+
+    __slots__ = ('id', 'name', 'portion_g', 'nutrients', 'unit_config',
+                 'category', 'source_pdf', 'page', 'notes', 'dataset', 'alias_key')
+
+    def __init__(self, food_id, name, nutrients, unit_config, category,
+                 source_pdf, page, notes, dataset=None, portion_g=100, alias_key=None):
+        """
+        Args:
+            food_id: Final ID of the food
+            name: Name of the food item
+            nutrients: array('d') in NUTRIENT_KEYS order
+            unit_config: Dictionary with defaultUnit, units list, and conversions
+            category: Category string
+            source_pdf: Source document reference
+            page: Page number in source document
+            notes: Free-text notes
+            dataset: Dataset number the food came from (None for single-file runs)
+            portion_g: Portion size in grams
+            alias_key: Alias key of the name, if computed during conversion
+        """
+        self.id = food_id
+        self.name = name
+        self.portion_g = portion_g
+        self.nutrients = nutrients
+        self.unit_config = unit_config
+        self.category = category
+        self.source_pdf = source_pdf
+        self.page = page
+        self.notes = notes
+        self.dataset = dataset
+        self.alias_key = alias_key
+
+    @staticmethod
+    def nutrients_from_values(values):
+        """
+        Build the nutrient array from values in NUTRIENT_KEYS order
+
+        Args:
+            values: Iterable of floats or None
+        Returns:
+            array('d') with NaN for missing values
+        """
+        return array('d', [MISSING if value is None else value for value in values])
+
+    def copy(self):
+        """Return a shallow copy with its own nutrient array"""
+        return FoodRecord(self.id, self.name, array('d', self.nutrients), self.unit_config,
+                          self.category, self.source_pdf, self.page, self.notes,
+                          self.dataset, self.portion_g, self.alias_key)
+
+    def nutrient(self, key):
+        """Value of one nutrient, or None if not reported"""
+        value = self.nutrients[NUTRIENT_INDEX[key]]
+        return None if value != value else value
+
+    def nutrition(self):
+        """nutritionPer100g as a dictionary (reported nutrients only)"""
+        return {key: value for key, value in zip(NUTRIENT_KEYS, self.nutrients) if value == value}
+
+    def to_row(self):
+        """
+        Serialize to an output row (dictionary keyed by OUTPUT_FIELDNAMES)
+        """
+        nutrients = self.nutrients
+        units_json, conversions_json = _unit_json(self.unit_config)
+
+        row = {'id': self.id, 'name': self.name, 'portion_g': self.portion_g}
+        for field, index in TOP_LEVEL_NUTRIENTS:
+            value = nutrients[index]
+            row[field] = 'NULL' if value != value else str(value)
+        row['defaultUnit'] = self.unit_config['defaultUnit']
+        row['units'] = units_json
+        row['unitConversions'] = conversions_json
+        row['nutritionPer100g'] = json.dumps(self.nutrition(), ensure_ascii=False)
+        row['category'] = self.category
+        row['source_pdf'] = self.source_pdf
+        row['page'] = self.page
+        row['notes'] = self.notes
+        return row
+
+# ===================================================================
+# PASSTHROUGH RECORD
+# ===================================================================
+
+# Unit configurations by their serialized form, so passthrough rows that
+# spell out a known configuration share its object
+_unit_config_by_json = {}
+
+def register_unit_configs(configs):
+    """
+    Make passthrough rows resolve to these shared configuration objects
+
+    Args:
+        configs: Iterable of unit configuration dictionaries
+    """
+    for config in configs:
+        units_json, conversions_json = _unit_json(config)
+        _unit_config_by_json[(config['defaultUnit'], units_json, conversions_json)] = config
+
+class PassthroughRecord(FoodRecord):
+    """
+    A food read from an already-converted table
+
+    The row's cells are kept as read and to_row() hands them back, so the
+    JSON columns are neither parsed nor re-encoded on the way through.
+    Nutrients and the unit configuration are decoded on first use (by
+    validation, lineage or merging) and are treated as read-only.
+    """
+
+    __slots__ = ('cells', '_nutrients', '_unit_config')
+
+    def __init__(self, food_id, cells, dataset=None):
+        """
+        Args:
+            food_id: ID of the food
+            cells: Dictionary of output column -> cell string (OUTPUT_FIELDNAMES)
+            dataset: Dataset number the food came from
+        """
+        self.cells = cells
+        self._nutrients = None
+        self._unit_config = None
+        self.id = food_id
+        self.name = cells['name']
+        self.portion_g = cells['portion_g']
+        self.category = cells['category']
+        self.source_pdf = cells['source_pdf']
+        self.page = cells['page']
+        self.notes = cells['notes']
+        self.dataset = dataset
+        self.alias_key = None
+
+    def __reduce__(self):
+        # Only the cells travel between processes, never decoded values
+        return PassthroughRecord, (self.id, self.cells, self.dataset)
+
+    @property
+    def nutrients(self):
+        if self._nutrients is None:
+            nutrition = json.loads(self.cells['nutritionPer100g'] or '{}')
+            if not isinstance(nutrition, dict):
+                raise ValueError("nutritionPer100g is not a JSON object")
+            try:
+                self._nutrients = FoodRecord.nutrients_from_values(
+                    nutrition.get(key) for key in NUTRIENT_KEYS
+                )
+            except TypeError:
+                raise ValueError("nutritionPer100g has non-numeric values") from None
+        return self._nutrients
+
+    @nutrients.setter
+    def nutrients(self, value):
+        self._nutrients = value
+
+    @property
+    def unit_config(self):
+        if self._unit_config is None:
+            cells = self.cells
+            key = (cells['defaultUnit'], cells['units'], cells['unitConversions'])
+            config = _unit_config_by_json.get(key)
+            if config is None:
+                units = json.loads(cells['units'])
+                conversions = json.loads(cells['unitConversions'])
+                if not isinstance(units, list) or not isinstance(conversions, dict):
+                    raise ValueError("units/unitConversions are not a JSON list/object")
+                config = {'defaultUnit': cells['defaultUnit'], 'units': units, 'conversions': conversions}
+                _unit_config_by_json[key] = config
+            self._unit_config = config
+        return self._unit_config
+
+    @unit_config.setter
+    def unit_config(self, value):
+        self._unit_config = value
+
+    def decode(self):
+        """
+        Decode nutrients and unit configuration now
+
+        Raises:
+            ValueError if a JSON column is malformed
+        """
+        self.nutrients
+        self.unit_config
+
+    def to_row(self):
+        """
+        Serialize to an output row: the cells as read, with the current ID
+        """
+        row = dict(self.cells)
+        row['id'] = self.id
+        row['name'] = self.name
+        row['category'] = self.category
+        row['notes'] = self.notes
+        return row
@@ -0,0 +1,346 @@
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+from food_aliases import SynonymTable, normalize_alias
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# External rules file with unit configurations, category keywords and
+# per-food overrides (shared by food_converter.py and multi_dataset_converter.py)
+RULES_FILE = Path(__file__).with_name('unit_rules.json')
+
+# Directory where the compiled rules are cached, keyed by the rules file hash
+RULES_CACHE_DIRECTORY = Path(__file__).with_name('.rules_cache')
+
+# Bump when the compiled layout changes so stale caches are ignored
+COMPILED_FORMAT_VERSION = 5
+
+# ===================================================================
+# KEYWORD AUTOMATON
+# ===================================================================
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over all category and override keywords
+
+    A single left-to-right scan of a food name reports every keyword it
+    contains, instead of running one substring search per keyword.
+    """
+
+    def __init__(self, keywords):
+        """
+        Build the automaton
+
+        Args:
+            keywords: Iterable of (keyword, payload) pairs
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        # Step 1: Build the trie
+        for keyword, payload in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(payload)
+
+        # Step 2: Breadth-first pass to compute failure links
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """
+        Return the payloads of every keyword found in text
+
+        Args:
+            text: Text to scan (already lowercased)
+        Returns:
+            List of payloads, one per match
+        """
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        found = []
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.extend(output[state])
+
+        return found
+
+# ===================================================================
+# COMPILED RULES
+# ===================================================================
+
+class CompiledRules:
+    """
+    Precomputed lookup tables built from the rules file
+    """
+
+    def __init__(self, rules, source_hash):
+        """
+        Compile the raw rules
+
+        Args:
+            rules: Parsed rules file (dictionary)
+            source_hash: SHA-256 of the rules file the tables came from
+        """
+        self.source_hash = source_hash
+        self.format_version = COMPILED_FORMAT_VERSION
+        self.default_category = rules.get('default_category', 'Alimentos')
+        self.default_config = rules.get('default_config', 'default')
+
+        # Unit configurations keyed by config name
+        self.unit_configs = rules['unit_configs']
+        if self.default_config not in self.unit_configs:
+            raise ValueError(f"Default unit config '{self.default_config}' is not defined")
+
+        # Category order decides priority when several keywords match
+        self.category_names = [category['name'] for category in rules['categories']]
+
+        # category -> unit config index
+        self.category_configs = {}
+        for category in rules['categories']:
+            config_name = category.get('config', self.default_config)
+            if config_name not in self.unit_configs:
+                raise ValueError(f"Category '{category['name']}' uses unknown unit config '{config_name}'")
+            self.category_configs[category['name']] = self.unit_configs[config_name]
+
+        # Exact-name overrides and keyword overrides
+        self.name_overrides = {}
+        self.keyword_overrides = []
+        self.override_bases = []  # (override config, name of the config it extends)
+        keywords = []
+
+        # Synonyms and explicit aliases (see food_aliases.py)
+        self.synonyms = SynonymTable(rules.get('synonyms', []))
+        self.food_aliases = rules.get('food_aliases', {})
+
+        # Prepared-dish words: synonyms in a dish name are ingredients and do
+        # not decide its category ('Bolo, pronto, aipim' is not a tuber)
+        self.dish_words = {normalize_alias(word) for word in rules.get('dish_words', [])}
+
+        # Canonical keyword words -> category index, so accent-free and
+        # synonym spellings match whole words ('feijao', 'cassava')
+        self.keyword_words = {}
+        self.keyword_max_words = 1
+
+        for category_index, category in enumerate(rules['categories']):
+            for keyword in category['keywords']:
+                keywords.append((keyword.lower(), ('category', category_index)))
+                words = tuple(self.synonyms.canonical_words(keyword))
+                self.keyword_words.setdefault(words, category_index)
+                self.keyword_max_words = max(self.keyword_max_words, len(words))
+
+        for override in rules.get('food_overrides', []):
+            config = self._build_override_config(override)
+            if 'name' in override:
+                self.name_overrides[override['name'].strip().lower()] = config
+            elif 'contains' in override:
+                override_index = len(self.keyword_overrides)
+                self.keyword_overrides.append(config)
+                keywords.append((override['contains'].lower(), ('override', override_index)))
+            else:
+                raise ValueError(f"Food override needs 'name' or 'contains': {override}")
+
+        self.automaton = KeywordAutomaton(keywords)
+
+        # Every distinct configuration object, in a stable order (lets worker
+        # processes refer to a configuration by position)
+        self.config_list = list(self.unit_configs.values()) + [config for config, _ in self.override_bases]
+
+    def _build_override_config(self, override):
+        """
+        Resolve an override into a complete unit configuration
+
+        Args:
+            override: Override entry from the rules file
+        Returns:
+            Dictionary with defaultUnit, units list, and conversions
+        """
+        config_name = override.get('config', self.default_config)
+        if config_name not in self.unit_configs:
+            raise ValueError(f"Food override uses unknown unit config '{config_name}'")
+
+        base = self.unit_configs[config_name]
+        if 'conversions' not in override and 'defaultUnit' not in override:
+            return base
+
+        # Extra per-food units are appended to the base configuration
+        conversions = dict(base['conversions'])
+        conversions.update(override.get('conversions', {}))
+        units = list(base['units'])
+        units.extend(unit for unit in override.get('conversions', {}) if unit not in units)
+
+        config = {
+            'defaultUnit': override.get('defaultUnit', base['defaultUnit']),
+            'units': units,
+            'conversions': conversions
+        }
+        self.override_bases.append((config, config_name))
+        return config
+
+    def _match(self, food_lower):
+        """
+        Scan a lowercased food name once
+
+        Returns:
+            Tuple of (best category index or None, first keyword override index or None)
+        """
+        category_index = None
+        override_index = None
+
+        for kind, index in self.automaton.search(food_lower):
+            if kind == 'category':
+                if category_index is None or index < category_index:
+                    category_index = index
+            elif override_index is None or index < override_index:
+                override_index = index
+
+        return category_index, override_index
+
+    def _match_words(self, words):
+        """
+        Find the best category among the whole canonical words of a name
+
+        Returns:
+            Best category index or None
+        """
+        category_index = None
+        for start in range(len(words)):
+            for length in range(1, min(self.keyword_max_words, len(words) - start) + 1):
+                index = self.keyword_words.get(tuple(words[start:start + length]))
+                if index is not None and (category_index is None or index < category_index):
+                    category_index = index
+        return category_index
+
+    def categorize(self, food_name, default=None, words=None):
+        """
+        Categorize food based on keywords in the name
+
+        Keywords match as substrings of the name as written, and as whole
+        words after accent folding and synonym rewriting. Names of prepared
+        dishes (dish_words) skip the synonym rewriting.
+
+        Args:
+            food_name: Name of the food item
+            default: Category for unmatched foods (rules file default if None)
+            words: Canonical words of the name if already computed
+        Returns:
+            Category string
+        """
+        if words is None:
+            words = self.synonyms.canonical_words(food_name)
+        if not self.dish_words.isdisjoint(words):
+            words = normalize_alias(food_name).split()
+        category_index, _ = self._match(food_name.lower())
+        word_index = self._match_words(words)
+        if word_index is not None and (category_index is None or word_index < category_index):
+            category_index = word_index
+        if category_index is None:
+            return default if default is not None else self.default_category
+        return self.category_names[category_index]
+
+    def unit_config(self, food_name, category):
+        """
+        Get the appropriate unit configuration based on food name and category
+
+        Per-food overrides take precedence over the category mapping.
+
+        Args:
+            food_name: Name of the food item
+            category: Category of the food
+        Returns:
+            Dictionary with defaultUnit, units list, and conversions
+        """
+        food_lower = food_name.lower()
+
+        config = self.name_overrides.get(food_lower.strip())
+        if config is not None:
+            return config
+
+        _, override_index = self._match(food_lower)
+        if override_index is not None:
+            return self.keyword_overrides[override_index]
+
+        return self.category_configs.get(category, self.unit_configs[self.default_config])
+
+# ===================================================================
+# LOADING AND CACHING
+# ===================================================================
+
+_loaded_rules = {}
+
+def load_rules(rules_file=RULES_FILE, cache_directory=RULES_CACHE_DIRECTORY):
+    """
+    Load the compiled rules, reusing the on-disk cache when the file is unchanged
+
+    Args:
+        rules_file: Path to the JSON rules file
+        cache_directory: Directory for compiled caches (None disables caching)
+    Returns:
+        CompiledRules instance
+    """
+    rules_file = Path(rules_file)
+    raw = rules_file.read_bytes()
+    source_hash = hashlib.sha256(raw).hexdigest()
+
+    # Step 1: In-process cache
+    cached = _loaded_rules.get(source_hash)
+    if cached is not None:
+        return cached
+
+    # Step 2: On-disk cache keyed by the file hash
+    cache_path = None
+    if cache_directory is not None:
+        cache_path = Path(cache_directory) / f"{rules_file.stem}.{source_hash[:16]}.pickle"
+        try:
+            with open(cache_path, 'rb') as cache_file:
+                compiled = pickle.load(cache_file)
+            if (compiled.source_hash == source_hash
+                    and compiled.format_version == COMPILED_FORMAT_VERSION):
+                _loaded_rules[source_hash] = compiled
+                return compiled
+        except Exception:
+            pass  # Unreadable or stale (e.g. from another version): compiled again below
+
+    # Step 3: Compile and store
+    compiled = CompiledRules(json.loads(raw.decode('utf-8')), source_hash)
+
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_path.parent, exist_ok=True)
+            temp_path = cache_path.with_suffix('.tmp')
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump(compiled, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+
+    _loaded_rules[source_hash] = compiled
+    return compiled
@@ -0,0 +1,219 @@
+import argparse
+import csv
+import json
+from pathlib import Path
+
+from food_compression import detect_encoding, open_input
+from food_record import OUTPUT_FIELDNAMES, SOURCE_NUTRIENT_COLUMNS
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# JSON column mappings for further source tables (one file per table)
+MAPPING_DIRECTORY = Path(__file__).with_name('column_mappings')
+
+# ===================================================================
+# CANONICAL LAYOUTS
+# ===================================================================
+
+# 'raw' rows are renamed to the TACO columns and transformed as usual;
+# 'converted' rows already have the output layout and are passed through
+RAW_COLUMNS = ['description'] + SOURCE_NUTRIENT_COLUMNS
+CANONICAL_COLUMNS = {
+    'raw': RAW_COLUMNS,
+    'converted': OUTPUT_FIELDNAMES
+}
+
+class BoundSchema:
+    """
+    A column mapping resolved against one file's header
+    """
+
+    def __init__(self, name, kind, sources):
+        """
+        Args:
+            name: Name of the mapping
+            kind: 'raw' or 'converted'
+            sources: Dictionary of canonical column -> column in the file
+        """
+        self.name = name
+        self.kind = kind
+        self.sources = sources
+        # Files already in the canonical layout need no renaming at all
+        self.identity = all(canonical == source for canonical, source in sources.items())
+
+    def rename(self, row):
+        """
+        Key a source row by canonical column names
+
+        Canonical columns the file does not have are left out (read as
+        missing values). Rows of an identity mapping are returned as is.
+        """
+        if self.identity:
+            return row
+        return {canonical: row.get(source) for canonical, source in self.sources.items()}
+
+    def cells(self, row):
+        """
+        Canonical cells of a converted row, '' for columns the file lacks
+        """
+        cells = dict.fromkeys(OUTPUT_FIELDNAMES, '')
+        for field, source in self.sources.items():
+            cells[field] = row.get(source) or ''
+        return cells
+
+class ColumnMapping:
+    """
+    Pluggable mapping from a source table's header to a canonical layout
+
+    A mapping lists, per canonical column, the source column(s) it may be
+    found in; it matches a header that has every required column.
+    """
+
+    def __init__(self, name, kind, columns, required):
+        """
+        Args:
+            name: Name of the mapping (reported and usable to force it)
+            kind: 'raw' or 'converted'
+            columns: Dictionary of canonical column -> source column name,
+                or list of candidate names (the first present one is used)
+            required: Canonical columns a header must have to match
+        """
+        if kind not in CANONICAL_COLUMNS:
+            raise ValueError(f"Mapping '{name}': unknown kind '{kind}'")
+        unknown = [column for column in columns if column not in CANONICAL_COLUMNS[kind]]
+        if unknown:
+            raise ValueError(f"Mapping '{name}': unknown {kind} column(s): {', '.join(unknown)}")
+        missing = [column for column in required if column not in columns]
+        if missing:
+            raise ValueError(f"Mapping '{name}': required column(s) not mapped: {', '.join(missing)}")
+
+        self.name = name
+        self.kind = kind
+        self.columns = {canonical: [source] if isinstance(source, str) else list(source)
+                        for canonical, source in columns.items()}
+        self.required = list(required)
+
+    @classmethod
+    def from_file(cls, mapping_file):
+        """
+        Load a mapping file
+
+        Format:
+            {"name": "...", "kind": "raw", "required": ["description"],
+             "columns": {"description": "Food name", "energy_kcal": ["Energy", "kcal"]}}
+
+        "kind" defaults to "raw" and "required" to the name column.
+        """
+        with open(mapping_file, 'r', encoding='utf-8') as infile:
+            document = json.load(infile)
+        kind = document.get('kind', 'raw')
+        default_required = ['description'] if kind == 'raw' else ['name']
+        return cls(document.get('name', Path(mapping_file).stem), kind,
+                   document['columns'], document.get('required', default_required))
+
+    def definition(self):
+        """JSON-serializable form (part of the checkpoint fingerprint)"""
+        return {'name': self.name, 'kind': self.kind, 'columns': self.columns, 'required': self.required}
+
+    def bind(self, header):
+        """
+        Resolve the mapping against a header
+
+        Args:
+            header: List of column names of the file
+        Returns:
+            BoundSchema, or None if a required column is missing
+        """
+        present = set(header)
+        sources = {}
+        for canonical, candidates in self.columns.items():
+            source = next((candidate for candidate in candidates if candidate in present), None)
+            if source is not None:
+                sources[canonical] = source
+        if any(column not in sources for column in self.required):
+            return None
+        return BoundSchema(self.name, self.kind, sources)
+
+# Built-in layouts: TACO tables and this project's own converted output
+# (older converted tables name the column food_name and have no id)
+TACO_RAW = ColumnMapping('taco_raw', 'raw', {column: column for column in RAW_COLUMNS}, ['description'])
+CONVERTED_OUTPUT = ColumnMapping(
+    'converted_output', 'converted',
+    {**{field: field for field in OUTPUT_FIELDNAMES}, 'name': ['name', 'food_name']},
+    ['name', 'units', 'unitConversions', 'nutritionPer100g']
+)
+
+# ===================================================================
+# DETECTION
+# ===================================================================
+
+def load_mappings(directory=MAPPING_DIRECTORY):
+    """
+    Build the mapping registry: mapping files first, then the built-ins
+
+    Args:
+        directory: Directory of *.json mapping files (missing = built-ins only)
+    Returns:
+        List of ColumnMapping, in detection order
+    """
+    mappings = []
+    directory = Path(directory)
+    if directory.is_dir():
+        for mapping_file in sorted(directory.glob('*.json')):
+            mappings.append(ColumnMapping.from_file(mapping_file))
+    return mappings + [CONVERTED_OUTPUT, TACO_RAW]
+
+def read_header(input_file, encoding='utf-8'):
+    """
+    Read the header row of a (possibly compressed) CSV file
+
+    Returns:
+        List of column names ([] for an empty file)
+    """
+    with open_input(input_file, encoding, newline='') as infile:
+        return next(csv.reader(infile), [])
+
+def detect_schema(header, mappings, forced=None):
+    """
+    Pick the column mapping of a file from its header
+
+    Args:
+        header: List of column names
+        mappings: Registry from load_mappings()
+        forced: Optional mapping name to use instead of detection
+    Returns:
+        BoundSchema
+    Raises:
+        ValueError if no mapping (or not the forced one) matches the header
+    """
+    for mapping in mappings:
+        if forced is not None and mapping.name != forced:
+            continue
+        schema = mapping.bind(header)
+        if schema is not None:
+            return schema
+    if forced is not None:
+        raise ValueError(f"Header does not match column mapping '{forced}'")
+    raise ValueError(f"Unrecognized header: {', '.join(header[:8])}")
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show which column mapping applies to input files")
+    parser.add_argument('input_files', nargs='+', help="CSV files to inspect")
+    parser.add_argument('--mappings', default=MAPPING_DIRECTORY, help="Directory of mapping files")
+    args = parser.parse_args()
+
+    try:
+        mappings = load_mappings(args.mappings)
+        for input_file in args.input_files:
+            schema = detect_schema(read_header(input_file, detect_encoding(input_file)), mappings)
+            print(f"{input_file}: {schema.name} ({schema.kind}, {len(schema.sources)} columns)")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
@@ -0,0 +1,414 @@
+import argparse
+import bz2
+import csv
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import mmap
+import os
+import shutil
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+from food_aliases import normalize_alias
+from food_compression import CODEC_EXTENSIONS, _zstandard, compress_stream
+from food_output import atomic_output
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+SHARD_DIRECTORY = 'shards'  # Shard files and their manifest
+MANIFEST_FILE = 'manifest.json'  # Inside the shard directory
+SHARD_CACHE_DIRECTORY = '.shard_cache'  # Local copies of fetched remote shards
+MAX_OPEN_SHARDS = 32  # Shards (compressors) open at the same time while writing
+
+SHARD_FORMAT = 1
+
+# ===================================================================
+# WRITING
+# ===================================================================
+
+class _HashingFile:
+    """Binary file wrapper that hashes and counts what is written through it"""
+
+    def __init__(self, raw, digest):
+        self.raw = raw
+        self.digest = digest
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+    def writable(self):
+        return True
+
+    def readable(self):
+        return False
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.raw.close()
+
+    @property
+    def closed(self):
+        return self.raw.closed
+
+class _Shard:
+    """State of one shard while it is written"""
+
+    def __init__(self, file_name, category, source_pdf):
+        self.file_name = file_name
+        self.category = category
+        self.source_pdf = source_pdf
+        self.rows = 0
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.id_min = None
+        self.id_max = None
+        self.started = False
+
+    def entry(self):
+        return {
+            'file': self.file_name,
+            'category': self.category,
+            'source_pdf': self.source_pdf,
+            'rows': self.rows,
+            'bytes': self.size,
+            'sha256': self.digest.hexdigest(),
+            'id_min': self.id_min,
+            'id_max': self.id_max
+        }
+
+class ShardWriter:
+    """
+    Partition rows by (category, source_pdf) into compressed shard files
+
+    Rows are routed to their shard as they stream past, so the export is
+    part of the single pass that writes the main output. Only a bounded
+    number of compressors is open; a shard whose file was closed gets a
+    new compressed member appended when more rows arrive (concatenated
+    gzip/bz2/xz/zstd members decompress as one stream). The sha256 and
+    size of every shard are taken from the bytes as they are written.
+    Shards are built in a staging directory that replaces the previous
+    export, manifest included, when close() succeeds.
+
+    Usage:
+        with ShardWriter('shards', fieldnames) as shards:
+            for record in records:
+                shards.write(record, row)
+    """
+
+    def __init__(self, directory, fieldnames, codec='gzip', level=None, max_open=MAX_OPEN_SHARDS):
+        """
+        Args:
+            directory: Shard directory (replaced as a whole)
+            fieldnames: Column order of the shard CSV files
+            codec: 'gzip', 'bz2', 'xz', 'zstd' or None for plain CSV
+            level: Compression level (codec default if None)
+            max_open: Maximum number of shards open at the same time
+        """
+        if codec is not None and codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        self.directory = Path(directory)
+        self.staging = self.directory.with_name(self.directory.name + '.partial')
+        self.fieldnames = fieldnames
+        self.codec = codec
+        self.level = level
+        self.max_open = max(1, max_open)
+        self.shards = {}  # (category, source_pdf) -> _Shard
+        self.file_names = set()
+        self.open_shards = OrderedDict()  # key -> (shard, hashing file, text stream, writer)
+        self.manifest = None
+        shutil.rmtree(self.staging, ignore_errors=True)
+        os.makedirs(self.staging)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._close_files()
+            shutil.rmtree(self.staging, ignore_errors=True)
+        return False
+
+    def _file_name(self, category, source_pdf):
+        """Unique, filesystem-safe shard file name"""
+        stem = '__'.join(normalize_alias(part or 'none').replace(' ', '_') or 'none'
+                         for part in (category, source_pdf))
+        file_name = f"{stem}.csv{CODEC_EXTENSIONS.get(self.codec, '')}"
+        number = 1
+        while file_name in self.file_names:
+            number += 1
+            file_name = f"{stem}_{number}.csv{CODEC_EXTENSIONS.get(self.codec, '')}"
+        self.file_names.add(file_name)
+        return file_name
+
+    def _writer(self, key):
+        entry = self.open_shards.get(key)
+        if entry is not None:
+            self.open_shards.move_to_end(key)
+            return entry[3]
+
+        if len(self.open_shards) >= self.max_open:
+            _, oldest = self.open_shards.popitem(last=False)
+            self._close_entry(oldest)
+
+        shard = self.shards[key]
+        hashing = _HashingFile(open(self.staging / shard.file_name, 'ab'), shard.digest)
+        stream = hashing if self.codec is None else compress_stream(hashing, self.codec, self.level)
+        text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        writer = csv.DictWriter(text, fieldnames=self.fieldnames)
+        if not shard.started:
+            writer.writeheader()
+            shard.started = True
+        self.open_shards[key] = (shard, hashing, text, writer)
+        return writer
+
+    def _close_entry(self, entry):
+        shard, hashing, text, _ = entry
+        text.close()  # Finishes the compressed member
+        if not hashing.closed:
+            hashing.close()
+        shard.size += hashing.size
+
+    def write(self, record, row):
+        """
+        Write one output row to the shard of its record
+
+        Args:
+            record: FoodRecord (category, source_pdf and id pick the shard)
+            row: Serialized output row (dictionary keyed by fieldnames)
+        """
+        key = (record.category, record.source_pdf)
+        shard = self.shards.get(key)
+        if shard is None:
+            shard = self.shards[key] = _Shard(self._file_name(*key), *key)
+        self._writer(key).writerow(row)
+        shard.rows += 1
+        if shard.id_min is None or record.id < shard.id_min:
+            shard.id_min = record.id
+        if shard.id_max is None or record.id > shard.id_max:
+            shard.id_max = record.id
+
+    def _close_files(self):
+        for entry in self.open_shards.values():
+            self._close_entry(entry)
+        self.open_shards.clear()
+
+    def close(self):
+        """
+        Finish every shard, write the manifest and publish the directory
+
+        Returns:
+            The manifest dictionary (also kept as self.manifest)
+        """
+        self._close_files()
+        self.manifest = manifest = {
+            'format': SHARD_FORMAT,
+            'codec': self.codec,
+            'fieldnames': self.fieldnames,
+            'rows': sum(shard.rows for shard in self.shards.values()),
+            'shards': [shard.entry() for _, shard in sorted(self.shards.items(),
+                                                              key=lambda item: (item[0][0] or '', item[0][1] or ''))]
+        }
+        with atomic_output(self.staging / MANIFEST_FILE) as outfile:
+            json.dump(manifest, outfile, ensure_ascii=False, indent=2)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.staging, self.directory)
+        return manifest
+
+# ===================================================================
+# LOADING
+# ===================================================================
+
+def _is_url(location):
+    return urlparse(str(location)).scheme in ('http', 'https', 'file')
+
+def _urlopen(url):
+    """Open a URL (urllib.request and its HTTP stack are only imported for remote exports)"""
+    from urllib.request import urlopen
+    return urlopen(url)
+
+class _MappedFile(io.RawIOBase):
+    """Read-only raw stream over a memory mapping (mmap itself is not an io object)"""
+
+    def __init__(self, mapped):
+        self.mapped = mapped
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.mapped.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as infile:
+        for block in iter(lambda: infile.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ShardLoader:
+    """
+    Read only the shards a client needs
+
+    The manifest is read from a local shard directory or a URL. Selected
+    shards of a remote export are downloaded once into a cache directory
+    (a cached copy whose sha256 still matches the manifest is reused, so
+    a sync only fetches changed shards); every shard is then memory-mapped
+    and decompressed from the mapping, so nothing else is read.
+    """
+
+    def __init__(self, location=SHARD_DIRECTORY, cache_directory=SHARD_CACHE_DIRECTORY):
+        """
+        Args:
+            location: Shard directory, manifest file, or URL of either
+            cache_directory: Where remote shards are stored locally
+        """
+        location = str(location)
+        if not location.endswith('.json'):
+            location = location.rstrip('/') + '/' + MANIFEST_FILE
+        self.location = location
+        self.remote = _is_url(location)
+        self.cache_directory = Path(cache_directory)
+        if self.remote:
+            with _urlopen(location) as response:
+                self.manifest = json.loads(response.read().decode('utf-8'))
+        else:
+            with open(location, 'r', encoding='utf-8') as infile:
+                self.manifest = json.load(infile)
+        if self.manifest.get('format') != SHARD_FORMAT:
+            raise ValueError(f"Unsupported shard manifest format: {self.manifest.get('format')}")
+        self.fetched = 0
+
+    def select(self, categories=None, sources=None, food_id=None):
+        """
+        Manifest entries of the shards matching every given filter
+
+        Args:
+            categories: Optional container of categories
+            sources: Optional container of source_pdf values
+            food_id: Optional ID; only shards whose id range covers it
+        Returns:
+            List of shard entries
+        """
+        return [
+            shard for shard in self.manifest['shards']
+            if (categories is None or shard['category'] in categories)
+            and (sources is None or shard['source_pdf'] in sources)
+            and (food_id is None or shard['id_min'] <= food_id <= shard['id_max'])
+        ]
+
+    def local_path(self, shard):
+        """
+        Local file of a shard, downloading it if needed
+
+        Raises:
+            ValueError if the file does not match the manifest's sha256
+        """
+        if not self.remote:
+            return Path(self.location).parent / shard['file']
+        path = self.cache_directory / shard['file']
+        if path.exists() and _file_sha256(path) == shard['sha256']:
+            return path
+        os.makedirs(self.cache_directory, exist_ok=True)
+        with _urlopen(urljoin(self.location, shard['file'])) as response:
+            with atomic_output(path, 'wb') as outfile:
+                shutil.copyfileobj(response, outfile)
+        self.fetched += 1
+        if _file_sha256(path) != shard['sha256']:
+            raise ValueError(f"Shard {shard['file']} does not match its manifest hash")
+        return path
+
+    def rows(self, shard):
+        """
+        Yield the rows (dictionaries) of one shard
+
+        Args:
+            shard: Manifest entry from select()
+        """
+        path = self.local_path(shard)
+        with open(path, 'rb') as raw:
+            if os.fstat(raw.fileno()).st_size == 0:
+                return
+            with mmap.mmap(raw.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                codec = self.manifest['codec']
+                stream = io.BufferedReader(_MappedFile(mapped))
+                if codec == 'gzip':
+                    stream = gzip.GzipFile(fileobj=stream, mode='rb')
+                elif codec == 'bz2':
+                    stream = bz2.BZ2File(stream, mode='rb')
+                elif codec == 'xz':
+                    stream = lzma.LZMAFile(stream, mode='rb')
+                elif codec == 'zstd':
+                    stream = _zstandard().ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+                lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+                yield from csv.DictReader(lines)
+
+    def load(self, categories=None, sources=None):
+        """
+        Rows of every selected shard
+
+        Returns:
+            List of row dictionaries
+        """
+        return [row for shard in self.select(categories, sources) for row in self.rows(shard)]
+
+    def find(self, food_id, categories=None):
+        """
+        Row of one food, reading only shards whose id range covers it
+
+        Returns:
+            Row dictionary, or None
+        """
+        for shard in self.select(categories, food_id=food_id):
+            for row in self.rows(shard):
+                if row['id'] == food_id:
+                    return row
+        return None
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List or load shards of a sharded export")
+    parser.add_argument('location', nargs='?', default=SHARD_DIRECTORY, help="Shard directory, manifest or URL")
+    parser.add_argument('--category', action='append', help="Only this category (repeatable)")
+    parser.add_argument('--source', action='append', help="Only this source_pdf (repeatable)")
+    parser.add_argument('--id', help="Show the row of one food")
+    parser.add_argument('--cache', default=SHARD_CACHE_DIRECTORY, help="Cache for remote shards")
+    args = parser.parse_args()
+
+    try:
+        loader = ShardLoader(args.location, args.cache)
+        if args.id:
+            row = loader.find(args.id, args.category)
+            print(json.dumps(row, ensure_ascii=False, indent=2) if row else f"✗ {args.id} not found")
+        else:
+            selected = loader.select(args.category, args.source)
+            for shard in selected:
+                print(f"  • {shard['file']}: {shard['rows']} rows, {shard['bytes']} bytes "
+                      f"({shard['id_min']} .. {shard['id_max']})")
+            loaded = sum(1 for shard in selected for _ in loader.rows(shard))
+            print(f"✓ {loaded} rows from {len(selected)} of {len(loader.manifest['shards'])} shards "
+                  f"({loader.fetched} downloaded)")
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
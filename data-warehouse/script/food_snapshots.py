@@ -0,0 +1,277 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from contextlib import ExitStack
+from itertools import islice
+from pathlib import Path
+
+from food_compression import codec_for_path, open_output
+from food_output import atomic_output
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+SNAPSHOT_DIRECTORY = 'warehouse_store'  # Root of the snapshot store
+
+# ===================================================================
+# SNAPSHOT STORE
+# ===================================================================
+
+class SnapshotStore:
+    """
+    Versioned, content-addressed store of warehouse builds
+
+    Layout:
+        objects/ab/abcdef....csv   one chunk (CSV rows of one dataset, no header)
+        versions/<version>.json    manifest: fieldnames, chunks and output order
+        CURRENT                    name of the current version
+
+    Chunks are named by the SHA-256 of their content, so a dataset whose
+    rows did not change is stored once no matter how many builds use it.
+    The manifest's 'order' lists runs of [chunk position, row count], so
+    rows of different datasets interleaved in the output come back in the
+    same order. Versions are numbered by a 'sequence' that grows with
+    every commit.
+    Every file is written to a temporary name and renamed into place, and
+    CURRENT is switched last, so readers never observe a partial build.
+    """
+
+    def __init__(self, root=SNAPSHOT_DIRECTORY):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.versions = self.root / 'versions'
+        self.current_file = self.root / 'CURRENT'
+
+    def _object_path(self, digest):
+        return self.objects / digest[:2] / f"{digest}.csv"
+
+    def _put_chunk(self, rows, fieldnames):
+        """
+        Store one chunk unless identical content already exists
+
+        Returns:
+            Tuple of (digest, row count, bytes)
+        """
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        data = buffer.getvalue().encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+
+        path = self._object_path(digest)
+        if not path.exists():
+            os.makedirs(path.parent, exist_ok=True)
+            with atomic_output(path, 'wb') as outfile:
+                outfile.write(data)
+        return digest, count, len(data)
+
+    def commit(self, chunks, fieldnames, message='', order=None, output_file=None):
+        """
+        Store a new build and make it the current version
+
+        Args:
+            chunks: List of (label, iterable of rows)
+            fieldnames: Output column order
+            message: Optional description stored in the manifest
+            order: Runs of (chunk position, row count) in output order
+                (None = the chunks one after the other)
+            output_file: File the build was written to (re-exported by rollback)
+        Returns:
+            Tuple of (version id, True if the build differs from the current version)
+        """
+        entries = []
+        for label, rows in chunks:
+            digest, count, size = self._put_chunk(rows, fieldnames)
+            entries.append({'label': str(label), 'object': digest, 'rows': count, 'bytes': size})
+        if order is None:
+            order = [(position, entry['rows']) for position, entry in enumerate(entries)]
+        order = [[position, count] for position, count in order if count]
+
+        # The version id is derived from the content, so rebuilding identical data is a no-op
+        identity = json.dumps({'fieldnames': fieldnames, 'chunks': [entry['object'] for entry in entries],
+                               'order': order})
+        version = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+        previous = self.current()
+        if version == previous:
+            return version, False
+
+        manifest = {
+            'version': version,
+            'sequence': max((manifest.get('sequence', 0) for manifest in self.list_versions()), default=0) + 1,
+            'parent': previous,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'message': message,
+            'output_file': None if output_file is None else str(output_file),
+            'fieldnames': fieldnames,
+            'rows': sum(entry['rows'] for entry in entries),
+            'chunks': entries,
+            'order': order
+        }
+
+        manifest_path = self.versions / f"{version}.json"
+        if not manifest_path.exists():
+            os.makedirs(self.versions, exist_ok=True)
+            with atomic_output(manifest_path) as outfile:
+                json.dump(manifest, outfile, ensure_ascii=False, indent=2)
+
+        self._set_current(version)
+        return version, True
+
+    def _set_current(self, version):
+        os.makedirs(self.root, exist_ok=True)
+        with atomic_output(self.current_file) as outfile:
+            outfile.write(version + '\n')
+
+    def current(self):
+        """Current version id, or None for an empty store"""
+        try:
+            return self.current_file.read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, version=None):
+        """
+        Load the manifest of a version (the current one by default)
+        """
+        version = version or self.current()
+        if version is None:
+            raise ValueError("The snapshot store is empty")
+        try:
+            with open(self.versions / f"{version}.json", 'r', encoding='utf-8') as infile:
+                return json.load(infile)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown version: {version}") from None
+
+    def list_versions(self):
+        """
+        All manifests, oldest first (by sequence number)
+        """
+        if not self.versions.exists():
+            return []
+        manifests = []
+        for path in self.versions.glob('*.json'):
+            with open(path, 'r', encoding='utf-8') as infile:
+                manifests.append(json.load(infile))
+        # Manifests written before sequence numbers came first, by creation time
+        return sorted(manifests, key=lambda manifest: (manifest.get('sequence', 0), manifest['created']))
+
+    def rollback(self, version, output_file=None):
+        """
+        Make an earlier version current again and re-export its output file
+
+        Args:
+            version: Version to restore
+            output_file: File to re-export (None = the one recorded by the
+                version's build, if any)
+        Returns:
+            Path of the re-exported file, or None if there was none
+        """
+        manifest = self.manifest(version)  # Validates that the version exists
+        output_file = output_file or manifest.get('output_file')
+        if output_file:
+            self.export(output_file, version)
+        self._set_current(version)
+        return output_file
+
+    def _runs(self, manifest):
+        """
+        Runs of [chunk position, row count] in output order
+        """
+        if 'order' in manifest:
+            return manifest['order']
+        # Manifests written before the order was kept: chunks one after the other
+        return [[position, entry['rows']] for position, entry in enumerate(manifest['chunks'])]
+
+    def _chunk_readers(self, manifest, stack):
+        """Open a CSV reader per chunk (closed with the ExitStack)"""
+        return [
+            csv.reader(stack.enter_context(open(self._object_path(entry['object']), 'r',
+                                                encoding='utf-8', newline='')))
+            for entry in manifest['chunks']
+        ]
+
+    def iter_rows(self, version=None):
+        """
+        Yield the rows of a version as dictionaries, in output order
+        """
+        manifest = self.manifest(version)
+        fieldnames = manifest['fieldnames']
+        with ExitStack() as stack:
+            readers = self._chunk_readers(manifest, stack)
+            for position, count in self._runs(manifest):
+                for values in islice(readers[position], count):
+                    yield dict(zip(fieldnames, values))
+
+    def export(self, output_file, version=None):
+        """
+        Write a version as a single CSV file (atomically)
+        A .gz/.bz2/.xz/.zst file name selects a compressed export
+
+        Returns:
+            Number of rows written
+        """
+        manifest = self.manifest(version)
+        runs = self._runs(manifest)
+        with open_output(output_file, codec_for_path(output_file)) as outfile:
+            outfile.write(','.join(manifest['fieldnames']) + '\r\n')
+            if [position for position, _ in runs] == list(range(len(manifest['chunks']))):
+                # Each chunk is one run: copy the chunks as they are
+                for entry in manifest['chunks']:
+                    with open(self._object_path(entry['object']), 'r', encoding='utf-8', newline='') as infile:
+                        outfile.write(infile.read())
+            else:
+                writer = csv.writer(outfile)
+                with ExitStack() as stack:
+                    readers = self._chunk_readers(manifest, stack)
+                    for position, count in runs:
+                        writer.writerows(islice(readers[position], count))
+        return manifest['rows']
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and roll back warehouse snapshots")
+    parser.add_argument('--store', default=SNAPSHOT_DIRECTORY, help="Snapshot store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="List versions (current marked with *)")
+
+    rollback_parser = commands.add_parser('rollback', help="Make an earlier version current")
+    rollback_parser.add_argument('version')
+    rollback_parser.add_argument('--output', default=None,
+                                 help="File to re-export (default: the output file of that build)")
+
+    export_parser = commands.add_parser('export', help="Write a version as a single CSV")
+    export_parser.add_argument('output_file')
+    export_parser.add_argument('--version', default=None)
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.store)
+
+    try:
+        if args.command == 'list':
+            current = store.current()
+            for manifest in store.list_versions():
+                marker = '*' if manifest['version'] == current else ' '
+                print(f"{marker} {manifest.get('sequence', '-'):>3} {manifest['version']}  {manifest['created']}  "
+                      f"{manifest['rows']} rows, {len(manifest['chunks'])} chunk(s)  {manifest['message']}")
+        elif args.command == 'rollback':
+            output_file = store.rollback(args.version, args.output)
+            print(f"✓ Current version is now {args.version}")
+            if output_file:
+                print(f"✓ Restored: {output_file}")
+        else:
+            total = store.export(args.output_file, args.version)
+            print(f"✓ Exported {total} entries to: {args.output_file}")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
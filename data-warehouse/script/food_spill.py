@@ -0,0 +1,143 @@
+import heapq
+import json
+import os
+import shutil
+from itertools import islice
+from pathlib import Path
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+SPILL_DIRECTORY = '.spill'  # Sorted runs of an out-of-core run (removed afterwards)
+MEMORY_BUDGET_MB = 256  # Rows buffered in memory before a run is written
+MAX_MERGE_FAN_IN = 64  # Runs merged (and open) at the same time
+
+# Estimated Python overhead of one buffered entry on top of its JSON text
+ENTRY_OVERHEAD_BYTES = 150
+
+# ===================================================================
+# EXTERNAL SORT
+# ===================================================================
+
+def _read_run(run_file):
+    """Yield the entries of one run file"""
+    with open(run_file, 'r', encoding='utf-8') as infile:
+        for line in infile:
+            yield json.loads(line)
+
+class ExternalSorter:
+    """
+    Sort more entries than fit in memory
+
+    Entries are JSON-serializable lists whose first key_length elements
+    form the sort key. They are buffered as JSON text until the memory
+    budget is reached, then sorted and written as a run; merged() streams
+    all runs back in key order with a k-way merge. Runs beyond the fan-in
+    limit are first merged into larger runs, so the number of open files
+    stays bounded too.
+
+    Usage:
+        with ExternalSorter(key_length=2) as sorter:
+            for entry in entries:
+                sorter.add(entry)
+            for entry in sorter.merged():
+                ...
+    """
+
+    def __init__(self, directory=SPILL_DIRECTORY, memory_budget_mb=MEMORY_BUDGET_MB,
+                 key_length=1, fan_in=MAX_MERGE_FAN_IN):
+        """
+        Args:
+            directory: Directory for the run files (created, and removed on exit)
+            memory_budget_mb: Size of the in-memory buffer
+            key_length: Number of leading elements of an entry that form its key
+            fan_in: Largest number of runs merged at once (at least 2)
+        """
+        self.directory = Path(directory)
+        self.budget = memory_budget_mb * 1024 * 1024
+        self.key_length = key_length
+        self.fan_in = max(2, fan_in)
+        self.buffer = []
+        self.buffered_bytes = 0
+        self.runs = []
+        self.entries = 0
+        self.run_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+        return False
+
+    def _new_run_file(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.run_count += 1
+        return self.directory / f"run_{self.run_count:06d}.jsonl"
+
+    def add(self, entry):
+        """
+        Add one entry, writing a run when the buffer is over budget
+        """
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        self.buffer.append((entry[:self.key_length], line))
+        self.buffered_bytes += len(line) + ENTRY_OVERHEAD_BYTES
+        self.entries += 1
+        if self.buffered_bytes >= self.budget:
+            self.flush()
+
+    def flush(self):
+        """Sort the buffer and write it as a run"""
+        if not self.buffer:
+            return
+        self.buffer.sort(key=lambda item: item[0])
+        run_file = self._new_run_file()
+        with open(run_file, 'w', encoding='utf-8') as outfile:
+            for _, line in self.buffer:
+                outfile.write(line)
+                outfile.write('\n')
+        self.runs.append(run_file)
+        self.buffer = []
+        self.buffered_bytes = 0
+
+    def _merge(self, run_files):
+        """K-way merge of run files (each already sorted)"""
+        key_length = self.key_length
+        return heapq.merge(*(_read_run(run_file) for run_file in run_files),
+                           key=lambda entry: entry[:key_length])
+
+    def _reduce_runs(self):
+        """Merge runs in groups until at most fan_in remain"""
+        while len(self.runs) > self.fan_in:
+            runs = iter(self.runs)
+            reduced = []
+            for group in iter(lambda: list(islice(runs, self.fan_in)), []):
+                if len(group) == 1:
+                    reduced.extend(group)
+                    continue
+                run_file = self._new_run_file()
+                with open(run_file, 'w', encoding='utf-8') as outfile:
+                    for entry in self._merge(group):
+                        outfile.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+                        outfile.write('\n')
+                for merged in group:
+                    os.remove(merged)
+                reduced.append(run_file)
+            self.runs = reduced
+
+    def merged(self):
+        """
+        Yield every entry added so far, in key order
+
+        Entries with equal keys keep the order they were added in.
+        """
+        self.flush()
+        self._reduce_runs()
+        yield from self._merge(self.runs)
+
+    def cleanup(self):
+        """Remove the run files"""
+        self.buffer = []
+        self.runs = []
+        shutil.rmtree(self.directory, ignore_errors=True)
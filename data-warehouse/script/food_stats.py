@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+
+from food_output import atomic_output
+from food_record import NUTRIENT_KEYS
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+STATS_FILE = 'category_stats.json'  # Statistics cube side file
+STATS_FORMAT = 2
+
+STATISTICS = ['count', 'mean', 'median', 'p10', 'p90']
+ALL_SOURCES = '*'  # source_pdf of the per-category rollup over every source
+
+# Quantiles come from a log-bucketed sketch per cell instead of the values
+SKETCH_RELATIVE_ACCURACY = 0.01  # median/p10/p90 within 1% of a value of the cell
+
+# ===================================================================
+# STATISTICS
+# ===================================================================
+
+_GAMMA = (1 + SKETCH_RELATIVE_ACCURACY) / (1 - SKETCH_RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+class QuantileSketch:
+    """
+    Streaming summary of one cube cell (count, sum and bucket counts)
+
+    Values are counted in logarithmic buckets (value ~ gamma ** key), so the
+    memory of a cell depends on the spread of its values, not their number,
+    and two sketches merge by adding their counts.
+    """
+
+    __slots__ = ('count', 'total', 'zeros', 'positive', 'negative')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.zeros = 0
+        self.positive = {}  # bucket key -> count
+        self.negative = {}  # bucket key of -value -> count
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > 0:
+            key = math.ceil(math.log(value) / _LOG_GAMMA)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < 0:
+            key = math.ceil(math.log(-value) / _LOG_GAMMA)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other):
+        """Add the values counted by another sketch"""
+        self.count += other.count
+        self.total += other.total
+        self.zeros += other.zeros
+        for buckets, extra in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in extra.items():
+                buckets[key] = buckets.get(key, 0) + count
+
+    def _ordered(self):
+        """(value, count) of every bucket in ascending value order"""
+        for key in sorted(self.negative, reverse=True):
+            yield -2 * _GAMMA ** key / (_GAMMA + 1), self.negative[key]
+        if self.zeros:
+            yield 0.0, self.zeros
+        for key in sorted(self.positive):
+            yield 2 * _GAMMA ** key / (_GAMMA + 1), self.positive[key]
+
+    def quantiles(self, qs):
+        """Values at the given quantiles (ascending), by rank"""
+        ranks = [q * (self.count - 1) for q in qs]
+        results = []
+        seen = 0
+        for value, count in self._ordered():
+            seen += count
+            while len(results) < len(ranks) and ranks[len(results)] < seen:
+                results.append(value)
+        return results
+
+def summarize(sketch):
+    """
+    Statistics of one cube cell
+
+    Args:
+        sketch: QuantileSketch of the cell's reported values
+    Returns:
+        List in STATISTICS order
+    """
+    p10, median, p90 = sketch.quantiles([0.1, 0.5, 0.9])
+    return [
+        sketch.count,
+        round(sketch.total / sketch.count, 3),
+        round(median, 3),
+        round(p10, 3),
+        round(p90, 3)
+    ]
+
+def _summarize_groups(groups):
+    """
+    Cells of grouped sketches
+
+    Args:
+        groups: Dictionary of category -> list of QuantileSketch, one per nutrient
+    Returns:
+        List of [category, nutrient, *statistics]
+    """
+    cells = []
+    for category in sorted(groups):
+        for nutrient, sketch in zip(NUTRIENT_KEYS, groups[category]):
+            if sketch.count:
+                cells.append([category, nutrient] + summarize(sketch))
+    return cells
+
+# ===================================================================
+# STATISTICS CUBE
+# ===================================================================
+
+class StatisticsCube:
+    """
+    Nutrient statistics over category x source_pdf x nutrient
+
+    Foods are added one by one while the output is written; each value is
+    counted in the sketch of its (source_pdf, category, nutrient) cell, so
+    the whole cube comes out of that one pass without keeping the values.
+    The cube is partitioned by source_pdf and every partition carries a
+    digest of its foods: when the cube is rebuilt, partitions whose digest
+    matches the previous file keep their cells. The per-category rollup
+    over all sources (source_pdf '*') merges the sketches of every source
+    and is recomputed only when some partition changed.
+    """
+
+    def __init__(self, previous=None):
+        """
+        Args:
+            previous: Partitions of the previous build (see load_partitions)
+        """
+        self.previous = previous or {}
+        self.sketches = {}  # source_pdf -> category -> [QuantileSketch per nutrient]
+        self.digests = {}  # source_pdf -> hashlib object
+        self.partitions = {}
+        self.computed = 0
+        self.reused = 0
+
+    def add(self, record):
+        """
+        Add one food's reported nutrients
+
+        Args:
+            record: FoodRecord
+        """
+        source = record.source_pdf or ''
+        groups = self.sketches.get(source)
+        if groups is None:
+            groups = self.sketches[source] = {}
+            self.digests[source] = hashlib.sha1()
+        sketches = groups.get(record.category)
+        if sketches is None:
+            sketches = groups[record.category] = [QuantileSketch() for _ in NUTRIENT_KEYS]
+        nutrients = record.nutrients
+        for sketch, value in zip(sketches, nutrients):
+            if value == value:
+                sketch.add(value)
+        digest = self.digests[source]
+        digest.update(f"{record.id}\x1f{record.category}\x1f".encode('utf-8'))
+        digest.update(nutrients.tobytes())
+
+    def finish(self):
+        """
+        Compute the cells of every changed partition and the rollup
+
+        Returns:
+            Dictionary of source_pdf -> partition ({'digest', 'cells'})
+        """
+        changed = set(self.previous) - set(self.sketches)  # Removed sources
+        for source, groups in self.sketches.items():
+            digest = self.digests[source].hexdigest()
+            previous = self.previous.get(source)
+            if previous is not None and previous['digest'] == digest:
+                self.partitions[source] = previous
+                self.reused += 1
+                continue
+            self.partitions[source] = {'digest': digest, 'cells': _summarize_groups(groups)}
+            self.computed += 1
+            changed.add(source)
+
+        rollup = self.previous.get(ALL_SOURCES)
+        if changed or rollup is None:
+            merged = {}
+            for groups in self.sketches.values():
+                for category, sketches in groups.items():
+                    target = merged.setdefault(category, [QuantileSketch() for _ in NUTRIENT_KEYS])
+                    for sketch, extra in zip(target, sketches):
+                        sketch.merge(extra)
+            rollup = {'digest': None, 'cells': _summarize_groups(merged)}
+        self.partitions[ALL_SOURCES] = rollup
+        return self.partitions
+
+    def write(self, stats_file=STATS_FILE):
+        """Write the finished cube as compact JSON (atomically)"""
+        with atomic_output(stats_file) as outfile:
+            json.dump({'format': STATS_FORMAT, 'statistics': STATISTICS,
+                       'partitions': self.partitions},
+                      outfile, ensure_ascii=False, separators=(',', ':'))
+
+def load_partitions(stats_file=STATS_FILE):
+    """
+    Read the partitions of a cube file
+
+    Returns:
+        Dictionary of source_pdf -> partition; empty if the file is missing
+        or of another format (everything is then recomputed)
+    """
+    if not os.path.exists(stats_file):
+        return {}
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as infile:
+            document = json.load(infile)
+    except ValueError:
+        return {}
+    if document.get('format') != STATS_FORMAT or document.get('statistics') != STATISTICS:
+        return {}
+    return document['partitions']
+
+def load_cube(stats_file=STATS_FILE):
+    """
+    Load a cube file for lookups
+
+    Returns:
+        Dictionary of (category, source_pdf, nutrient) -> {statistic: value};
+        source_pdf ALL_SOURCES holds the per-category rollup
+    """
+    cube = {}
+    for source, partition in load_partitions(stats_file).items():
+        for category, nutrient, *values in partition['cells']:
+            cube[(category, source, nutrient)] = dict(zip(STATISTICS, values))
+    return cube
+
+# ===================================================================
+# RUN THE SCRIPT
+# ===================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show nutrient statistics from a statistics cube")
+    parser.add_argument('stats_file', nargs='?', default=STATS_FILE, help="Cube written by the converter")
+    parser.add_argument('--category', help="Only this category")
+    parser.add_argument('--source', default=ALL_SOURCES, help="source_pdf ('*' = all sources)")
+    parser.add_argument('--nutrient', help="Only this nutrient")
+    args = parser.parse_args()
+
+    try:
+        if not os.path.exists(args.stats_file):
+            raise FileNotFoundError(2, 'No such file', args.stats_file)
+        cube = load_cube(args.stats_file)
+        if not cube:
+            raise ValueError(f"{args.stats_file} is not a statistics cube of format {STATS_FORMAT}")
+        print(f"{'category':<20} {'nutrient':<14} " + ' '.join(f"{name:>9}" for name in STATISTICS))
+        for (category, source, nutrient), values in sorted(cube.items()):
+            if source != args.source:
+                continue
+            if args.category and category != args.category:
+                continue
+            if args.nutrient and nutrient != args.nutrient:
+                continue
+            print(f"{category:<20} {nutrient:<14} " + ' '.join(f"{values[name]:>9}" for name in STATISTICS))
+    except FileNotFoundError as e:
+        print(f"✗ Error: Could not find file '{e.filename}'")
+    except ValueError as e:
+        print(f"✗ Error: {str(e)}")
@@ -0,0 +1,212 @@
+import csv
+import json
+from array import array
+
+from food_record import NUTRIENT_INDEX
+
+# ===================================================================
+# CONFIGURATION SECTION - Modify these according to your needs
+# ===================================================================
+
+# Proximate composition (g per 100g) that must not exceed 100g in total
+COMPOSITION_FIELDS = ['protein', 'fat', 'carbs', 'fiber', 'ash', 'moisture']
+COMPOSITION_TOLERANCE_G = 5.0  # Rounding in source tables; flag above 100g + tolerance
+CARBS_INCLUDE_FIBER = True  # carbs is total carbohydrate (TACO, USDA): fiber only counts where carbs is missing
+
+# Atwater general factors (kcal per gram)
+ATWATER_FACTORS = {'protein': 4.0, 'fat': 9.0, 'carbs': 4.0}
+ATWATER_TOLERANCE_PCT = 20.0  # Relative tolerance against declared energy_kcal
+ATWATER_TOLERANCE_KCAL = 20.0  # Absolute tolerance (low-energy foods)
+
+# Energy unit consistency
+KJ_PER_KCAL = 4.184
+KJ_TOLERANCE_PCT = 2.0
+KJ_TOLERANCE_KJ = 5.0
+
+# Every nutrient read into columns for the checks above
+VALIDATED_NUTRIENTS = ['calories', 'energy_kj'] + COMPOSITION_FIELDS
+
+# ===================================================================
+# COLUMN EXTRACTION
+# ===================================================================
+
+def build_nutrient_columns(records):
+    """
+    Gather one float column per validated nutrient
+    Missing values are NaN so the checks can run column by column
+
+    Args:
+        records: List of FoodRecord
+    Returns:
+        Dictionary of nutrient name -> array('d')
+    """
+    arrays = [record.nutrients for record in records]
+    return {
+        name: array('d', [nutrients[index] for nutrients in arrays])
+        for name, index in ((name, NUTRIENT_INDEX[name]) for name in VALIDATED_NUTRIENTS)
+    }
+
+# ===================================================================
+# CONSISTENCY CHECKS (column-wise)
+# ===================================================================
+
+def check_composition_sum(columns):
+    """
+    Flag rows whose proximate composition adds up to more than 100g
+
+    Returns:
+        List of (row_index, value, expected) for failing rows
+    """
+    # Missing components count as zero, like an incomplete table row would
+    fiber_in_carbs = CARBS_INCLUDE_FIBER and 'carbs' in COMPOSITION_FIELDS and 'fiber' in COMPOSITION_FIELDS
+    fields = [name for name in COMPOSITION_FIELDS if not (fiber_in_carbs and name == 'fiber')]
+    totals = [
+        sum(0.0 if value != value else value for value in values)
+        for values in zip(*(columns[name] for name in fields))
+    ]
+    if fiber_in_carbs:
+        # Total carbohydrate already contains the fiber, so it is not added twice
+        totals = [
+            total + fiber if carbs != carbs and fiber == fiber else total
+            for total, carbs, fiber in zip(totals, columns['carbs'], columns['fiber'])
+        ]
+    limit = 100.0 + COMPOSITION_TOLERANCE_G
+    return [(index, round(total, 2), 100.0)
+            for index, total in enumerate(totals) if total > limit]
+
+def check_atwater_energy(columns):
+    """
+    Flag rows whose energy_kcal disagrees with 4/9/4 Atwater factors
+
+    Returns:
+        List of (row_index, value, expected) for failing rows
+    """
+    estimated = [
+        protein * ATWATER_FACTORS['protein'] + fat * ATWATER_FACTORS['fat'] + carbs * ATWATER_FACTORS['carbs']
+        for protein, fat, carbs in zip(columns['protein'], columns['fat'], columns['carbs'])
+    ]
+    relative = ATWATER_TOLERANCE_PCT / 100.0
+
+    # NaN comparisons are False, so rows missing any input are never flagged
+    return [
+        (index, kcal, round(expected, 1))
+        for index, (kcal, expected) in enumerate(zip(columns['calories'], estimated))
+        if abs(kcal - expected) > max(ATWATER_TOLERANCE_KCAL, relative * kcal)
+    ]
+
+def check_energy_units(columns):
+    """
+    Flag rows whose energy_kj disagrees with energy_kcal x 4.184
+
+    Returns:
+        List of (row_index, value, expected) for failing rows
+    """
+    relative = KJ_TOLERANCE_PCT / 100.0
+    return [
+        (index, kj, round(kcal * KJ_PER_KCAL, 1))
+        for index, (kcal, kj) in enumerate(zip(columns['calories'], columns['energy_kj']))
+        if abs(kj - kcal * KJ_PER_KCAL) > max(KJ_TOLERANCE_KJ, relative * kj)
+    ]
+
+# Check name -> function, run in this order
+VALIDATION_CHECKS = {
+    'composition_over_100g': check_composition_sum,
+    'atwater_energy_mismatch': check_atwater_energy,
+    'energy_kj_mismatch': check_energy_units
+}
+
+# ===================================================================
+# VALIDATION STAGE
+# ===================================================================
+
+def validate_rows(rows, dataset_label, quarantine=False):
+    """
+    Run every consistency check over a whole dataset
+
+    Args:
+        rows: Dictionary of id -> FoodRecord, as produced by the converters
+        dataset_label: Name of the dataset used in the report
+        quarantine: If True, flagged rows are removed from rows
+    Returns:
+        Tuple of (report dictionary, dictionary of quarantined rows)
+    """
+    ids = list(rows.keys())
+    values = list(rows.values())
+    columns = build_nutrient_columns(values)
+
+    # Collect failures per row index
+    failures = {}
+    check_counts = {}
+    for check_name, check in VALIDATION_CHECKS.items():
+        flagged = check(columns)
+        check_counts[check_name] = len(flagged)
+        for index, value, expected in flagged:
+            failures.setdefault(index, []).append({
+                'check': check_name,
+                'value': value,
+                'expected': expected
+            })
+
+    flagged_rows = []
+    quarantined = {}
+    for index in sorted(failures):
+        food_id = ids[index]
+        flagged_rows.append({
+            'id': food_id,
+            'name': values[index].name,
+            'notes': values[index].notes,
+            'failures': failures[index]
+        })
+        if quarantine:
+            quarantined[food_id] = rows.pop(food_id)
+
+    report = {
+        'dataset': dataset_label,
+        'checked': len(ids),
+        'flagged': len(flagged_rows),
+        'quarantined': len(quarantined),
+        'checks': check_counts,
+        'rows': flagged_rows
+    }
+    return report, quarantined
+
+def write_validation_report(reports, report_file):
+    """
+    Write the machine-readable validation report (JSON)
+
+    Args:
+        reports: List of per-dataset report dictionaries
+        report_file: Path to the output JSON file
+    """
+    summary = {
+        'checked': sum(report['checked'] for report in reports),
+        'flagged': sum(report['flagged'] for report in reports),
+        'quarantined': sum(report['quarantined'] for report in reports),
+        'datasets': reports
+    }
+    with open(report_file, 'w', encoding='utf-8') as outfile:
+        json.dump(summary, outfile, ensure_ascii=False, indent=2)
+
+def write_quarantine(quarantined, reports, fieldnames, quarantine_file):
+    """
+    Write quarantined rows with their failed checks to a CSV file
+
+    Args:
+        quarantined: Dictionary of (dataset label, id) -> FoodRecord, so rows
+            of different datasets asking for the same ID are all kept
+        reports: List of per-dataset report dictionaries
+        fieldnames: Output column order
+        quarantine_file: Path to the quarantine CSV file
+    """
+    reasons = {}
+    for report in reports:
+        for flagged in report['rows']:
+            reasons[report['dataset'], flagged['id']] = ';'.join(
+                failure['check'] for failure in flagged['failures']
+            )
+
+    with open(quarantine_file, 'w', encoding='utf-8', newline='') as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames + ['validation_errors'])
+        writer.writeheader()
+        for key, record in quarantined.items():
+            writer.writerow({**record.to_row(), 'validation_errors': reasons.get(key, '')})
@@ -1,9 +1,32 @@
 import csv
-import json
-import re
 import os
+from collections import deque
+from contextlib import nullcontext
+from itertools import groupby
+from operator import itemgetter, methodcaller
 from pathlib import Path
 
+from food_aliases import AliasIndex, words_key
+from food_checkpoint import CheckpointStore, input_fingerprint
+from food_chunks import can_split, read_chunk_rows, split_records
+from food_core import (RULES, categorize_food, generate_id_from_name, get_unit_config, name_words,
+                       safe_float)
+from food_errors import ErrorBudgetExceeded, RowError, RowErrorLog
+from food_dedup import DuplicateIndex
+from food_lineage import LINEAGE_FIELDNAMES, LineageStore
+from food_compression import compressed_file_name, detect_encoding, open_output
+from food_output import DatasetWriterPool, atomic_output
+from food_record import (FoodRecord, NUTRIENT_KEYS, OUTPUT_FIELDNAMES, SOURCE_NUTRIENT_COLUMNS,
+                         PassthroughRecord, register_unit_configs)
+from food_schemas import MAPPING_DIRECTORY, detect_schema, load_mappings, read_header
+from food_validation import validate_rows, write_validation_report, write_quarantine
+
+# Backends of optional stages (process pool, asyncio ingestion, shards,
+# snapshots, changesets, JSON export, density, statistics, spill runs,
+# recipes and cooked variants) are imported by the functions that use them
+
+_imported = set(globals())  # Names bound before the configuration section
+
 # ===================================================================
 # CONFIGURATION SECTION - Modify these according to your needs
 # ===================================================================
@@ -15,18 +38,24 @@ INPUT_FILES = [
         'path': 'input_food_data_1.csv',
         'source': '#1food-moz.pdf',
         'category_override': None,  # None = auto-detect, or specify category
+        'schema': None,  # None = detect from the header, or a column mapping name
+        'encoding': None,  # None = detect (UTF-8, else Latin-1), or e.g. 'cp1252'
         'enabled': True
     },
     {
         'path': 'input_food_data_2.csv',
         'source': '#2nutrition-database.pdf',
         'category_override': None,
+        'schema': None,
+        'encoding': None,
         'enabled': True
     },
     {
         'path': 'input_food_data_3.csv',
         'source': '#3regional-foods.pdf',
         'category_override': None,
+        'schema': None,
+        'encoding': None,
         'enabled': False
     }
 ]
@@ -36,9 +65,117 @@ USE_DIRECTORY_MODE = False  # Set to True to use directory mode
 INPUT_DIRECTORY = 'input_datasets'  # Directory containing CSV files
 OUTPUT_DIRECTORY = 'output_datasets'  # Directory for output files
 
+# Input layouts (see food_schemas.py)
+# Each file's header picks its column mapping: TACO tables, already-converted
+# output (passed through untransformed) or a mapping file for another table
+COLUMN_MAPPING_DIRECTORY = MAPPING_DIRECTORY  # Directory of *.json column mappings
+
+# Concurrent ingestion (see food_ingest.py)
+# Files are read ahead concurrently, but still transformed one by one in order
+ASYNC_INGESTION = True  # Read input files concurrently (helps on network storage)
+MAX_CONCURRENT_READS = 8  # Maximum number of input files open at the same time
+
+# Parallel processing within one large file (see food_chunks.py)
+# Results (IDs, row numbers, notes) are identical to serial processing
+PARALLEL_CHUNKS = True  # Split large plain-CSV files into chunks for a process pool
+PARALLEL_WORKERS = None  # None = one worker per CPU
+CHUNK_BYTES = 16 * 1024 * 1024  # Target chunk size
+MIN_PARALLEL_BYTES = 64 * 1024 * 1024  # Smaller files are processed serially
+
 # Single output file or separate files?
 MERGE_OUTPUT = True  # True = one combined file, False = separate files per input
 OUTPUT_FILE = 'combined_food_data.csv'  # Used only if MERGE_OUTPUT = True
+MAX_OPEN_OUTPUT_FILES = 16  # Used only if MERGE_OUTPUT = False
+
+# Output schema (see food_normalized.py)
+OUTPUT_SCHEMA = 'full'  # 'full' = units/unitConversions in every row, 'normalized' = config id per row
+UNIT_CONFIGS_FILE = 'unit_configs.json'  # Unit configurations keyed by config id (normalized only)
+
+# Output compression (see food_compression.py; compressed inputs are always detected)
+OUTPUT_COMPRESSION = None  # None, 'gzip', 'bz2', 'xz' or 'zstd' (needs zstandard)
+OUTPUT_COMPRESSION_LEVEL = None  # None = codec default
+
+# JSON document export (see food_documents.py)
+# One document per food with native nested objects and its nutrients scaled
+# for every unit, streamed in the same pass as the CSV output
+JSON_EXPORT = None  # None, 'ndjson' (one document per line) or 'json' (one array)
+JSON_EXPORT_FILE = None  # None = OUTPUT_FILE with a .ndjson/.json extension
+
+# Nutrient density (see food_density.py; intakes in reference_intakes.json)
+# NRF score and %DV of every food for every unit of its unitConversions,
+# gathered while the output is written and stored as a side table
+BUILD_DENSITY_TABLE = False  # Write the nutrient density table
+REFERENCE_INTAKE_TABLE = None  # None = the file's default table, or e.g. 'child_1_3'
+DENSITY_TABLE_FILE = 'nutrient_density.csv'  # One row per (food id, unit)
+
+# Sharded export for partial sync (see food_shards.py)
+# Rows are also split by category and source_pdf into independently
+# compressed shards with a manifest (row counts, sha256, id ranges), in the
+# same pass that writes the output
+SHARDED_EXPORT = False  # Also write the sharded export
+SHARD_DIRECTORY = 'shards'  # Shard files and manifest.json (replaced on every build)
+SHARD_COMPRESSION = 'gzip'  # None, 'gzip', 'bz2', 'xz' or 'zstd' (needs zstandard)
+
+# Versioned snapshots (see food_snapshots.py; only if MERGE_OUTPUT = True)
+USE_SNAPSHOT_STORE = False  # Also commit each build as a content-addressed version
+SNAPSHOT_DIRECTORY = 'warehouse_store'  # Unchanged per-dataset chunks are stored once
+
+# Delta output between builds (see food_delta.py; only if MERGE_OUTPUT = True)
+DIFF_MODE = False  # Write a changeset against the previous build
+PREVIOUS_BUILD_FILE = None  # None = the output file left by the previous run
+CHANGESET_FILE = 'combined_food_data.changeset.json'  # Inserted/updated/deleted foods
+
+# Provenance of every nutrient value (see food_lineage.py)
+TRACK_LINEAGE = False  # Record which source rows each value came from (larger than the output)
+LINEAGE_FILE = 'nutrient_lineage.csv'  # (food_id, nutrient) -> source rows and values
+
+# Name/alias lookup index (see food_aliases.py; synonyms live in unit_rules.json)
+BUILD_ALIAS_INDEX = False  # Index every food by accent-folded name, ID and synonyms
+ALIAS_INDEX_FILE = 'food_alias_index.json'  # Canonical alias -> food ID
+
+# Dashboard statistics (see food_stats.py)
+# count/mean/median/p10/p90 per category x source_pdf x nutrient, summarized
+# while the output is written; sources whose foods did not change since the
+# previous cube keep their statistics
+BUILD_STATS_CUBE = False  # Write the statistics cube side file
+STATS_CUBE_FILE = 'category_stats.json'  # Small JSON file read by the dashboards
+
+# Row-level error handling (see food_errors.py and food_checkpoint.py)
+# A row that fails to transform is written to the dead-letter file instead
+# of aborting its dataset; a dataset is only dropped when too many rows fail
+DEAD_LETTER_FILE = 'dead_letter_rows.csv'  # Failing rows, their error and raw values
+MAX_ERROR_RATE = 0.05  # Drop a dataset when more than 5% of its rows fail...
+MIN_ROWS_FOR_RATE = 100  # ...judged once it has at least this many rows
+MAX_ROW_ERRORS = None  # Optional absolute limit per dataset (None = no limit)
+RESUMABLE_CHECKPOINTS = True  # An interrupted run resumes from the last committed row
+CHECKPOINT_DIRECTORY = '.checkpoints'  # Removed once a run completes
+CHECKPOINT_INTERVAL = 10000  # Rows between checkpoint commits
+
+# Out-of-core mode (see food_spill.py)
+# Each dataset's rows are spilled to sorted runs on disk and conflicts are
+# resolved in one streaming merge, so memory stays within the budget however
+# many datasets are combined. Output is ordered by ID; FUZZY_DEDUP, derived
+# foods and the side outputs that hold every food (alias index, density
+# table, snapshots, changeset) are not produced
+OUT_OF_CORE = False  # True = bounded memory, for inputs larger than RAM
+MEMORY_BUDGET_MB = 256  # Rows buffered before a sorted run is written
+SPILL_DIRECTORY = '.spill'  # Runs of the current build (removed afterwards)
+
+# Estimated cooked variants (see food_preparation.py)
+# Raw and prepared foods sharing a base name ('Mandioca, crua' / 'Mandioca,
+# cozida') are paired to fit yield and nutrient retention factors per
+# category; raw foods without such a variant then get an estimated one,
+# added after the input files as one more dataset
+ESTIMATE_PREPARED = False  # True = add estimated variants of raw-only foods
+ESTIMATED_STATE = 'cozido'  # Preparation state to estimate
+PREPARATION_FACTORS_FILE = 'preparation_factors.json'  # Fitted factors (None = not written)
+
+# Composite foods (see food_recipes.py)
+# Recipes of warehouse foods are derived after the input files, as one more
+# dataset; only recipes whose ingredients changed since the last build are recomputed
+COMPOSE_RECIPES = False  # Derive the recipes in RECIPE_DEFINITIONS (their ingredient IDs must be in the build)
+RECIPE_DEFINITIONS = Path(__file__).with_name('recipes.json')  # Recipe definitions
+RECIPE_CACHE = '.recipe_cache.json'  # Results of the previous build
 
 # Conflict resolution for duplicate food IDs across datasets
 CONFLICT_RESOLUTION = 'suffix'  # Options: 'suffix', 'skip', 'overwrite', 'merge'
@@ -47,197 +184,279 @@ CONFLICT_RESOLUTION = 'suffix'  # Options: 'suffix', 'skip', 'overwrite', 'merge
 # - overwrite: Later datasets overwrite earlier ones
 # - merge: Attempt to merge nutritional data (average values)
 
+# Fuzzy duplicate detection across datasets (see food_dedup.py)
+# e.g. 'Amendoim cru' is treated as a duplicate of 'Amendoim, grão, cru'
+FUZZY_DEDUP = True  # Only applies to the 'skip' and 'merge' strategies
+
 # Default values
 DEFAULT_CATEGORY = 'Alimentos'
 DEFAULT_PAGE = '1'
 
+# Data validation (physical-consistency checks, see food_validation.py)
+VALIDATE_DATA = True  # Run the validation stage on every dataset
+QUARANTINE_INVALID_ROWS = False  # True = flagged rows are left out of the output
+VALIDATION_REPORT_FILE = 'validation_report.json'  # Machine-readable report
+QUARANTINE_FILE = 'quarantined_food_data.csv'  # Flagged rows (only if quarantining)
+
+# Names of the settings above (the options of food_pipeline.py)
+SETTINGS = [name for name in globals() if name.isupper() and name not in _imported]
+
 # ===================================================================
-# UNIT CONVERSIONS DATABASE (Same as before)
+# UNIT CONVERSIONS DATABASE
 # ===================================================================
 
-UNIT_CONVERSIONS_DATABASE = {
-    'cereais': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "xícara", "xícara de chá", "colher de sopa", "colher de chá", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "xícara": 200,
-            "xícara de chá": 200, "colher de sopa": 15, "colher de chá": 5, "kg": 1000
-        }
-    },
-    'arroz': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "xícara", "xícara de chá", "colher de sopa", "colher de chá", "prato fundo", "prato raso", "concha", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "xícara": 200, "xícara de chá": 200,
-            "colher de sopa": 15, "colher de chá": 5, "prato fundo": 300, "prato raso": 150, "concha": 120, "kg": 1000
-        }
-    },
-    'leguminosas': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "xícara", "colher de sopa", "concha", "prato fundo", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "xícara": 180,
-            "colher de sopa": 12, "concha": 100, "prato fundo": 250, "kg": 1000
-        }
-    },
-    'carnes': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "bife", "filé", "peito", "coxa", "sobrecoxa", "fatia", "porção", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "bife": 120, "filé": 150,
-            "peito": 200, "coxa": 150, "sobrecoxa": 180, "fatia": 30, "porção": 150, "kg": 1000
-        }
-    },
-    'peixes': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "filé", "posta", "unidade", "porção", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "filé": 150,
-            "posta": 200, "unidade": 180, "porção": 150, "kg": 1000
-        }
-    },
-    'laticínios': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "ml", "litro", "copo", "xícara", "colher de sopa", "colher de chá", "fatia"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "ml": 1.03, "litro": 1030,
-            "copo": 240, "xícara": 240, "colher de sopa": 15, "colher de chá": 5, "fatia": 20
-        }
-    },
-    'frutas': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "unidade pequena", "unidade média", "unidade grande", "fatia", "rodela", "xícara", "colher de sopa", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 150, "unidade pequena": 100,
-            "unidade média": 150, "unidade grande": 200, "fatia": 50, "rodela": 30, "xícara": 120, "colher de sopa": 15, "kg": 1000
-        }
-    },
-    'vegetais': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "xícara", "colher de sopa", "colher de chá", "prato fundo", "prato raso", "folha", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 120, "xícara": 100,
-            "colher de sopa": 10, "colher de chá": 3, "prato fundo": 200, "prato raso": 100, "folha": 10, "kg": 1000
-        }
-    },
-    'tubérculos': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "unidade pequena", "unidade média", "unidade grande", "fatia", "pedaço", "xícara", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 180, "unidade pequena": 120,
-            "unidade média": 180, "unidade grande": 250, "fatia": 40, "pedaço": 50, "xícara": 150, "kg": 1000
-        }
-    },
-    'óleos': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "ml", "litro", "colher de sopa", "colher de chá", "fio"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "ml": 0.92, "litro": 920,
-            "colher de sopa": 13, "colher de chá": 4, "fio": 2
-        }
-    },
-    'açúcares': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "colher de sopa", "colher de chá", "xícara", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "colher de sopa": 12,
-            "colher de chá": 4, "xícara": 180, "kg": 1000
-        }
-    },
-    'bebidas': {
-        'defaultUnit': '100ml',
-        'units': ["100ml", "ml", "litro", "copo", "xícara", "colher de sopa", "colher de chá"],
-        'conversions': {
-            "100ml": 100, "ml": 1, "litro": 1000, "copo": 240,
-            "xícara": 240, "colher de sopa": 15, "colher de chá": 5
-        }
-    },
-    'ovos': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "unidade pequena", "unidade média", "unidade grande", "clara", "gema"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 50, "unidade pequena": 40,
-            "unidade média": 50, "unidade grande": 60, "clara": 30, "gema": 20
-        }
-    },
-    'pães': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "fatia", "fatia fina", "fatia grossa", "pão francês", "pãozinho", "xícara", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 50, "fatia": 25,
-            "fatia fina": 20, "fatia grossa": 35, "pão francês": 50, "pãozinho": 50, "xícara": 100, "kg": 1000
-        }
-    },
-    'nozes': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "xícara", "colher de sopa", "colher de chá", "punhado", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 5, "xícara": 140,
-            "colher de sopa": 10, "colher de chá": 3, "punhado": 30, "kg": 1000
-        }
-    },
-    'default': {
-        'defaultUnit': '100g',
-        'units': ["100g", "gramas", "g", "unidade", "porção", "colher de sopa", "colher de chá", "xícara", "kg"],
-        'conversions': {
-            "100g": 100, "gramas": 1, "g": 1, "unidade": 100, "porção": 150,
-            "colher de sopa": 15, "colher de chá": 5, "xícara": 150, "kg": 1000
-        }
-    }
-}
+# Unit configurations, category keywords and per-food overrides live in
+# unit_rules.json and are compiled once into shared lookup tables (RULES,
+# see food_core.py)
+
+# Unit configuration object -> position in RULES.config_list (for worker results)
+CONFIG_POSITIONS = {id(config): position for position, config in enumerate(RULES.config_list)}
+
+# Already-converted rows that spell out a rules configuration share its object
+register_unit_configs(RULES.config_list)
+
+# Column mappings, in detection order
+MAPPINGS = load_mappings(COLUMN_MAPPING_DIRECTORY)
 
 # ===================================================================
 # MAIN CONVERSION FUNCTIONS
 # ===================================================================
 
-def process_multiple_datasets():
+def process_multiple_datasets(input_configs=None):
     """
     Main function to process multiple input datasets
+    
+    Args:
+        input_configs: Input file configurations in the INPUT_FILES format
+            (None = INPUT_FILES, or the files of INPUT_DIRECTORY in directory mode)
+    Returns:
+        Dictionary with the number of foods written, the per-dataset
+        statistics and whether any dataset failed
     """
     print("=" * 70)
     print("Multi-Dataset Food Data Conversion Tool")
     print("=" * 70)
     
     # Determine which input mode to use
-    if USE_DIRECTORY_MODE:
+    if input_configs is not None:
+        input_configs = [config for config in input_configs if config.get('enabled', True)]
+    elif USE_DIRECTORY_MODE:
         input_configs = discover_input_files()
     else:
         input_configs = [config for config in INPUT_FILES if config['enabled']]
     
     if not input_configs:
         print("✗ No input files configured or found")
-        return
+        return {'written': 0, 'datasets': [], 'failed': False}
+    
+    # Encodings that are not configured are detected once per file
+    input_configs = [with_encoding(config) for config in input_configs]
     
     print(f"\n📁 Processing {len(input_configs)} dataset(s)...")
     
     # Process each dataset
     all_data = {}  # Dictionary to store all processed data by ID
     dataset_stats = []
+    validation_reports = []
+    quarantined = {}
+    lineage = LineageStore() if TRACK_LINEAGE and not OUT_OF_CORE else None
     
-    for idx, config in enumerate(input_configs, 1):
-        print(f"\n{'─' * 70}")
-        print(f"Dataset {idx}/{len(input_configs)}: {config['path']}")
-        print(f"{'─' * 70}")
+    # Out-of-core: rows go to sorted runs on disk instead of all_data
+    sorter = None
+    if OUT_OF_CORE:
+        from food_spill import ExternalSorter
         
-        try:
-            data, stats = process_single_dataset(config, all_data, idx)
-            dataset_stats.append(stats)
+        sorter = ExternalSorter(SPILL_DIRECTORY, MEMORY_BUDGET_MB, key_length=3)
+        skipped = in_memory_outputs()
+        if skipped:
+            print(f"⚠ Not written in out-of-core mode (every food would be held in memory): "
+                  f"{', '.join(skipped)}")
+    
+    # Foods from earlier datasets, blocked for near-duplicate lookups
+    duplicate_index = None
+    if FUZZY_DEDUP and CONFLICT_RESOLUTION in ('skip', 'merge'):
+        if sorter is None:
+            duplicate_index = DuplicateIndex()
+        else:
+            print("⚠ Fuzzy duplicate detection needs every earlier food in memory; "
+                  "not applied in out-of-core mode")
+    
+    # Failing rows and the datasets' committed progress
+    errors = RowErrorLog(MAX_ERROR_RATE, MIN_ROWS_FOR_RATE, MAX_ROW_ERRORS)
+    checkpoints = CheckpointStore(CHECKPOINT_DIRECTORY, CHECKPOINT_INTERVAL) if RESUMABLE_CHECKPOINTS else None
+    fingerprints = {}
+    if checkpoints is not None:
+        for idx, config in enumerate(input_configs, 1):
+            try:
+                fingerprints[idx] = input_fingerprint(config, RULES.source_hash, config.get('schema'),
+                                                      input_encoding(config),
+                                                      [mapping.definition() for mapping in MAPPINGS])
+            except OSError:
+                pass  # Missing files are reported when their turn comes
+    resumed = {idx for idx, fingerprint in fingerprints.items()
+               if checkpoints.is_complete(idx, fingerprint)}
+    failed = False
+    resumable = False  # A dataset failed in a way a rerun can pick up from the checkpoint
+    
+    # Large files are transformed in parallel chunks; the others are read
+    # ahead concurrently. Datasets are consumed in order either way
+    # (datasets completed by an interrupted run are replayed from the checkpoint)
+    chunked = {idx for idx, config in enumerate(input_configs, 1)
+               if idx not in resumed and PARALLEL_CHUNKS and can_split(config['path'], MIN_PARALLEL_BYTES)}
+    streamed = [idx for idx in range(1, len(input_configs) + 1) if idx not in chunked and idx not in resumed]
+    if ASYNC_INGESTION and streamed:
+        from food_ingest import ConcurrentIngestor
+        
+        ingestion = ConcurrentIngestor([input_configs[idx - 1] for idx in streamed],
+                                       max_concurrency=MAX_CONCURRENT_READS)
+    else:
+        ingestion = nullcontext()
+    
+    with ingestion as ingestor:
+        for idx, config in enumerate(input_configs, 1):
+            print(f"\n{'─' * 70}")
+            print(f"Dataset {idx}/{len(input_configs)}: {config['path']}")
+            print(f"{'─' * 70}")
+        
+            try:
+                fingerprint = fingerprints.get(idx)
+                offset = checkpoints.row_offset(idx, fingerprint) if fingerprint else 0
+                if idx in resumed:
+                    print(f"  • Replaying {offset} rows from the checkpoint")
+                elif offset:
+                    print(f"  • Resuming after row {offset} (checkpoint)")
+                
+                if idx in resumed:
+                    transformed = iter(())
+                else:
+                    schema = detect_schema(read_header(config['path'], input_encoding(config)),
+                                           MAPPINGS, config.get('schema'))
+                    print(f"  • Layout: {schema.name}"
+                          + (" (passed through)" if schema.kind == 'converted' else ""))
+                    if idx in chunked:
+                        transformed = transform_parallel(config, schema=schema, start_after=offset)
+                    else:
+                        rows = ingestor.rows(streamed.index(idx)) if ingestor else None
+                        transformed = transform_serial(config, rows, start_after=offset, schema=schema)
+                if fingerprint:
+                    transformed = checkpointed(checkpoints, idx, fingerprint, offset, transformed)
+                
+                if sorter is not None:
+                    dataset_stats.append(spill_dataset(config, idx, transformed, sorter, errors))
+                    continue
+                
+                data, stats = process_single_dataset(
+                    config, all_data, idx, duplicate_index, transformed, lineage, errors
+                )
+                dataset_stats.append(stats)
             
-            # Update all_data with new entries
-            all_data.update(data)
+                # Validate the whole dataset before it reaches the warehouse
+                if VALIDATE_DATA:
+                    report, rejected = validate_rows(data, config['path'], QUARANTINE_INVALID_ROWS)
+                    validation_reports.append(report)
+                    reject_rows(rejected, idx, config['path'], quarantined, lineage)
+                    print_validation_summary(report)
+                if lineage is not None:
+                    lineage.commit()
             
-        except FileNotFoundError:
-            print(f"✗ File not found: {config['path']}")
-            continue
-        except Exception as e:
-            print(f"✗ Error processing dataset: {str(e)}")
-            continue
+                # Update all_data with new entries
+                all_data.update(data)
+                if duplicate_index is not None:
+                    duplicate_index.add_rows(data)
+            
+            except FileNotFoundError:
+                print(f"✗ File not found: {config['path']}")
+                dropped = True
+            except ErrorBudgetExceeded as e:
+                print(f"✗ Dataset dropped, too many failing rows: {str(e)}")
+                dropped = True
+            except Exception as e:
+                print(f"✗ Error processing dataset: {str(e)}")
+                dropped = True
+                resumable = resumable or isinstance(e, OSError)  # e.g. a storage or network error
+            else:
+                dropped = False
+            finally:
+                # Frees the read slot of a file given up on before its end
+                if ingestor and idx in streamed:
+                    ingestor.release(streamed.index(idx))
+            
+            # A dropped dataset leaves nothing in the lineage either
+            if dropped:
+                failed = True
+                if lineage is not None:
+                    lineage.discard(idx)
+    
+    # Derived foods follow the input files, each stage as one more dataset;
+    # recipes come last so they can use estimated variants as ingredients
+    derived_stages = []
+    if ESTIMATE_PREPARED:
+        derived_stages.append(estimate_prepared)
+    if COMPOSE_RECIPES and os.path.exists(RECIPE_DEFINITIONS):
+        derived_stages.append(compose_recipes)
+    if sorter is not None and derived_stages:
+        print("\n⚠ Cooked variants and recipes need every food in memory; not derived in out-of-core mode")
+    elif all_data:
+        for position, stage in enumerate(derived_stages, 1):
+            try:
+                data, stats = stage(all_data, len(input_configs) + position, lineage)
+            except ValueError as e:
+                print(f"✗ Error deriving foods: {str(e)}")
+                failed = True
+                continue
+            dataset_stats.append(stats)
+            if VALIDATE_DATA:
+                report, rejected = validate_rows(data, stats['file'], QUARANTINE_INVALID_ROWS)
+                validation_reports.append(report)
+                reject_rows(rejected, stats['dataset'], stats['file'], quarantined, lineage)
+                print_validation_summary(report)
+            if lineage is not None:
+                lineage.commit()
+            all_data.update(data)
     
     # Write output
-    if all_data:
-        write_output(all_data, dataset_stats)
+    if sorter is not None:
+        try:
+            written = write_out_of_core(sorter, input_configs, dataset_stats,
+                                        validation_reports, quarantined)
+        finally:
+            sorter.cleanup()
+    elif all_data:
+        written = write_output(all_data.values(), dataset_stats)
     else:
+        written = 0
+    if not written:
         print("\n✗ No data was successfully processed")
+    
+    if lineage is not None and all_data:
+        lineage.write(LINEAGE_FILE, all_data.keys())
+        print(f"✓ Nutrient lineage saved to: {LINEAGE_FILE}")
+    
+    if BUILD_ALIAS_INDEX and all_data:
+        alias_index = AliasIndex(RULES.synonyms, RULES.food_aliases)
+        alias_index.add_rows(all_data)
+        alias_index.write(ALIAS_INDEX_FILE)
+        print(f"✓ Alias index saved to: {ALIAS_INDEX_FILE} ({len(alias_index)} aliases)")
+    
+    if VALIDATE_DATA and validation_reports:
+        write_validation_report(validation_reports, VALIDATION_REPORT_FILE)
+        print(f"✓ Validation report saved to: {VALIDATION_REPORT_FILE}")
+        if QUARANTINE_INVALID_ROWS and quarantined:
+            write_quarantine(quarantined, validation_reports, OUTPUT_FIELDNAMES, QUARANTINE_FILE)
+            print(f"✓ Quarantined rows saved to: {QUARANTINE_FILE}")
+    
+    if errors.entries:
+        errors.write(DEAD_LETTER_FILE)
+        print(f"⚠ {len(errors.entries)} failing row(s) saved to: {DEAD_LETTER_FILE}")
+    
+    # A clean run leaves nothing to resume, and neither does a failure a
+    # rerun would hit again (missing file, bad header, error budget); after
+    # an I/O error the completed datasets are kept so the rerun only redoes
+    # what is missing
+    if checkpoints is not None and not resumable:
+        checkpoints.clear()
+    
+    return {'written': written, 'datasets': dataset_stats, 'failed': failed}
 
 def discover_input_files():
     """
@@ -251,100 +470,579 @@ def discover_input_files():
     
     csv_files = list(input_dir.glob('*.csv'))
     
-    configs = []
-    for csv_file in csv_files:
-        configs.append({
-            'path': str(csv_file),
-            'source': f'#{csv_file.stem}.pdf',
-            'category_override': None,
-            'enabled': True
-        })
+    configs = [input_file_config(csv_file) for csv_file in csv_files]
     
     print(f"📂 Discovered {len(configs)} CSV file(s) in {INPUT_DIRECTORY}")
     return configs
 
-def process_single_dataset(config, existing_data, dataset_number):
+def input_file_config(path, source=None, category_override=None, schema=None, encoding=None):
     """
-    Process a single input dataset
+    Input file configuration in the INPUT_FILES format
     
+    Args:
+        path: Path to the input file
+        source: Source document reference (None = '#<file stem>.pdf')
+        category_override: Category for every row (None = auto-detect)
+        schema: Column mapping name (None = detect from the header)
+        encoding: Text encoding (None = detect from the file)
+    """
+    return {
+        'path': str(path),
+        'source': source or f"#{Path(path).stem.removesuffix('.csv')}.pdf",
+        'category_override': category_override,
+        'schema': schema,
+        'encoding': encoding,
+        'enabled': True
+    }
+
+def input_encoding(config):
+    """
+    Text encoding of an input file: the configured one, or detected from its first bytes
+    """
+    return config.get('encoding') or detect_encoding(config['path'])
+
+def with_encoding(config):
+    """
+    Copy of an input file configuration with its encoding resolved
+    """
+    try:
+        return {**config, 'encoding': input_encoding(config)}
+    except OSError:
+        return config  # Missing files are reported when their turn comes
+
+def transform_row(row, category_override, schema=None):
+    """
+    Transform one source row independently of every other row
+    
+    Args:
+        row: Source row (dictionary keyed by the file's header)
+        category_override: Category for every row, or None to detect it
+        schema: BoundSchema of the file (None = TACO columns)
     Returns:
-        Tuple of (processed_data_dict, statistics)
+        Tuple of (food_name, base_id, nutrients, category, unit_config, alias_key),
+        a PassthroughRecord for already-converted rows, or None for rows
+        without a food name
+    """
+    if schema is not None:
+        if schema.kind == 'converted':
+            return passthrough_row(row, category_override, schema)
+        row = schema.rename(row)
+    
+    food_name = row['description'].strip().strip('"')
+    if not food_name:
+        return None
+    
+    # Extract all nutritional values (NaN where the source has none)
+    nutrients = FoodRecord.nutrients_from_values(
+        safe_float(row.get(column)) for column in SOURCE_NUTRIENT_COLUMNS
+    )
+    
+    # Determine category (the name's canonical words also give its alias key)
+    words = name_words(food_name)
+    category = category_override or categorize_food(food_name, DEFAULT_CATEGORY, words)
+    unit_config = get_unit_config(food_name, category)
+    
+    return food_name, generate_id_from_name(food_name), nutrients, category, unit_config, words_key(words)
+
+def passthrough_row(row, category_override, schema):
+    """
+    Take over an already-converted row without transforming it
+    
+    Its JSON columns are kept as strings; only the ID is derived (from the
+    name when the table has no id column), so it can still be resolved
+    against earlier datasets.
+    
+    Returns:
+        PassthroughRecord, or None for rows without a food name
+    """
+    cells = schema.cells(row)
+    food_name = cells['name'].strip()
+    if not food_name:
+        return None
+    cells['name'] = food_name
+    if category_override:
+        cells['category'] = category_override
+    return PassthroughRecord(cells['id'].strip() or generate_id_from_name(food_name), cells)
+
+def safe_transform_row(row, category_override, schema=None):
+    """
+    transform_row() that returns a RowError instead of raising
+    """
+    try:
+        return transform_row(row, category_override, schema)
+    except Exception as error:
+        return RowError.from_exception(error, row)
+
+def transform_serial(config, rows=None, start_after=0, schema=None):
+    """
+    Transform a dataset row by row in this process
+    
+    Args:
+        config: Input file configuration
+        rows: Optional iterable of already-parsed rows (read from the file if None)
+        start_after: Rows up to this number are skipped (already checkpointed)
+        schema: BoundSchema of the file (None = TACO columns)
+    Yields:
+        (row_num, transformed row) - a RowError for failing rows, None for blank ones
+    """
+    if rows is None:
+        from food_ingest import read_csv_rows
+        
+        rows = read_csv_rows(config['path'], input_encoding(config))
+    for row_num, row in enumerate(rows, start=1):
+        if row_num > start_after:
+            yield row_num, safe_transform_row(row, config['category_override'], schema)
+
+def _init_worker(default_category):
+    """
+    Worker: take over settings changed at run time (see food_pipeline.py),
+    which a spawned worker would not see when it imports this module
+    """
+    global DEFAULT_CATEGORY
+    DEFAULT_CATEGORY = default_category
+
+def _transform_chunk(input_file, start, end, fieldnames, category_override, schema, encoding):
+    """
+    Worker: transform the rows of one byte range
+    
+    Unit configurations are returned as positions in RULES.config_list so
+    the parent process can hand out its own shared configuration objects.
+    """
+    results = []
+    for row in read_chunk_rows(input_file, start, end, fieldnames, encoding):
+        item = safe_transform_row(row, category_override, schema)
+        if isinstance(item, tuple):
+            item = item[:4] + (CONFIG_POSITIONS[id(item[4])],) + item[5:]
+        results.append(item)
+    return results
+
+def transform_parallel(config, workers=None, schema=None, start_after=0):
     """
+    Transform a large dataset in record-aligned chunks on a process pool
+    
+    Chunks are consumed in file order, so row numbers (and everything
+    derived from them) match transform_serial(). At most two chunks per
+    worker are in flight at a time.
+    
+    Args:
+        start_after: Rows up to this number are left out of the chunks
+            (already checkpointed)
+    Yields:
+        (row_num, transformed row) - a RowError for failing rows, None for blank ones
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    
     input_file = config['path']
-    source_pdf = config['source']
-    category_override = config['category_override']
+    encoding = input_encoding(config)
+    fieldnames, chunks = split_records(input_file, CHUNK_BYTES, skip_rows=start_after, encoding=encoding)
+    configs = RULES.config_list
+    workers = workers or PARALLEL_WORKERS or os.cpu_count() or 1
+    print(f"  • Parallel transform: {len(chunks)} chunk(s) on {workers} worker(s)")
     
-    processed_data = {}
-    stats = {
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(DEFAULT_CATEGORY,)) as pool:
+        window = 2 * workers
+        pending = deque()
+        chunks = iter(chunks)
+        row_num = start_after
+        
+        while True:
+            while len(pending) < window:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.append(pool.submit(_transform_chunk, input_file, chunk[0], chunk[1],
+                                           fieldnames, config['category_override'], schema, encoding))
+            if not pending:
+                break
+            
+            for item in pending.popleft().result():
+                row_num += 1
+                if isinstance(item, tuple):
+                    item = item[:4] + (configs[item[4]],) + item[5:]
+                yield row_num, item
+
+def encode_checkpoint_entry(row_num, item):
+    """
+    Serialize a transformed row for the checkpoint log (None for blank rows)
+    """
+    if item is None:
+        return None
+    if isinstance(item, RowError):
+        return [row_num, 'error', item.message, item.row]
+    if isinstance(item, PassthroughRecord):
+        return [row_num, 'passthrough', item.id, item.cells]
+    food_name, base_id, nutrients, category, unit_config, alias_key = item
+    return [row_num, 'row', food_name, base_id,
+            [None if value != value else value for value in nutrients],
+            category, CONFIG_POSITIONS[id(unit_config)], alias_key]
+
+def decode_checkpoint_entry(entry):
+    """
+    Rebuild (row_num, transformed row or RowError) from a checkpoint entry
+    """
+    if entry[1] == 'error':
+        return entry[0], RowError(entry[2], entry[3])
+    if entry[1] == 'passthrough':
+        return entry[0], PassthroughRecord(entry[2], entry[3])
+    row_num, _, food_name, base_id, values, category, position = entry[:7]
+    alias_key = entry[7] if len(entry) > 7 else None  # Logs written before alias keys: computed later
+    nutrients = FoodRecord.nutrients_from_values(values)
+    return row_num, (food_name, base_id, nutrients, category, RULES.config_list[position], alias_key)
+
+def checkpointed(checkpoints, dataset_number, fingerprint, offset, transformed):
+    """
+    Replay the committed rows of a dataset, then log the remaining ones
+    
+    Replayed rows skip parsing and transforming; ID assignment and
+    everything after it runs again, so the result matches a fresh run.
+    
+    Args:
+        checkpoints: CheckpointStore
+        dataset_number: Position of the dataset (1-based)
+        fingerprint: input_fingerprint() of the dataset
+        offset: Last committed row number
+        transformed: Iterable of (row_num, item) for the live rows
+    """
+    for entry in checkpoints.committed(dataset_number, fingerprint):
+        yield decode_checkpoint_entry(entry)
+    
+    if checkpoints.is_complete(dataset_number, fingerprint):
+        return
+    
+    live = ((row_num, item) for row_num, item in transformed if row_num > offset)
+    yield from checkpoints.track(dataset_number, fingerprint, live, encode_checkpoint_entry)
+
+def new_dataset_stats(input_file, dataset_number):
+    """
+    Empty statistics of one dataset
+    """
+    return {
         'file': input_file,
+        'dataset': dataset_number,
         'total': 0,
         'added': 0,
         'skipped': 0,
         'merged': 0,
+        'errors': 0,
+        'fuzzy_matches': [],
         'conflicts': []
     }
+
+def accepted_rows(transformed, input_file, dataset_number, stats, errors=None, decode_passthrough=True):
+    """
+    Drop blank rows and dead-letter failing ones
     
-    with open(input_file, 'r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
+    Args:
+        transformed: Iterable of (row_num, transformed row)
+        input_file: Path of the input file (for the dead-letter file)
+        dataset_number: Position of the dataset (1-based)
+        stats: Statistics of the dataset ('errors' is counted here)
+        errors: Optional RowErrorLog collecting rows that failed to transform
+        decode_passthrough: Decode already-converted rows now, so a
+            malformed one fails here rather than when its values are read
+    Yields:
+        (row_num, transformed row) for every usable row
+    """
+    for row_num, item in transformed:
+        if item is None:
+            continue
         
-        for row_num, row in enumerate(reader, start=1):
-            # Extract food information
-            food_name = row['description'].strip().strip('"')
-            
-            if not food_name:
-                continue
-            
-            stats['total'] += 1
-            
-            # Generate base ID
-            base_id = generate_id_from_name(food_name)
-            
-            # Check for conflicts with existing data
-            final_id, conflict_action = resolve_id_conflict(
-                base_id, 
-                food_name, 
-                existing_data, 
-                dataset_number
-            )
-            
-            # Track conflict
-            if conflict_action in ['skipped', 'merged']:
-                stats[conflict_action] += 1
-                if conflict_action == 'skipped':
-                    stats['conflicts'].append(f"{food_name} (ID: {base_id})")
-                    continue
-            else:
-                stats['added'] += 1
-            
-            # Process nutritional data
-            row_data = create_output_row(
-                final_id,
-                food_name,
-                row,
-                source_pdf,
-                category_override,
-                row_num,
-                dataset_number
-            )
-            
-            # Handle merging if needed
-            if conflict_action == 'merged' and final_id in existing_data:
-                processed_data[final_id] = merge_nutritional_data(
-                    existing_data[final_id],
-                    row_data
-                )
+        if decode_passthrough and isinstance(item, PassthroughRecord):
+            try:
+                item.decode()
+            except ValueError as error:
+                item = RowError.from_exception(error, item.cells)
+        
+        # A failing row costs one row (dead-lettered), not the dataset
+        if isinstance(item, RowError):
+            stats['errors'] += 1
+            if errors is not None:
+                errors.add(dataset_number, input_file, row_num, item)
+            continue
+        
+        yield row_num, item
+
+def process_single_dataset(config, existing_data, dataset_number, duplicate_index=None,
+                           transformed=None, lineage=None, errors=None):
+    """
+    Process a single input dataset
+    
+    Args:
+        config: Input file configuration
+        existing_data: Rows from earlier datasets, keyed by ID
+        dataset_number: Position of this dataset (1-based)
+        duplicate_index: Optional DuplicateIndex for near-duplicate detection
+        transformed: Optional iterable of (row_num, transformed row) from
+            transform_serial() or transform_parallel() (read serially if None)
+        lineage: Optional LineageStore receiving the provenance of every value
+        errors: Optional RowErrorLog collecting rows that failed to transform
+    
+    Returns:
+        Tuple of (processed_data_dict, statistics)
+    """
+    input_file = config['path']
+    
+    processed_data = {}
+    stats = new_dataset_stats(input_file, dataset_number)
+    
+    if transformed is None:
+        transformed = transform_serial(config)
+    
+    # Already-converted rows are only decoded if something reads their values
+    decode_passthrough = (VALIDATE_DATA or lineage is not None or duplicate_index is not None
+                          or CONFLICT_RESOLUTION == 'merge' or OUTPUT_SCHEMA == 'normalized')
+    
+    # IDs are assigned here, in row order, whichever way rows were transformed
+    for row_num, item in accepted_rows(transformed, input_file, dataset_number, stats,
+                                       errors, decode_passthrough):
+        if isinstance(item, PassthroughRecord):
+            food_name, base_id = item.name, item.id
+        else:
+            food_name, base_id, nutrients = item[:3]
+        stats['total'] += 1
+        
+        # Near-duplicates of earlier foods take that food's ID
+        if duplicate_index is not None and base_id not in existing_data:
+            if isinstance(item, PassthroughRecord):
+                reported = item.nutrition()
             else:
-                processed_data[final_id] = row_data
+                reported = {key: value for key, value in zip(NUTRIENT_KEYS, nutrients) if value == value}
+            match = duplicate_index.find(food_name, reported)
+            if match is not None:
+                base_id = match[0]
+                stats['fuzzy_matches'].append({
+                    'name': food_name,
+                    'matched_id': match[0],
+                    'name_similarity': match[1],
+                    'nutrient_distance': match[2]
+                })
+        
+        resolve_row(item, row_num, base_id, config, dataset_number,
+                    existing_data, processed_data, stats, lineage)
+    
+    print_dataset_stats(stats)
+    
+    return processed_data, stats
+
+def resolve_row(item, row_num, base_id, config, dataset_number, existing_data,
+                processed_data, stats, lineage=None):
+    """
+    Resolve the ID of one transformed row and add it to its dataset
+    
+    Args:
+        item: Transformed row (tuple or PassthroughRecord)
+        row_num: Row number in the input file
+        base_id: ID the row asks for (after near-duplicate matching)
+        config: Input file configuration
+        dataset_number: Position of the dataset (1-based)
+        existing_data: Rows from earlier datasets, keyed by ID
+        processed_data: Rows of this dataset so far, keyed by ID (updated)
+        stats: Statistics of the dataset (updated)
+        lineage: Optional LineageStore receiving the provenance of every value
+    """
+    food_name = item.name if isinstance(item, PassthroughRecord) else item[0]
+    
+    # Check for conflicts with existing data
+    final_id, conflict_action = resolve_id_conflict(
+        base_id, 
+        food_name, 
+        existing_data, 
+        dataset_number
+    )
+    
+    # Track conflict
+    if conflict_action in ['skipped', 'merged']:
+        stats[conflict_action] += 1
+        if conflict_action == 'skipped':
+            stats['conflicts'].append(f"{food_name} (ID: {base_id})")
+            return
+    else:
+        stats['added'] += 1
+    
+    # Build the output record (already-converted rows are taken over as read)
+    if isinstance(item, PassthroughRecord):
+        row_data = item
+        row_data.id = final_id
+        row_data.dataset = dataset_number
+    else:
+        _, _, nutrients, category, unit_config, alias_key = item
+        row_data = create_output_row(
+            final_id,
+            food_name,
+            nutrients,
+            category,
+            unit_config,
+            config['source'],
+            row_num,
+            dataset_number,
+            alias_key
+        )
+    
+    # Record where each value came from (replaced foods lose their history)
+    if lineage is not None:
+        if conflict_action != 'merged' and (final_id in processed_data or final_id in existing_data):
+            lineage.supersede(final_id)
+        lineage.record(final_id, row_data.nutrients, dataset_number,
+                       row_data.source_pdf, row_data.page, row_num)
+    
+    # Handle merging if needed
+    if conflict_action == 'merged' and final_id in existing_data:
+        processed_data[final_id] = merge_nutritional_data(
+            existing_data[final_id],
+            row_data
+        )
+    else:
+        processed_data[final_id] = row_data
+
+def estimate_prepared(all_data, dataset_number, lineage=None):
+    """
+    Estimate ESTIMATED_STATE variants of raw foods that have none
+    
+    Raw/prepared pairs of every dataset fit the yield and retention factors
+    (see food_preparation.PreparationFactors); each raw-only food then gets
+    a variant computed from its own values and its category's factors.
     
-    # Print statistics
+    Args:
+        all_data: Foods of every input dataset, keyed by ID
+        dataset_number: Dataset number given to the estimated foods
+        lineage: Optional LineageStore receiving the estimated values
+    Returns:
+        Tuple of (processed_data_dict, statistics)
+    """
+    print(f"\n{'─' * 70}")
+    print(f"Estimated variants: {ESTIMATED_STATE}")
+    print(f"{'─' * 70}")
+    
+    from food_preparation import PreparationFactors, PreparationIndex, prepared_name
+    
+    index = PreparationIndex()
+    index.add_rows(all_data)
+    factors = PreparationFactors().fit(index)
+    if PREPARATION_FACTORS_FILE:
+        factors.write(PREPARATION_FACTORS_FILE)
+    
+    source = 'food_preparation.py'
+    stats = new_dataset_stats(source, dataset_number)
+    processed_data = {}
+    for position, raw in enumerate(index.unpaired_raw(ESTIMATED_STATE), 1):
+        stats['total'] += 1
+        estimate = factors.estimate(raw, ESTIMATED_STATE)
+        if estimate is None:
+            stats['skipped'] += 1
+            continue
+        nutrients, used, category = estimate
+        food_name = prepared_name(raw.name, ESTIMATED_STATE)
+        food_id = generate_id_from_name(food_name)
+        # A food of the same ID from the input files is never replaced
+        if food_id in all_data or food_id in processed_data:
+            stats['skipped'] += 1
+            stats['conflicts'].append(f"{food_name} (ID: {food_id})")
+            continue
+        notes = (f"Estimated from {raw.id} with {category or 'overall'} {ESTIMATED_STATE} factors "
+                 f"(yield {used['yield']}, {used['pairs']} pairs)")
+        stats['added'] += 1
+        processed_data[food_id] = FoodRecord(food_id, food_name, nutrients, raw.unit_config,
+                                             raw.category, raw.source_pdf, raw.page, notes,
+                                             dataset_number)
+        if lineage is not None:
+            lineage.record(food_id, nutrients, dataset_number, source, DEFAULT_PAGE, position)
+    
+    fitted = sorted(category for category, state in factors.factors
+                    if state == ESTIMATED_STATE and category is not None)
+    print(f"✓ {sum(1 for _ in index.pairs())} raw/prepared pairs; "
+          f"{ESTIMATED_STATE} factors for: {', '.join(fitted) or 'all categories only'}")
+    print(f"✓ Estimated {stats['added']} of {stats['total']} raw-only foods")
+    if stats['skipped'] > 0:
+        print(f"  • Skipped (no factors or ID already in the warehouse): {stats['skipped']}")
+    if PREPARATION_FACTORS_FILE:
+        print(f"✓ Preparation factors saved to: {PREPARATION_FACTORS_FILE}")
+    
+    return processed_data, stats
+
+def compose_recipes(all_data, dataset_number, lineage=None):
+    """
+    Derive the recipes of RECIPE_DEFINITIONS from the converted foods
+    
+    Results of the previous build are reused for every recipe whose
+    ingredients (and definition) did not change; only the dependents of a
+    changed food are recomputed.
+    
+    Args:
+        all_data: Foods of every input dataset, keyed by ID (the ingredients)
+        dataset_number: Dataset number given to the recipes
+        lineage: Optional LineageStore receiving the derived values
+    Returns:
+        Tuple of (processed_data_dict, statistics)
+    Raises:
+        ValueError for malformed or cyclic recipe definitions
+    """
+    print(f"\n{'─' * 70}")
+    print(f"Recipes: {RECIPE_DEFINITIONS}")
+    print(f"{'─' * 70}")
+    
+    from food_recipes import RecipeBook, RecipeEvaluator
+    
+    book = RecipeBook.load(RECIPE_DEFINITIONS)
+    evaluator = RecipeEvaluator(book, all_data, get_unit_config,
+                                lambda food_name: categorize_food(food_name, DEFAULT_CATEGORY))
+    evaluator.reuse(RECIPE_CACHE)
+    errors = evaluator.evaluate_all()
+    evaluator.save(RECIPE_CACHE)
+    
+    source = Path(RECIPE_DEFINITIONS).name
+    stats = new_dataset_stats(str(RECIPE_DEFINITIONS), dataset_number)
+    processed_data = {}
+    for position, record in enumerate(evaluator.records(source, DEFAULT_PAGE, dataset_number), 1):
+        stats['total'] += 1
+        # Foods from the input files take precedence over recipes of the same ID
+        if record.id in all_data:
+            stats['skipped'] += 1
+            stats['conflicts'].append(f"{record.name} (ID: {record.id})")
+            continue
+        stats['added'] += 1
+        processed_data[record.id] = record
+        if lineage is not None:
+            lineage.record(record.id, record.nutrients, dataset_number, source, DEFAULT_PAGE, position)
+    
+    print(f"✓ Derived {stats['total']} recipes "
+          f"({evaluator.computed} computed, {evaluator.reused} reused from the last build)")
+    if stats['skipped'] > 0:
+        print(f"  • Skipped (ID already in the warehouse): {stats['skipped']}")
+    for recipe_id, message in errors.items():
+        print(f"✗ {message}")
+    
+    return processed_data, stats
+
+def print_dataset_stats(stats):
+    """
+    Print the conflict-resolution result of one dataset
+    """
     print(f"✓ Processed {stats['total']} items")
     print(f"  • Added: {stats['added']}")
     if stats['skipped'] > 0:
         print(f"  • Skipped (duplicates): {stats['skipped']}")
     if stats['merged'] > 0:
         print(f"  • Merged: {stats['merged']}")
+    if stats['fuzzy_matches']:
+        print(f"  • Near-duplicates of earlier datasets: {len(stats['fuzzy_matches'])}")
+    if stats['errors'] > 0:
+        print(f"  • Failing rows (dead-lettered): {stats['errors']}")
+
+def print_validation_summary(report):
+    """
+    Print the validation result of one dataset
+    """
+    if report['flagged'] == 0:
+        print(f"✓ Validation passed ({report['checked']} items checked)")
+        return
     
-    return processed_data, stats
+    print(f"⚠ Validation flagged {report['flagged']} of {report['checked']} items")
+    for check_name, count in report['checks'].items():
+        if count > 0:
+            print(f"  • {check_name}: {count}")
+    if report['quarantined'] > 0:
+        print(f"  • Quarantined: {report['quarantined']}")
 
 def resolve_id_conflict(base_id, food_name, existing_data, dataset_number):
     """
@@ -376,170 +1074,237 @@ def resolve_id_conflict(base_id, food_name, existing_data, dataset_number):
     
     return base_id, 'added'
 
-def create_output_row(food_id, food_name, source_row, source_pdf, 
-                     category_override, row_num, dataset_num):
-    """
-    Create a complete output row from source data
-    """
-    # Extract nutritional values
-    energy_kcal = safe_float(source_row.get('energy_kcal'))
-    protein_g = safe_float(source_row.get('protein_g'))
-    fat_g = safe_float(source_row.get('lipids_g'))
-    carbs_g = safe_float(source_row.get('carbohydrate_g'))
-    fiber_g = safe_float(source_row.get('fiber_g'))
-    calcium_mg = safe_float(source_row.get('calcium_mg'))
-    iron_mg = safe_float(source_row.get('iron_mg'))
-    sodium_mg = safe_float(source_row.get('sodium_mg'))
-    
-    # Build comprehensive nutrition data
-    nutrition_per_100g = {
-        "calories": energy_kcal,
-        "energy_kj": safe_float(source_row.get('energy_kj')),
-        "protein": protein_g,
-        "fat": fat_g,
-        "carbs": carbs_g,
-        "fiber": fiber_g,
-        "cholesterol": safe_float(source_row.get('cholesterol_mg')),
-        "moisture": safe_float(source_row.get('moisture_pct')),
-        "ash": safe_float(source_row.get('ash_g')),
-        "calcium": calcium_mg,
-        "magnesium": safe_float(source_row.get('magnesium_mg')),
-        "manganese": safe_float(source_row.get('manganese_mg')),
-        "phosphorus": safe_float(source_row.get('phosphorus_mg')),
-        "iron": iron_mg,
-        "sodium": sodium_mg,
-        "potassium": safe_float(source_row.get('potassium_mg')),
-        "copper": safe_float(source_row.get('copper_mg')),
-        "zinc": safe_float(source_row.get('zinc_mg')),
-        "retinol": safe_float(source_row.get('retinol_mcg')),
-        "re": safe_float(source_row.get('re_mcg')),
-        "rae": safe_float(source_row.get('rae_mcg')),
-        "thiamine": safe_float(source_row.get('thiamine_mg')),
-        "riboflavin": safe_float(source_row.get('riboflavin_mg')),
-        "pyridoxine": safe_float(source_row.get('pyridoxine_mg')),
-        "niacin": safe_float(source_row.get('niacin_mg')),
-        "vitamin_c": safe_float(source_row.get('vitamin_c_mg'))
-    }
-    
-    # Remove None values
-    nutrition_per_100g = {k: v for k, v in nutrition_per_100g.items() if v is not None}
-    
-    # Determine category
-    category = category_override or categorize_food(food_name)
-    unit_config = get_unit_config(food_name, category)
-    
-    return {
-        'id': food_id,
-        'name': food_name,
-        'portion_g': 100,
-        'energy_kcal': format_value(energy_kcal),
-        'protein_g': format_value(protein_g),
-        'fat_g': format_value(fat_g),
-        'carbs_g': format_value(carbs_g),
-        'fiber_g': format_value(fiber_g),
-        'calcium_mg': format_value(calcium_mg),
-        'iron_mg': format_value(iron_mg),
-        'sodium_mg': format_value(sodium_mg),
-        'defaultUnit': unit_config['defaultUnit'],
-        'units': json.dumps(unit_config['units'], ensure_ascii=False),
-        'unitConversions': json.dumps(unit_config['conversions'], ensure_ascii=False),
-        'nutritionPer100g': json.dumps(nutrition_per_100g, ensure_ascii=False),
-        'category': category,
-        'source_pdf': source_pdf,
-        'page': DEFAULT_PAGE,
-        'notes': f'Dataset {dataset_num}, Entry {row_num}'
-    }
+def create_output_row(food_id, food_name, nutrients, category, unit_config,
+                      source_pdf, row_num, dataset_num, alias_key=None):
+    """
+    Create a complete output record from a transformed source row
+    """
+    return FoodRecord(
+        food_id,
+        food_name,
+        nutrients,
+        unit_config,
+        category,
+        source_pdf,
+        DEFAULT_PAGE,
+        f'Dataset {dataset_num}, Entry {row_num}',
+        dataset_num,
+        alias_key=alias_key
+    )
 
 def merge_nutritional_data(existing_row, new_row):
     """
-    Merge nutritional data from two rows (averaging numeric values)
+    Merge nutritional data from two records (averaging numeric values)
     """
     merged = existing_row.copy()
     
-    # Average numeric fields
-    numeric_fields = ['energy_kcal', 'protein_g', 'fat_g', 'carbs_g', 
-                     'fiber_g', 'calcium_mg', 'iron_mg', 'sodium_mg']
-    
-    for field in numeric_fields:
-        val1 = existing_row.get(field, 'NULL')
-        val2 = new_row.get(field, 'NULL')
-        
-        if val1 != 'NULL' and val2 != 'NULL':
-            avg = (float(val1) + float(val2)) / 2
-            merged[field] = str(round(avg, 2))
-    
-    # Merge nutritionPer100g JSON
-    try:
-        nutrition1 = json.loads(existing_row['nutritionPer100g'])
-        nutrition2 = json.loads(new_row['nutritionPer100g'])
-        
-        merged_nutrition = {}
-        all_keys = set(nutrition1.keys()) | set(nutrition2.keys())
-        
-        for key in all_keys:
-            if key in nutrition1 and key in nutrition2:
-                merged_nutrition[key] = (nutrition1[key] + nutrition2[key]) / 2
-            elif key in nutrition1:
-                merged_nutrition[key] = nutrition1[key]
-            else:
-                merged_nutrition[key] = nutrition2[key]
-        
-        merged['nutritionPer100g'] = json.dumps(merged_nutrition, ensure_ascii=False)
-    except:
-        pass
+    # Average nutrients reported by both; otherwise keep whichever exists
+    for index, (value1, value2) in enumerate(zip(existing_row.nutrients, new_row.nutrients)):
+        if value1 == value1 and value2 == value2:
+            merged.nutrients[index] = round((value1 + value2) / 2, 2)
+        elif value2 == value2:
+            merged.nutrients[index] = value2
     
-    # Update notes
-    merged['notes'] = f"{existing_row['notes']} | Merged with: {new_row['notes']}"
+    # Mark as merged once; the contributing rows are kept in the lineage store
+    if not merged.notes.endswith(' | Merged'):
+        merged.notes = f"{existing_row.notes} | Merged"
     
     return merged
 
-def write_output(all_data, stats):
+def in_memory_outputs():
+    """
+    Enabled side outputs that hold every food in memory until the end
+    
+    Returns:
+        List of their names (skipped in out-of-core mode)
+    """
+    outputs = [('alias index', BUILD_ALIAS_INDEX), ('density table', BUILD_DENSITY_TABLE),
+               ('snapshot store', USE_SNAPSHOT_STORE and MERGE_OUTPUT), ('changeset', DIFF_MODE and MERGE_OUTPUT)]
+    return [name for name, enabled in outputs if enabled]
+
+def write_output(records, stats, bounded=False):
     """
     Write processed data to output file(s)
+    
+    Args:
+        records: Iterable of final FoodRecords (consumed once)
+        stats: Per-dataset statistics
+        bounded: True = skip the in_memory_outputs() (out-of-core mode)
+    Returns:
+        Number of foods written
     """
     print(f"\n{'=' * 70}")
     print("Writing output...")
     print(f"{'=' * 70}")
     
-    fieldnames = [
-        'id', 'name', 'portion_g', 'energy_kcal', 'protein_g', 
-        'fat_g', 'carbs_g', 'fiber_g', 'calcium_mg', 'iron_mg', 
-        'sodium_mg', 'defaultUnit', 'units', 'unitConversions', 
-        'nutritionPer100g', 'category', 'source_pdf', 'page', 'notes'
-    ]
+    # Normalized rows reference a unit config id instead of repeating it
+    unit_table = None
+    if OUTPUT_SCHEMA == 'normalized':
+        from food_normalized import NORMALIZED_FIELDNAMES, UnitConfigTable
+        
+        unit_table = UnitConfigTable(RULES)
+        fieldnames = NORMALIZED_FIELDNAMES
+        serialize = unit_table.normalized_row
+    else:
+        fieldnames = OUTPUT_FIELDNAMES
+        serialize = methodcaller('to_row')  # Passthrough records serialize themselves
+    
+    # Statistics are gathered from the same pass over the records
+    cube = shards = documents = density = None
+    if BUILD_STATS_CUBE:
+        from food_stats import StatisticsCube, load_partitions
+        
+        cube = StatisticsCube(load_partitions(STATS_CUBE_FILE))
+    if SHARDED_EXPORT:
+        from food_shards import ShardWriter
+        
+        shards = ShardWriter(SHARD_DIRECTORY, fieldnames, SHARD_COMPRESSION)
+    if JSON_EXPORT:
+        from food_documents import DocumentWriter, json_export_file_name
+        
+        documents = DocumentWriter(JSON_EXPORT_FILE or json_export_file_name(OUTPUT_FILE, JSON_EXPORT),
+                                   JSON_EXPORT, OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL)
+    if BUILD_DENSITY_TABLE and not bounded:
+        from food_density import DensityTable, ReferenceIntakes
+        
+        density = DensityTable(ReferenceIntakes.load(table=REFERENCE_INTAKE_TABLE))
     
     if MERGE_OUTPUT:
-        # Single combined output file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8', newline='') as outfile:
+        combined_file = compressed_file_name(OUTPUT_FILE, OUTPUT_COMPRESSION)
+        
+        # Load the previous build before it is overwritten
+        changes = None
+        previous_file = PREVIOUS_BUILD_FILE or combined_file
+        if DIFF_MODE and not bounded and os.path.exists(previous_file):
+            from food_delta import ChangesetBuilder, load_build
+            
+            _, previous_rows = load_build(previous_file)
+            changes = ChangesetBuilder(previous_rows, fieldnames)
+        
+        # Rows grouped by dataset, for the snapshot store's chunks, and the
+        # output order as runs of [dataset, row count]
+        chunks = {} if USE_SNAPSHOT_STORE and not bounded else None
+        order = []
+        
+        # Single combined output file (compressed as a stream if configured,
+        # written to a temporary file, then renamed)
+        with open_output(combined_file, OUTPUT_COMPRESSION, OUTPUT_COMPRESSION_LEVEL) as outfile, \
+                shards or nullcontext(), documents or nullcontext():
             writer = csv.DictWriter(outfile, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(all_data.values())
+            written = 0
+            for record in records:
+                row = serialize(record)
+                written += 1
+                writer.writerow(row)
+                if cube is not None:
+                    cube.add(record)
+                if density is not None:
+                    density.add(record)
+                if shards is not None:
+                    shards.write(record, row)
+                if documents is not None:
+                    documents.write(record)
+                if changes is not None:
+                    changes.add(row)
+                if chunks is not None:
+                    chunks.setdefault(record.dataset, []).append(row)
+                    if order and order[-1][0] == record.dataset:
+                        order[-1][1] += 1
+                    else:
+                        order.append([record.dataset, 1])
+        
+        print(f"✓ Combined output saved to: {combined_file}")
+        print(f"✓ Total entries: {written}")
+        
+        if chunks is not None:
+            from food_snapshots import SnapshotStore
+            
+            store = SnapshotStore(SNAPSHOT_DIRECTORY)
+            labels = {stat['dataset']: stat['file'] for stat in stats}
+            datasets = sorted(chunks)
+            positions = {dataset: position for position, dataset in enumerate(datasets)}
+            version, changed = store.commit(
+                [(labels.get(dataset, dataset), chunks[dataset]) for dataset in datasets],
+                fieldnames,
+                message=f"{len(stats)} dataset(s)",
+                order=[(positions[dataset], count) for dataset, count in order],
+                output_file=combined_file
+            )
+            if changed:
+                print(f"✓ Snapshot {version} committed to: {SNAPSHOT_DIRECTORY}")
+            else:
+                print(f"✓ Snapshot unchanged (current version {version})")
         
-        print(f"✓ Combined output saved to: {OUTPUT_FILE}")
-        print(f"✓ Total entries: {len(all_data)}")
+        if changes is not None:
+            from food_delta import write_changeset
+            
+            changeset = changes.changeset()
+            write_changeset(changeset, CHANGESET_FILE)
+            print(f"✓ Changeset saved to: {CHANGESET_FILE} "
+                  f"({len(changeset['inserted'])} inserted, {len(changeset['updated'])} updated, "
+                  f"{len(changeset['deleted'])} deleted)")
+        elif DIFF_MODE and not bounded:
+            print(f"⚠ No previous build at {previous_file}; changeset skipped")
     
     else:
         # Separate output files per dataset
         if USE_DIRECTORY_MODE:
             os.makedirs(OUTPUT_DIRECTORY, exist_ok=True)
         
-        for stat in stats:
-            input_path = Path(stat['file'])
-            output_path = f"output_{input_path.stem}.csv"
+        # Inputs with the same name (a/taco.csv, b/taco.csv) get their dataset number
+        stems = [Path(stat['file']).stem for stat in stats]
+        output_paths = {}
+        for stat, stem in zip(stats, stems):
+            if stems.count(stem) > 1:
+                stem = f"{stem}_{stat['dataset']}"
+            output_path = f"output_{stem}.csv"
             
             if USE_DIRECTORY_MODE:
-                output_path = os.path.join(OUTPUT_DIRECTORY, f"{input_path.stem}_processed.csv")
-            
-            # Filter data for this dataset
-            dataset_data = {k: v for k, v in all_data.items() 
-                          if stat['file'] in v.get('notes', '')}
-            
-            with open(output_path, 'w', encoding='utf-8', newline='') as outfile:
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(dataset_data.values())
+                output_path = os.path.join(OUTPUT_DIRECTORY, f"{stem}_processed.csv")
             
-            print(f"✓ Output saved: {output_path} ({len(dataset_data)} entries)")
+            output_paths[stat['dataset']] = output_path
+        
+        # Route every row to its dataset's file in a single pass
+        with DatasetWriterPool(output_paths, fieldnames, MAX_OPEN_OUTPUT_FILES) as pool, \
+                shards or nullcontext(), documents or nullcontext():
+            for record in records:
+                row = serialize(record)
+                pool.write(record.dataset, row)
+                if cube is not None:
+                    cube.add(record)
+                if density is not None:
+                    density.add(record)
+                if shards is not None:
+                    shards.write(record, row)
+                if documents is not None:
+                    documents.write(record)
+        written = sum(pool.counts.values())
+        
+        for dataset, output_path in output_paths.items():
+            print(f"✓ Output saved: {output_path} ({pool.counts[dataset]} entries)")
+    
+    if unit_table is not None:
+        unit_table.write(UNIT_CONFIGS_FILE)
+        print(f"✓ Unit configurations saved to: {UNIT_CONFIGS_FILE}")
+    
+    if documents is not None:
+        print(f"✓ JSON documents saved to: {documents.export_file} ({documents.count} foods)")
+    
+    if shards is not None:
+        print(f"✓ Sharded export saved to: {SHARD_DIRECTORY} "
+              f"({len(shards.manifest['shards'])} shards, {shards.manifest['rows']} rows)")
+    
+    if density is not None:
+        rows = density.write(DENSITY_TABLE_FILE)
+        print(f"✓ Nutrient density saved to: {DENSITY_TABLE_FILE} "
+              f"({rows} food/unit rows, reference table '{density.reference.table}')")
+    
+    if cube is not None:
+        cube.finish()
+        cube.write(STATS_CUBE_FILE)
+        print(f"✓ Statistics cube saved to: {STATS_CUBE_FILE} "
+              f"({cube.computed} source(s) recomputed, {cube.reused} unchanged)")
     
     # Print summary
     print(f"\n{'=' * 70}")
@@ -556,78 +1321,164 @@ def write_output(all_data, stats):
         print(f"Total items skipped: {total_skipped}")
     if total_merged > 0:
         print(f"Total items merged: {total_merged}")
-    print(f"Final dataset size: {len(all_data)}")
+    print(f"Final dataset size: {written}")
+    return written
 
 # ===================================================================
-# HELPER FUNCTIONS
+# OUT-OF-CORE MODE
 # ===================================================================
 
-def generate_id_from_name(food_name):
-    """Generate snake_case ID from food name"""
-    name_lower = food_name.lower()
-    name_clean = re.sub(r'[^\w\s]', '', name_lower)
-    name_clean = re.sub(r'\s+', '_', name_clean)
-    name_clean = re.sub(r'_+', '_', name_clean)
-    name_clean = name_clean.strip('_')
-    return name_clean if name_clean else 'food_item'
-
-def safe_float(value):
-    """Safely convert value to float"""
-    if not value or value.upper() in ['NA', 'TR', '']:
-        return None
-    try:
-        return float(value)
-    except ValueError:
-        return None
+def spill_dataset(config, dataset_number, transformed, sorter, errors=None):
+    """
+    Out-of-core: spill the transformed rows of a dataset to sorted runs
+    
+    Rows are keyed by (base ID, dataset, row number); their IDs are
+    resolved later by resolve_spilled().
+    
+    Args:
+        config: Input file configuration
+        dataset_number: Position of this dataset (1-based)
+        transformed: Iterable of (row_num, transformed row)
+        sorter: ExternalSorter shared by all datasets
+        errors: Optional RowErrorLog collecting rows that failed to transform
+    Returns:
+        Statistics of the dataset (conflict counts are filled in by the merge)
+    """
+    stats = new_dataset_stats(config['path'], dataset_number)
+    for row_num, item in accepted_rows(transformed, config['path'], dataset_number, stats, errors):
+        base_id = item.id if isinstance(item, PassthroughRecord) else item[1]
+        stats['total'] += 1
+        sorter.add([base_id, dataset_number, row_num, encode_checkpoint_entry(row_num, item)])
+    
+    print(f"✓ Spilled {stats['total']} items ({len(sorter.runs)} run(s) on disk so far)")
+    if stats['errors'] > 0:
+        print(f"  • Failing rows (dead-lettered): {stats['errors']}")
+    return stats
 
-def format_value(value):
-    """Format value for CSV output"""
-    return 'NULL' if value is None else str(value)
-
-def categorize_food(food_name):
-    """Categorize food based on keywords"""
-    food_lower = food_name.lower()
-    
-    categories = {
-        'Cereais': ['arroz', 'trigo', 'aveia', 'milho', 'centeio', 'cevada', 'quinoa'],
-        'Leguminosas': ['feijão', 'ervilha', 'lentilha', 'grão', 'soja', 'amendoim'],
-        'Carnes': ['boi', 'vaca', 'frango', 'galinha', 'porco', 'peru', 'pato', 'carne', 'vitela'],
-        'Peixes': ['peixe', 'salmão', 'atum', 'sardinha', 'bacalhau', 'camarão', 'lula'],
-        'Laticínios': ['leite', 'queijo', 'iogurte', 'manteiga', 'nata', 'requeijão'],
-        'Frutas': ['maçã', 'banana', 'laranja', 'uva', 'manga', 'mamão', 'abacaxi', 'melancia', 'morango'],
-        'Vegetais': ['tomate', 'alface', 'couve', 'espinafre', 'brócolis', 'repolho', 'pimentão'],
-        'Tubérculos': ['batata', 'mandioca', 'inhame', 'cará', 'batata-doce'],
-        'Óleos': ['óleo', 'azeite', 'gordura', 'banha'],
-        'Açúcares': ['açúcar', 'mel', 'doce', 'melado', 'rapadura'],
-        'Bebidas': ['suco', 'refrigerante', 'café', 'chá', 'água', 'vinho', 'cerveja'],
-        'Ovos': ['ovo'],
-        'Pães': ['pão', 'biscoito', 'bolacha', 'massa', 'macarrão', 'espaguete'],
-        'Nozes': ['noz', 'castanha', 'amêndoa', 'avelã', 'pistache', 'semente']
-    }
+def resolve_spilled(sorter, input_configs, dataset_stats, lineage_writer=None,
+                    validation=None, quarantined=None):
+    """
+    Out-of-core: resolve IDs in a streaming k-way merge of the spilled runs
+    
+    Rows arrive grouped by base ID and, within a group, in dataset and row
+    order. Conflicts only arise between rows of the same base ID, so each
+    group replays what the in-memory path does for its rows, with the
+    group's earlier datasets as the existing data. Only one group is in
+    memory at a time.
+    
+    Args:
+        sorter: ExternalSorter holding the spilled rows
+        input_configs: Input file configurations (dataset number - 1)
+        dataset_stats: Statistics of the datasets spilled completely (updated);
+            rows of other (dropped) datasets are ignored
+        lineage_writer: Optional csv.writer receiving lineage rows
+        validation: Optional dictionary of dataset number -> report (updated)
+        quarantined: Dictionary receiving quarantined rows (if quarantining)
+    Yields:
+        Final FoodRecords, ordered by base ID
+    """
+    stats_by_dataset = {stat['dataset']: stat for stat in dataset_stats}
+    
+    for base_id, group in groupby(sorter.merged(), key=itemgetter(0)):
+        existing = {}
+        lineage = LineageStore() if lineage_writer is not None else None
+        
+        for dataset_number, entries in groupby(group, key=itemgetter(1)):
+            stats = stats_by_dataset.get(dataset_number)
+            if stats is None:
+                continue
+            config = input_configs[dataset_number - 1]
+            
+            processed = {}
+            for entry in entries:
+                row_num, item = decode_checkpoint_entry(entry[3])
+                resolve_row(item, row_num, base_id, config, dataset_number,
+                            existing, processed, stats, lineage)
+            
+            if validation is not None:
+                report, rejected = validate_rows(processed, config['path'], QUARANTINE_INVALID_ROWS)
+                add_validation_report(validation[dataset_number], report)
+                reject_rows(rejected, dataset_number, config['path'], quarantined, lineage)
+            if lineage is not None:
+                lineage.commit()
+            existing.update(processed)
+        
+        if lineage is not None:
+            lineage_writer.writerows(lineage.rows(existing))
+        yield from existing.values()
+
+def reject_rows(rejected, dataset_number, label, quarantined, lineage=None):
+    """
+    Take quarantined rows out of their dataset's results
     
-    for category, keywords in categories.items():
-        if any(keyword in food_lower for keyword in keywords):
-            return category
+    The warehouse keeps what earlier datasets had for these IDs, so the
+    lineage drops what the rejected rows recorded.
     
-    return DEFAULT_CATEGORY
+    Args:
+        rejected: Dictionary of id -> FoodRecord returned by validate_rows()
+        dataset_number: Dataset of the rows
+        label: Dataset label used in the validation report
+        quarantined: Dictionary of (dataset label, id) -> FoodRecord (updated)
+        lineage: Optional LineageStore
+    """
+    for food_id, record in rejected.items():
+        quarantined[label, food_id] = record
+        if lineage is not None:
+            lineage.rollback(food_id, dataset_number)
 
-def get_unit_config(food_name, category):
-    """Get appropriate unit configuration"""
-    food_lower = food_name.lower()
+def add_validation_report(total, report):
+    """
+    Add the report of some rows of a dataset to the dataset's report
+    """
+    for key in ('checked', 'flagged', 'quarantined'):
+        total[key] += report[key]
+    for check_name, count in report['checks'].items():
+        total['checks'][check_name] += count
+    total['rows'].extend(report['rows'])
+
+def write_out_of_core(sorter, input_configs, dataset_stats, validation_reports, quarantined):
+    """
+    Out-of-core: merge the spilled runs straight into the output files
     
-    category_map = {
-        'Cereais': 'cereais', 'Leguminosas': 'leguminosas', 'Carnes': 'carnes',
-        'Peixes': 'peixes', 'Laticínios': 'laticínios', 'Frutas': 'frutas',
-        'Vegetais': 'vegetais', 'Tubérculos': 'tubérculos', 'Óleos': 'óleos',
-        'Açúcares': 'açúcares', 'Bebidas': 'bebidas',
-        'Ovos': 'ovos', 'Pães': 'pães', 'Nozes': 'nozes'
-    }
+    Lineage and validation are produced in the same pass; the side outputs
+    that hold every food are skipped (see in_memory_outputs).
     
-    if 'arroz' in food_lower:
-        return UNIT_CONVERSIONS_DATABASE['arroz']
+    Args:
+        sorter: ExternalSorter holding the spilled rows
+        input_configs: Input file configurations
+        dataset_stats: Statistics of the datasets spilled completely
+        validation_reports: List receiving the per-dataset validation reports
+        quarantined: Dictionary receiving quarantined rows
+    Returns:
+        Number of foods written
+    """
+    if not dataset_stats or sorter.entries == 0:
+        return 0
+    print(f"\n🔀 Merging {sorter.entries} spilled rows ({len(sorter.runs)} run(s) so far)...")
+    
+    validation = None
+    if VALIDATE_DATA:
+        validation = {stat['dataset']: validate_rows({}, stat['file'])[0] for stat in dataset_stats}
+    
+    lineage_output = atomic_output(LINEAGE_FILE) if TRACK_LINEAGE else nullcontext()
+    with lineage_output as lineage_file:
+        lineage_writer = None
+        if lineage_file is not None:
+            lineage_writer = csv.writer(lineage_file)
+            lineage_writer.writerow(LINEAGE_FIELDNAMES)
+        
+        records = resolve_spilled(sorter, input_configs, dataset_stats, lineage_writer,
+                                  validation, quarantined)
+        written = write_output(records, dataset_stats, bounded=True)
     
-    db_key = category_map.get(category, 'default')
-    return UNIT_CONVERSIONS_DATABASE.get(db_key, UNIT_CONVERSIONS_DATABASE['default'])
+    if lineage_writer is not None:
+        print(f"✓ Nutrient lineage saved to: {LINEAGE_FILE}")
+    if validation is not None:
+        for dataset_number, report in validation.items():
+            print(f"Dataset {dataset_number}: ", end='')
+            print_validation_summary(report)
+            validation_reports.append(report)
+    return written
 
 # ===================================================================
 # RUN THE SCRIPT
@@ -0,0 +1,88 @@
+"""
+Checkpoints: an interrupted build resumes after the last committed row
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIRECTORY))
+
+import food_pipeline  # noqa: E402
+import multi_dataset_converter  # noqa: E402
+from food_checkpoint import CheckpointStore  # noqa: E402
+
+INPUT_FILES = [str(SCRIPT_DIRECTORY / 'input_food_data_1.csv'), str(SCRIPT_DIRECTORY / 'input_food_data_2.csv')]
+INTERVAL = 25  # Rows between checkpoint commits
+FAIL_AT = 60  # Row of the second dataset whose read fails
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as infile:
+        return sorted(csv.reader(infile))
+
+class ResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # Checkpoints and side outputs land in the temporary directory
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def build(self, output_file):
+        return food_pipeline.build_warehouse(INPUT_FILES, quiet=True, output_file=output_file,
+                                             checkpoint_interval=INTERVAL, parallel_chunks=False,
+                                             async_ingestion=False)
+
+    def transform_counting(self, transformed, fail_at=None):
+        """safe_transform_row that records the rows it transforms and raises OSError at the fail_at-th"""
+        transform = multi_dataset_converter.safe_transform_row
+
+        def counting(row, category_override, schema):
+            transformed.append(row)
+            if fail_at is not None and len(transformed) == fail_at:
+                raise OSError("Connection reset while reading the input")
+            return transform(row, category_override, schema)
+        return counting
+
+    def test_interrupted_build_resumes_from_checkpoint(self):
+        self.build('fresh.csv')
+        self.assertFalse(os.path.exists('.checkpoints'))
+        first_rows = len(read_rows(INPUT_FILES[0])) - 1
+
+        # The second dataset fails part way: the first stays complete, the second keeps its committed rows
+        transformed = []
+        with mock.patch.object(multi_dataset_converter, 'safe_transform_row',
+                               self.transform_counting(transformed, first_rows + FAIL_AT)):
+            summary = self.build('interrupted.csv')
+        self.assertTrue(summary['failed'])
+        store = CheckpointStore('.checkpoints', INTERVAL)
+        entries = store.state['datasets']
+        self.assertTrue(entries['1']['complete'])
+        self.assertFalse(entries['2']['complete'])
+        self.assertEqual(entries['2']['row_offset'], FAIL_AT - FAIL_AT % INTERVAL)
+
+        # The rerun only transforms the rows after the second dataset's offset
+        transformed = []
+        with mock.patch.object(multi_dataset_converter, 'safe_transform_row',
+                               self.transform_counting(transformed)):
+            summary = self.build('resumed.csv')
+        self.assertFalse(summary['failed'])
+        second_rows = len(read_rows(INPUT_FILES[1])) - 1
+        self.assertEqual(len(transformed), second_rows - entries['2']['row_offset'])
+        self.assertEqual(read_rows('resumed.csv'), read_rows('fresh.csv'))
+        self.assertFalse(os.path.exists('.checkpoints'))
+
+if __name__ == "__main__":
+    unittest.main()
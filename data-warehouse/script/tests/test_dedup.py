@@ -0,0 +1,44 @@
+"""
+Near-duplicate detection across datasets
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_dedup import DuplicateIndex, token_set_similarity, name_tokens  # noqa: E402
+
+# Macronutrients per 100g (calories, protein, fat, carbs)
+PEANUTS_RAW = {'calories': 544, 'protein': 27.2, 'fat': 43.9, 'carbs': 20.3}
+PEANUTS_SAMPLE = {'calories': 567, 'protein': 25.8, 'fat': 49.2, 'carbs': 16.1}  # input_food_data_2.csv
+CABBAGE = {'calories': 17, 'protein': 0.9, 'fat': 0.1, 'carbs': 3.9}
+
+class DuplicateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DuplicateIndex()
+        self.index.add('amendoim_grao_cru', 'Amendoim, grão, cru', PEANUTS_RAW)
+
+    def test_short_name_contained_in_longer_one(self):
+        self.assertEqual(token_set_similarity(name_tokens('Amendoim cru'), name_tokens('Amendoim, grão, cru')), 1.0)
+        match = self.index.find('Amendoim cru', PEANUTS_SAMPLE)
+        self.assertIsNotNone(match)
+        self.assertEqual(match[0], 'amendoim_grao_cru')
+
+    def test_other_preparation_is_not_a_duplicate(self):
+        self.assertIsNone(self.index.find('Amendoim, torrado', PEANUTS_SAMPLE))
+
+    def test_different_nutrients_are_not_a_duplicate(self):
+        self.assertIsNone(self.index.find('Amendoim cru', CABBAGE))
+
+    def test_closest_name_wins(self):
+        self.index.add('amendoim_cru', 'Amendoim, cru', PEANUTS_RAW)
+        self.assertEqual(self.index.find('Amendoim cru', PEANUTS_SAMPLE)[0], 'amendoim_cru')
+
+if __name__ == "__main__":
+    unittest.main()
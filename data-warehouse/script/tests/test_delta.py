@@ -0,0 +1,83 @@
+"""
+Changesets: a build diffed against the previous one, applied back
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIRECTORY))
+
+import food_pipeline  # noqa: E402
+from food_delta import apply_changeset  # noqa: E402
+
+INPUT_FILES = [str(SCRIPT_DIRECTORY / 'input_food_data_1.csv'), str(SCRIPT_DIRECTORY / 'input_food_data_2.csv')]
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as infile:
+        return sorted(csv.reader(infile))
+
+def write_previous_input(path):
+    """
+    The sample input as an earlier release: second food with other
+    calories, last food not yet added, one food since withdrawn
+    """
+    with open(INPUT_FILES[0], 'r', encoding='utf-8', newline='') as infile:
+        header, *rows = list(csv.reader(infile))
+    rows[1][header.index('energy_kcal')] = '999'
+    withdrawn = list(rows[0])
+    withdrawn[0], withdrawn[1] = '9999', 'Alimento, retirado'
+    with open(path, 'w', encoding='utf-8', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerows([header, *rows[:-1], withdrawn])
+
+class ChangesetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # Side outputs land in the temporary directory
+        os.chdir(self.directory.name)
+
+        # Previous build from the earlier release, then the new build diffed against it
+        os.mkdir('previous')
+        write_previous_input(os.path.join('previous', Path(INPUT_FILES[0]).name))
+        food_pipeline.build_warehouse([os.path.join('previous', Path(INPUT_FILES[0]).name), INPUT_FILES[1]],
+                                      quiet=True, output_file='previous.csv')
+        food_pipeline.build_warehouse(INPUT_FILES, quiet=True, output_file='new.csv', diff_mode=True,
+                                      previous_build_file='previous.csv', changeset_file='changes.json')
+        with open('changes.json', 'r', encoding='utf-8') as infile:
+            self.changeset = json.load(infile)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_changeset_lists_each_kind_of_change(self):
+        self.assertEqual(len(self.changeset['inserted']), 1)
+        self.assertEqual(self.changeset['deleted'], ['alimento_retirado'])
+        updated = {update['id']: update['fields'] for update in self.changeset['updated']}
+        self.assertEqual(list(updated), ['arroz_integral_cru'])
+        self.assertEqual(updated['arroz_integral_cru']['energy_kcal'], '360.0')
+
+    def test_apply_reproduces_the_new_build(self):
+        total = apply_changeset('previous.csv', 'changes.json', 'patched.csv')
+        self.assertEqual(read_rows('patched.csv'), read_rows('new.csv'))
+        self.assertEqual(total, len(read_rows('new.csv')) - 1)
+
+    def test_apply_refuses_another_base(self):
+        shutil.copyfile('new.csv', 'other.csv')
+        with self.assertRaises(ValueError):
+            apply_changeset('other.csv', 'changes.json', 'patched.csv')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Row-level error handling: failing rows go to the dead-letter file
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import food_pipeline  # noqa: E402
+from food_errors import ErrorBudgetExceeded  # noqa: E402
+
+INPUT_FILE = Path(food_pipeline.__file__).with_name('input_food_data_1.csv')
+
+class DeadLetterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.dead_letter_file = os.path.join(self.directory.name, 'dead_letter_rows.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def convert(self, input_file):
+        return food_pipeline.convert_file(
+            input_file, os.path.join(self.directory.name, 'output.csv'), quiet=True,
+            dead_letter_file=self.dead_letter_file, validate_data=False, build_alias_index=False
+        )
+
+    def write_input(self, broken_rows):
+        """Copy of the sample input whose first rows are cut short (no description)"""
+        input_file = os.path.join(self.directory.name, 'input.csv')
+        with open(INPUT_FILE, 'r', encoding='utf-8', newline='') as infile, \
+                open(input_file, 'w', encoding='utf-8', newline='') as outfile:
+            writer = csv.writer(outfile)
+            for index, row in enumerate(csv.reader(infile)):
+                writer.writerow(row[:1] if 0 < index <= broken_rows else row)
+        return input_file
+
+    def dead_letters(self):
+        with open(self.dead_letter_file, 'r', encoding='utf-8', newline='') as infile:
+            return list(csv.DictReader(infile))
+
+    def test_failing_rows_within_budget(self):
+        records = self.convert(self.write_input(2))
+        self.assertGreater(len(records), 0)
+        self.assertEqual(len(self.dead_letters()), 2)
+
+    def test_failing_rows_kept_when_budget_exceeded(self):
+        with self.assertRaises(ErrorBudgetExceeded):
+            self.convert(self.write_input(200))
+        self.assertGreater(len(self.dead_letters()), 0)
+
+if __name__ == "__main__":
+    unittest.main()
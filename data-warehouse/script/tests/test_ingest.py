@@ -0,0 +1,74 @@
+"""
+Concurrent ingestion: a file given up on must not hold its read slot
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_ingest import ConcurrentIngestor  # noqa: E402
+
+TIMEOUT = 30  # Seconds before a blocked read counts as a hang
+
+def write_csv(path, fieldnames, rows):
+    """Write rows (lists of values) under a header"""
+    with open(path, 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(fieldnames)
+        writer.writerows(rows)
+
+def run_with_timeout(function):
+    """Result of function(), or None if it did not return within TIMEOUT"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()), daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    return result[0] if result else None
+
+class ReleaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        self.large = os.path.join(self.directory.name, 'large.csv')
+        self.small = os.path.join(self.directory.name, 'small.csv')
+        write_csv(self.large, ['foo', 'bar'], [[number, number] for number in range(20000)])
+        write_csv(self.small, ['name'], [['Arroz'], ['Feijão']])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_released_file_frees_its_slot(self):
+        # One slot: the second file is only read once the first lets go
+        configs = [{'path': self.large}, {'path': self.small}]
+        with ConcurrentIngestor(configs, max_concurrency=1, queue_batches=1, batch_rows=10) as ingestor:
+            next(ingestor.rows(0))  # Given up on after one row
+            ingestor.release(0)
+            rows = run_with_timeout(lambda: list(ingestor.rows(1)))
+        self.assertEqual(rows, [{'name': 'Arroz'}, {'name': 'Feijão'}])
+
+    def test_build_continues_after_bad_header(self):
+        import food_pipeline
+
+        input_file = str(Path(food_pipeline.__file__).with_name('input_food_data_1.csv'))
+        # Side outputs (lineage, reports...) land in the temporary directory
+        os.chdir(self.directory.name)
+        summary = run_with_timeout(lambda: food_pipeline.build_warehouse(
+            [self.large, input_file], quiet=True, max_concurrent_reads=1, compose_recipes=False
+        ))
+        self.assertIsNotNone(summary, "build hung on the dataset after the bad header")
+        self.assertTrue(summary['failed'])
+        self.assertGreater(summary['written'], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+Out-of-core mode: same foods as an in-memory build, memory bounded
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIRECTORY))
+
+import food_pipeline  # noqa: E402
+
+INPUT_FILES = [str(SCRIPT_DIRECTORY / 'input_food_data_1.csv'), str(SCRIPT_DIRECTORY / 'input_food_data_2.csv')]
+
+# Peak RSS of an out-of-core build: rows of the small and large inputs, and
+# the growth allowed between them (an in-memory build grows about 20 MB)
+SMALL_ROWS = 10000
+LARGE_ROWS = 30000
+MAX_GROWTH_MB = 5
+
+# Builds one input out of core with a small budget and every side output
+# turned on, and prints its peak RSS (KB)
+PEAK_RSS_BUILD = """
+import resource, sys
+import food_pipeline
+summary = food_pipeline.build_warehouse([sys.argv[1]], quiet=True, out_of_core=True, memory_budget_mb=0.25,
+                                        parallel_chunks=False, output_file=sys.argv[2],
+                                        build_stats_cube=True, build_alias_index=True, build_density_table=True,
+                                        use_snapshot_store=True, diff_mode=True)
+assert summary['written'] == int(sys.argv[3])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def read_rows(path):
+    with open(path, 'r', encoding='utf-8', newline='') as infile:
+        return sorted(csv.reader(infile))
+
+def write_foods(path, count):
+    """Input of count distinct foods, cycling through the sample input's rows"""
+    with open(INPUT_FILES[0], 'r', encoding='utf-8', newline='') as infile:
+        header, *rows = list(csv.reader(infile))
+    with open(path, 'w', encoding='utf-8', newline='') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(header)
+        for number in range(count):
+            row = list(rows[number % len(rows)])
+            row[0], row[1] = str(number), f"{row[1]} {number}"
+            writer.writerow(row)
+
+class OutOfCoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # Side outputs (reports, spill runs...) land in the temporary directory
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def test_same_foods_as_in_memory(self):
+        for conflict_resolution in ('suffix', 'merge'):
+            outputs = []
+            for out_of_core in (False, True):
+                output_file = f"{conflict_resolution}_{out_of_core}.csv"
+                food_pipeline.build_warehouse(INPUT_FILES, quiet=True, out_of_core=out_of_core,
+                                              conflict_resolution=conflict_resolution,
+                                              fuzzy_dedup=False, output_file=output_file)
+                outputs.append(read_rows(output_file))
+            self.assertGreater(len(outputs[0]), 1)
+            self.assertEqual(outputs[0], outputs[1], conflict_resolution)
+
+    @unittest.skipIf(sys.platform == 'win32', "needs the resource module")
+    def test_peak_memory_does_not_grow_with_rows(self):
+        # Both builds run at once, each in its own directory (spill runs, checkpoints)
+        processes = []
+        for count in (SMALL_ROWS, LARGE_ROWS):
+            os.mkdir(str(count))
+            write_foods(os.path.join(str(count), 'foods.csv'), count)
+            processes.append(subprocess.Popen(
+                [sys.executable, '-c', PEAK_RSS_BUILD, 'foods.csv', 'output.csv', str(count)],
+                cwd=str(count), env={**os.environ, 'PYTHONPATH': str(SCRIPT_DIRECTORY)},
+                stdout=subprocess.PIPE, text=True
+            ))
+        outputs = [process.communicate()[0] for process in processes]
+        self.assertEqual([process.returncode for process in processes], [0, 0])
+        small, large = map(int, outputs)
+        self.assertLess((large - small) / 1024, MAX_GROWTH_MB)
+
+if __name__ == "__main__":
+    unittest.main()
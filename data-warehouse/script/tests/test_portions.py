@@ -0,0 +1,79 @@
+"""
+Free-text portions: hand-labelled phrases and the food and grams they mean
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_core import RULES  # noqa: E402
+from food_portions import PortionParser  # noqa: E402
+
+# (food ID, name, unit configuration) in the order of a TACO build
+FOODS = [
+    ('arroz_carreteiro', 'Arroz carreteiro', 'arroz'),
+    ('arroz_integral_cozido', 'Arroz, integral, cozido', 'arroz'),
+    ('arroz_tipo_1_cru', 'Arroz, tipo 1, cru', 'arroz'),
+    ('batata_baroa_cozida', 'Batata, baroa, cozida', 'tubérculos'),
+    ('batata_doce_crua', 'Batata, doce, crua', 'tubérculos'),
+    ('batata_inglesa_crua', 'Batata, inglesa, crua', 'tubérculos'),
+    ('farinha_de_arroz', 'Farinha, de arroz, enriquecida', 'cereais'),
+    ('feijao_broto_cru', 'Feijão, broto, cru', 'leguminosas'),
+    ('feijao_carioca_cozido', 'Feijão, carioca, cozido', 'leguminosas'),
+    ('feijao_carioca_cru', 'Feijão, carioca, cru', 'leguminosas'),
+    ('feijao_preto_cru', 'Feijão, preto, cru', 'leguminosas'),
+    ('feijao_tropeiro_mineiro', 'Feijão tropeiro mineiro', 'leguminosas'),
+    ('leite_condensado', 'Leite, condensado', 'laticínios'),
+    ('leite_de_cabra', 'Leite, de cabra', 'laticínios'),
+    ('leite_de_vaca_integral', 'Leite, de vaca, integral', 'laticínios'),
+    ('ovo_de_codorna_cru', 'Ovo, de codorna, inteiro, cru', 'ovos'),
+    ('ovo_de_galinha_cru', 'Ovo, de galinha, inteiro, cru', 'ovos'),
+    ('pao_de_soja', 'Pão, de soja', 'pães'),
+    ('pao_trigo_frances', 'Pão, trigo, francês', 'pães'),
+]
+
+# Phrase -> (food ID, grams); None when no food in FOODS is meant
+PORTIONS = {
+    '1 xícara de feijão': ('feijao_carioca_cru', 180.0),
+    'duas xícaras de feijão preto': ('feijao_preto_cru', 360.0),
+    '1 concha de feijão carioca cozido': ('feijao_carioca_cozido', 100.0),
+    '2 colheres de sopa de feijão tropeiro': ('feijao_tropeiro_mineiro', 24.0),
+    '1 xícara de broto de feijão': ('feijao_broto_cru', 180.0),
+    'um e meio copo de leite': ('leite_de_vaca_integral', 360.0),
+    '1 colher de sopa de leite condensado': ('leite_condensado', 15.0),
+    'meia xícara de arroz': ('arroz_tipo_1_cru', 100.0),
+    'um pouco de arroz': ('arroz_tipo_1_cru', None),
+    '3 colheres de sopa de arroz integral cozido': ('arroz_integral_cozido', 45.0),
+    '1 kg de batata': ('batata_inglesa_crua', 1000.0),
+    '1 batata doce': ('batata_doce_crua', 180.0),
+    '2 pães': ('pao_trigo_frances', 100.0),
+    '2 ovos': ('ovo_de_galinha_cru', 100.0),
+    '1 xícara de feijão branco': None,
+    '200 g de carne moída': None,
+}
+
+class PortionParserTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        foods = [(food_id, name, RULES.unit_configs[config]) for food_id, name, config in FOODS]
+        cls.parser = PortionParser(RULES.unit_configs, RULES.default_config, RULES.synonyms, foods)
+
+    def test_hand_labelled_portions(self):
+        for phrase, expected in PORTIONS.items():
+            with self.subTest(phrase=phrase):
+                self.assertEqual(self.parser.parse(phrase), expected)
+
+    def test_alias_wins_over_names(self):
+        foods = [(food_id, name, RULES.unit_configs[config]) for food_id, name, config in FOODS]
+        parser = PortionParser(RULES.unit_configs, RULES.default_config, RULES.synonyms, foods,
+                               {'leite': 'leite_de_cabra'})
+        self.assertEqual(parser.parse('1 copo de leite'), ('leite_de_cabra', 240.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""
+Categorization with accent folding and synonyms
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_core import RULES, categorize_food, get_unit_config, name_words  # noqa: E402
+
+class CategorizeTest(unittest.TestCase):
+
+    def test_dish_keeps_its_category(self):
+        # 'aipim' is a synonym of 'mandioca', but this cake is not a tuber
+        category = categorize_food('Bolo, pronto, aipim')
+        self.assertEqual(category, 'Alimentos')
+        self.assertIs(get_unit_config('Bolo, pronto, aipim', category), RULES.unit_configs[RULES.default_config])
+
+    def test_synonyms_categorize_plain_foods(self):
+        self.assertEqual(categorize_food('Cassava, raw'), 'Tubérculos')
+        self.assertEqual(categorize_food('Aipim cozido'), 'Tubérculos')
+
+    def test_accent_free_names(self):
+        self.assertEqual(categorize_food('Feijao, carioca, cru'), 'Leguminosas')
+
+    def test_dish_alias_key_still_uses_synonyms(self):
+        self.assertEqual(RULES.synonyms.alias_key('Bolo, pronto, aipim'),
+                         RULES.synonyms.alias_key('bolo pronto mandioca'))
+        self.assertIn('mandioca', name_words('Bolo, pronto, aipim'))
+
+if __name__ == "__main__":
+    unittest.main()
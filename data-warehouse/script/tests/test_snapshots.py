@@ -0,0 +1,77 @@
+"""
+Snapshot store: commit builds, roll back to an earlier one
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import csv
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIRECTORY))
+
+import food_pipeline  # noqa: E402
+from food_snapshots import SnapshotStore  # noqa: E402
+
+INPUT_FILES = [str(SCRIPT_DIRECTORY / 'input_food_data_1.csv'), str(SCRIPT_DIRECTORY / 'input_food_data_2.csv')]
+
+def read_bytes(path):
+    with open(path, 'rb') as infile:
+        return infile.read()
+
+class RollbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        # The store and the side outputs land in the temporary directory
+        os.chdir(self.directory.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def build(self, input_files):
+        food_pipeline.build_warehouse(input_files, quiet=True, use_snapshot_store=True,
+                                      snapshot_directory='store', output_file='output.csv')
+        return read_bytes('output.csv')
+
+    def test_rollback_restores_the_earlier_build(self):
+        store = SnapshotStore('store')
+        first = self.build(INPUT_FILES[:1])
+        first_version = store.current()
+        second = self.build(INPUT_FILES)
+        self.assertNotEqual(first, second)
+        self.assertNotEqual(store.current(), first_version)
+        self.assertEqual([manifest['version'] for manifest in store.list_versions()][0], first_version)
+
+        self.assertEqual(store.rollback(first_version), 'output.csv')
+        self.assertEqual(read_bytes('output.csv'), first)
+        self.assertEqual(store.current(), first_version)
+
+    def test_same_build_is_not_a_new_version(self):
+        store = SnapshotStore('store')
+        self.build(INPUT_FILES)
+        self.build(INPUT_FILES)
+        self.assertEqual(len(store.list_versions()), 1)
+
+    def test_export_keeps_interleaved_order(self):
+        store = SnapshotStore('store')
+        chunks = [('a', [{'id': 'a1'}, {'id': 'a2'}]), ('b', [{'id': 'b1'}])]
+        version, changed = store.commit(chunks, ['id'], order=[(0, 1), (1, 1), (0, 1)])
+        self.assertTrue(changed)
+        store.export('export.csv', version)
+        with open('export.csv', 'r', encoding='utf-8', newline='') as infile:
+            self.assertEqual([row['id'] for row in csv.DictReader(infile)], ['a1', 'b1', 'a2'])
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            SnapshotStore('store').rollback('0000000000000000')
+
+if __name__ == "__main__":
+    unittest.main()
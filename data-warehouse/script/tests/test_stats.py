@@ -0,0 +1,69 @@
+"""
+Statistics cube: streaming summaries per category x source x nutrient
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import math
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_record import FoodRecord, NUTRIENT_KEYS  # noqa: E402
+from food_stats import ALL_SOURCES, SKETCH_RELATIVE_ACCURACY, QuantileSketch, StatisticsCube  # noqa: E402
+
+def record(food_id, source, category, calories):
+    values = FoodRecord.nutrients_from_values(calories if key == 'calories' else None for key in NUTRIENT_KEYS)
+    return FoodRecord(food_id, food_id, values, {}, category, source, '1', '')
+
+def cells(partition):
+    return {(category, nutrient): values for category, nutrient, *values in partition['cells']}
+
+class QuantileSketchTest(unittest.TestCase):
+
+    def test_quantiles_within_accuracy(self):
+        generator = random.Random(1)
+        values = [generator.lognormvariate(2, 2) for _ in range(5001)] + [0.0] * 100
+        sketch = QuantileSketch()
+        for value in values:
+            sketch.add(value)
+        ordered = sorted(values)
+        for q, value in zip([0.1, 0.5, 0.9], sketch.quantiles([0.1, 0.5, 0.9])):
+            expected = ordered[math.floor(q * (len(values) - 1))]
+            self.assertLessEqual(abs(value - expected), SKETCH_RELATIVE_ACCURACY * expected)
+        self.assertEqual(sketch.count, len(values))
+        self.assertAlmostEqual(sketch.total, sum(values))
+
+    def test_memory_does_not_grow_with_rows(self):
+        sketch = QuantileSketch()
+        for number in range(100000):
+            sketch.add(100 + number % 50)
+        self.assertLess(len(sketch.positive), 30)
+
+class StatisticsCubeTest(unittest.TestCase):
+
+    def build(self, previous, foods):
+        cube = StatisticsCube(previous)
+        for food in foods:
+            cube.add(food)
+        return cube, cube.finish()
+
+    def test_rollup_and_unchanged_sources(self):
+        taco = [record(f'a{number}', 'taco.pdf', 'Frutas', 50 + number) for number in range(10)]
+        moz = [record(f'b{number}', 'moz.pdf', 'Frutas', 100 + number) for number in range(10)]
+        _, partitions = self.build(None, taco + moz)
+        self.assertEqual(cells(partitions[ALL_SOURCES])['Frutas', 'calories'][:2], [20, 79.5])
+
+        # Only the changed source is recomputed; the rollup follows it
+        moz[0] = record('b0', 'moz.pdf', 'Frutas', 300)
+        cube, updated = self.build(partitions, taco + moz)
+        self.assertEqual((cube.computed, cube.reused), (1, 1))
+        self.assertIs(updated['taco.pdf'], partitions['taco.pdf'])
+        self.assertEqual(cells(updated[ALL_SOURCES])['Frutas', 'calories'][:2], [20, 89.5])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Validation: physical-consistency checks on converted foods
+
+Run from the script directory:
+
+    python -m unittest discover tests
+"""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from food_record import FoodRecord, NUTRIENT_KEYS  # noqa: E402
+from food_validation import validate_rows  # noqa: E402
+
+def record(food_id, **nutrients):
+    """FoodRecord with the given nutrients per 100g (others not reported)"""
+    values = FoodRecord.nutrients_from_values(nutrients.get(key) for key in NUTRIENT_KEYS)
+    return FoodRecord(food_id, food_id, values, {}, 'Alimentos', '#1food-moz.pdf', '1', '')
+
+# "Aveia, flocos, crua" from input_food_data_1.csv: total carbohydrate 66.6g
+# already includes its 9.1g of fiber, so the composition is 99.9g, not 109g
+OATS = dict(calories=394, energy_kj=1648, protein=13.9, fat=8.5, carbs=66.6,
+            fiber=9.1, ash=1.8, moisture=9.1)
+
+class CompositionTest(unittest.TestCase):
+
+    def checks(self, rows):
+        report, _ = validate_rows(rows, 'test')
+        return {row['id']: [failure['check'] for failure in row['failures']] for row in report['rows']}
+
+    def test_fiber_is_part_of_total_carbohydrate(self):
+        self.assertEqual(self.checks({'aveia_flocos_crua': record('aveia_flocos_crua', **OATS)}), {})
+
+    def test_composition_over_100g_is_flagged(self):
+        salted = dict(OATS, moisture=30.0)
+        self.assertEqual(self.checks({'salted': record('salted', **salted)}),
+                         {'salted': ['composition_over_100g']})
+
+    def test_fiber_counts_when_carbohydrate_is_missing(self):
+        partial = dict(OATS, carbs=None, fiber=80.0)
+        self.assertIn('composition_over_100g', self.checks({'partial': record('partial', **partial)})['partial'])
+
+    def test_quarantine_removes_flagged_rows(self):
+        rows = {'aveia': record('aveia', **OATS), 'salted': record('salted', **dict(OATS, moisture=30.0))}
+        report, quarantined = validate_rows(rows, 'test', quarantine=True)
+        self.assertEqual(list(rows), ['aveia'])
+        self.assertEqual(list(quarantined), ['salted'])
+        self.assertEqual(report['quarantined'], 1)
+
+if __name__ == "__main__":
+    unittest.main()